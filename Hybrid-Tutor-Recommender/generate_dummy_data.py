@@ -1,15 +1,35 @@
-import pandas as pd
-import numpy as np
+"""
+Generate synthetic cases, tutors and results for development and load tests.
+
+Run from the project root:
+    python generate_dummy_data.py                                   # 100 cases, 50 tutors, 200 results
+    python generate_dummy_data.py --cases 1000000 --tutors 200000 --results 100000000 \\
+        --format parquet --out data/bench --workers 8
+
+Every table is built in fixed-size chunks. Each chunk has its own seed derived
+from --seed, so the output is identical whatever the worker count. Workers
+write part files and the parts are joined into one file per table, so memory
+stays bounded by the chunk size.
+
+Skew:
+  * locations cluster around a few hot districts with Zipf-weighted popularity
+  * a small share of tutors receives a large share of the results (Zipf)
+  * success depends on subject match, price gap, distance, gender preference
+    and a hidden per-tutor quality
+"""
+import argparse
+import glob
 import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-# Create folders if they don't exist
-os.makedirs("data/raw", exist_ok=True)
+import numpy as np
+import pandas as pd
 
-# -----------------------------
-# 1️⃣ Generate dummy cases
-# -----------------------------
-num_cases = 100
-case_descriptions = [
+from src.data_pipeline import haversine_np
+
+CASE_DESCRIPTIONS = [
     "A-Level Physics student, SEN-friendly",
     "IB Math tutoring required",
     "GCSE Chemistry tutoring, online",
@@ -18,24 +38,7 @@ case_descriptions = [
     "Aviation studies tutoring",
     "Math Olympiad training"
 ]
-
-cases = pd.DataFrame({
-    'case_id': range(1, num_cases + 1),
-    'case_description': np.random.choice(case_descriptions, num_cases),
-    'case_budget': np.random.randint(30, 150, num_cases),
-    'case_lat': np.random.uniform(22.28, 22.35, num_cases),  # Hong Kong approx
-    'case_lon': np.random.uniform(114.15, 114.25, num_cases),
-    'preferred_gender': np.random.choice(["Male", "Female", "Any"], num_cases)
-})
-
-cases.to_csv("data/raw/cases.csv", index=False)
-print("✅ cases.csv generated")
-
-# -----------------------------
-# 2️⃣ Generate dummy tutors
-# -----------------------------
-num_tutors = 50
-tutor_bios = [
+TUTOR_BIOS = [
     "Experienced Physics tutor, SEN-friendly",
     "Math tutor, IB and A-Level",
     "Chemistry tutor with exam success",
@@ -44,32 +47,196 @@ tutor_bios = [
     "Aviation studies expert tutor",
     "Math Olympiad specialist"
 ]
+# Subject of each description / bio above, for correlated success
+CASE_SUBJECT = np.array([0, 1, 2, 3, 4, 5, 1])
+TUTOR_SUBJECT = np.array([0, 1, 2, 3, 4, 5, 1])
+GENDERS = np.array(["Male", "Female"])
+PREFERRED = np.array(["Male", "Female", "Any"])
+
+HK_LAT, HK_LON = (22.20, 22.50), (113.90, 114.30)
+TABLES = ("cases", "tutors", "results")
+_TABLE_SEED = {name: i for i, name in enumerate(TABLES)}
+
+# -----------------------------
+# Shared skew
+# -----------------------------
+def make_districts(seed, n_districts=24, zipf=1.0):
+    """District centres and Zipf popularity weights, derived from the seed only."""
+    rng = np.random.default_rng([seed, 99])
+    centres = np.column_stack([rng.uniform(*HK_LAT, n_districts), rng.uniform(*HK_LON, n_districts)])
+    weights = 1.0 / np.arange(1, n_districts + 1) ** zipf
+    return centres, weights / weights.sum()
+
+def clustered_points(rng, n, districts, spread_km=1.5):
+    centres, weights = districts
+    c = centres[rng.choice(len(centres), n, p=weights)]
+    lat = c[:, 0] + rng.normal(0, spread_km / 111.2, n)
+    lon = c[:, 1] + rng.normal(0, spread_km / (111.2 * np.cos(np.radians(22.3))), n)
+    return np.clip(lat, *HK_LAT), np.clip(lon, *HK_LON)
+
+def chunk_rng(seed, table, chunk):
+    return np.random.default_rng([seed, _TABLE_SEED[table], chunk])
+
+# -----------------------------
+# Chunk generators (return the frame plus the attributes results need)
+# -----------------------------
+def make_cases(seed, chunk, start, n, districts):
+    rng = chunk_rng(seed, "cases", chunk)
+    desc = rng.integers(0, len(CASE_DESCRIPTIONS), n)
+    lat, lon = clustered_points(rng, n, districts)
+    pref = rng.choice(3, n, p=[0.2, 0.3, 0.5])
+    df = pd.DataFrame({
+        'case_id': np.arange(start + 1, start + n + 1),
+        'case_description': np.asarray(CASE_DESCRIPTIONS, dtype=object)[desc],
+        'case_budget': rng.integers(30, 150, n),
+        'case_lat': lat,
+        'case_lon': lon,
+        'preferred_gender': PREFERRED[pref],
+    })
+    attrs = {'subject': CASE_SUBJECT[desc].astype(np.int8), 'budget': df['case_budget'].to_numpy(np.int16),
+             'lat': lat.astype(np.float32), 'lon': lon.astype(np.float32), 'pref': pref.astype(np.int8)}
+    return df, attrs
+
+def make_tutors(seed, chunk, start, n, districts):
+    rng = chunk_rng(seed, "tutors", chunk)
+    bio = rng.integers(0, len(TUTOR_BIOS), n)
+    lat, lon = clustered_points(rng, n, districts)
+    gender = rng.integers(0, 2, n)
+    ids = np.arange(start + 1, start + n + 1)
+    df = pd.DataFrame({
+        'tutor_id': ids,
+        'tutor_name': pd.Series(ids).map("Tutor_{}".format),
+        'tutor_bio': np.asarray(TUTOR_BIOS, dtype=object)[bio],
+        'tutor_rate': rng.integers(30, 150, n),
+        'tutor_lat': lat,
+        'tutor_lon': lon,
+        'gender': GENDERS[gender],
+    })
+    attrs = {'subject': TUTOR_SUBJECT[bio].astype(np.int8), 'rate': df['tutor_rate'].to_numpy(np.int16),
+             'lat': lat.astype(np.float32), 'lon': lon.astype(np.float32), 'gender': gender.astype(np.int8),
+             'quality': rng.normal(0, 0.7, n).astype(np.float32)}
+    return df, attrs
+
+_RESULTS_STATE = {}
 
-tutors = pd.DataFrame({
-    'tutor_id': range(1, num_tutors + 1),
-    'tutor_name': [f"Tutor_{i}" for i in range(1, num_tutors + 1)],
-    'tutor_bio': np.random.choice(tutor_bios, num_tutors),
-    'tutor_rate': np.random.randint(30, 150, num_tutors),
-    'tutor_lat': np.random.uniform(22.28, 22.35, num_tutors),
-    'tutor_lon': np.random.uniform(114.15, 114.25, num_tutors),
-    'gender': np.random.choice(["Male", "Female"], num_tutors)
-})
+def init_results_worker(case_attrs, tutor_attrs, seed, tutor_zipf):
+    """Per-process state for results chunks: attribute arrays and the hot-tutor CDF."""
+    n_tutors = len(tutor_attrs['rate'])
+    # Which tutors are hot is a fixed permutation; popularity follows Zipf over that order
+    order = np.random.default_rng([seed, 7]).permutation(n_tutors)
+    weights = 1.0 / np.arange(1, n_tutors + 1) ** tutor_zipf
+    _RESULTS_STATE.update(cases=case_attrs, tutors=tutor_attrs, order=order,
+                          cdf=np.cumsum(weights) / weights.sum())
 
-tutors.to_csv("data/raw/tutors.csv", index=False)
-print("✅ tutors.csv generated")
+def make_results(seed, chunk, start, n):
+    s = _RESULTS_STATE
+    rng = chunk_rng(seed, "results", chunk)
+    c = rng.integers(0, len(s['cases']['budget']), n)
+    t = s['order'][np.minimum(np.searchsorted(s['cdf'], rng.random(n)), len(s['order']) - 1)]
+    cases, tutors = s['cases'], s['tutors']
+    dist = haversine_np(cases['lat'][c], cases['lon'][c], tutors['lat'][t], tutors['lon'][t])
+    gender_ok = (cases['pref'][c] == 2) | (cases['pref'][c] == tutors['gender'][t])
+    logit = (1.2 + 1.8 * (cases['subject'][c] == tutors['subject'][t])
+             - 0.02 * np.abs(tutors['rate'][t].astype(np.float32) - cases['budget'][c])
+             - 0.12 * dist + 0.6 * gender_ok + tutors['quality'][t])
+    success = rng.random(n) < 1.0 / (1.0 + np.exp(-logit))
+    df = pd.DataFrame({'case_id': c + 1, 'tutor_id': t + 1, 'success': success.astype(np.int8)})
+    return df, None
 
 # -----------------------------
-# 3️⃣ Generate dummy results (historical matches)
+# Chunked writing
 # -----------------------------
-num_results = 200  # number of historical match records
+def write_part(df, parts_dir, table, chunk, formats):
+    for fmt in formats:
+        path = os.path.join(parts_dir, f"{table}-{chunk:06d}.{fmt}")
+        if fmt == "csv":
+            df.to_csv(path, index=False, header=(chunk == 0))
+        else:
+            df.to_parquet(path, index=False)
+
+def run_chunk(kind, seed, chunk, start, n, parts_dir, formats, districts=None):
+    if kind == "results":
+        df, attrs = make_results(seed, chunk, start, n)
+    else:
+        df, attrs = (make_cases if kind == "cases" else make_tutors)(seed, chunk, start, n, districts)
+    write_part(df, parts_dir, kind, chunk, formats)
+    return attrs
+
+def join_parts(parts_dir, table, out_dir, formats):
+    for fmt in formats:
+        parts = sorted(glob.glob(os.path.join(parts_dir, f"{table}-*.{fmt}")))
+        target = os.path.join(out_dir, f"{table}.{fmt}")
+        if fmt == "csv":
+            with open(target, "wb") as out:
+                for part in parts:
+                    with open(part, "rb") as f:
+                        shutil.copyfileobj(f, out, 16 << 20)
+        else:
+            import pyarrow.parquet as pq
+            writer = None
+            for part in parts:
+                table_part = pq.read_table(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, table_part.schema)
+                writer.write_table(table_part)
+            if writer is not None:
+                writer.close()
+
+def chunks_of(total, chunk_size):
+    """(chunk, start, n) triples; an empty table is one empty chunk, so its file still gets a header/schema."""
+    if total == 0:
+        return [(0, 0, 0)]
+    return [(i, start, min(chunk_size, total - start)) for i, start in enumerate(range(0, total, chunk_size))]
+
+def concat_attrs(parts):
+    if not parts:
+        return {}
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=100)
+    parser.add_argument("--tutors", type=int, default=50)
+    parser.add_argument("--results", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "parquet", "both"], default="csv")
+    parser.add_argument("--out", default="data/raw")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--tutor-skew", type=float, default=0.8, help="Zipf exponent of tutor popularity")
+    args = parser.parse_args()
+    if args.results and not (args.cases and args.tutors):
+        parser.error("--results needs at least one case and one tutor")
+
+    formats = ["csv", "parquet"] if args.format == "both" else [args.format]
+    parts_dir = os.path.join(args.out, ".parts")
+    shutil.rmtree(parts_dir, ignore_errors=True)  # leftovers from an interrupted run
+    os.makedirs(parts_dir)
+    districts = make_districts(args.seed)
+    start_time = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        attrs = {}
+        for kind, total in (("cases", args.cases), ("tutors", args.tutors)):
+            futures = [pool.submit(run_chunk, kind, args.seed, i, start, n, parts_dir, formats, districts)
+                       for i, start, n in chunks_of(total, args.chunk_size)]
+            attrs[kind] = concat_attrs([f.result() for f in futures])
+            join_parts(parts_dir, kind, args.out, formats)
+            print(f"✅ {kind} generated ({total:,} rows)")
+
+    # Results workers get the case/tutor attributes once, through the initializer
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_results_worker,
+                             initargs=(attrs["cases"], attrs["tutors"], args.seed, args.tutor_skew)) as pool:
+        futures = [pool.submit(run_chunk, "results", args.seed, i, start, n, parts_dir, formats)
+                   for i, start, n in chunks_of(args.results, args.chunk_size)]
+        for f in futures:
+            f.result()
+    join_parts(parts_dir, "results", args.out, formats)
+    print(f"✅ results generated ({args.results:,} rows)")
 
-results = pd.DataFrame({
-    'case_id': np.random.choice(cases['case_id'], num_results),
-    'tutor_id': np.random.choice(tutors['tutor_id'], num_results),
-    'success': np.random.choice([0, 1], num_results, p=[0.3, 0.7])  # 70% success rate
-})
+    shutil.rmtree(parts_dir)
+    print(f"\nAll dummy datasets are ready in {args.out}/ ({time.perf_counter() - start_time:.1f}s)")
 
-results.to_csv("data/raw/results.csv", index=False)
-print("✅ results.csv generated")
 
-print("\nAll dummy datasets are ready in data/raw/")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Rank tutors for a whole file of cases and write the top K per case.
+
+Run from the project root:
+    python -m scripts.batch_score data/raw/cases.csv recommendations.csv --k 10
+    python -m scripts.batch_score queue.parquet out.parquet --workers 8 --max-km 10
+
+Input needs case_id, case_budget, case_lat, case_lon and optionally
+preferred_gender (defaults to "Any"). Cases are read and scored in chunks. Each
+process loads the model, scaler and tutor feature store once and reuses them
+for every chunk. Output rows are case_id, rank, tutor_id, tutor_name,
+tutor_rate and ai_score, written in input order as chunks finish.
+"""
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.config import FEATURE_STORE_PATH, MODEL_PATH
+from src.batch_scoring import RecommendationWriter, init_worker, iter_case_chunks, score_chunk
+from src.feature_store import get_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("cases", help="CSV or Parquet file of cases")
+    parser.add_argument("output", help="CSV or Parquet file to write")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="cases per chunk; defaults to ~2M (case, tutor) pairs per chunk")
+    parser.add_argument("--max-km", type=float, default=None, help="only rank tutors within this distance")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    n_tutors = len(get_store())  # builds the saved store if tutors.csv changed
+    chunk_size = args.chunk_size or max(1, 2_000_000 // n_tutors)
+    chunks = iter_case_chunks(args.cases, chunk_size=chunk_size)
+
+    start = time.perf_counter()
+    n_cases = 0
+    with RecommendationWriter(args.output) as writer:
+        if args.workers <= 1:
+            init_worker(args.model, FEATURE_STORE_PATH, args.max_km)
+            for cases in chunks:
+                writer.write(score_chunk(cases, args.k))
+                n_cases += len(cases)
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                     initargs=(args.model, FEATURE_STORE_PATH, args.max_km)) as pool:
+                # Keep a bounded number of chunks in flight so memory stays flat on huge inputs
+                pending = deque()
+                for cases in chunks:
+                    pending.append((len(cases), pool.submit(score_chunk, cases, args.k)))
+                    if len(pending) >= 2 * args.workers:
+                        size, future = pending.popleft()
+                        writer.write(future.result())
+                        n_cases += size
+                while pending:
+                    size, future = pending.popleft()
+                    writer.write(future.result())
+                    n_cases += size
+    elapsed = time.perf_counter() - start
+
+    print(f"Ranked {n_cases} cases against {n_tutors} tutors in {elapsed:.1f}s "
+          f"({n_cases / elapsed:.1f} cases/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
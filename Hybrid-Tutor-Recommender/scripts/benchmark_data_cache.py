@@ -0,0 +1,101 @@
+"""
+Load time and memory of the Parquet cache versus the CSV path.
+
+Run from the project root:
+    python -m scripts.benchmark_data_cache --results 100000 1000000
+
+Synthetic raw CSVs are written to a temporary directory. For each size it reports:
+  * csv: load_data + merge_datasets + preprocess (what a cache miss used to cost)
+  * merged csv: pd.read_csv of the merged table (the old data/processed fallback)
+  * cold: first load_merged call, which builds the cache
+  * warm: load_merged with unchanged inputs
+  * append: load_merged after appending 1% new rows to results.csv
+Memory is the frame's deep memory usage.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data_cache import load_merged
+from src.data_pipeline import load_data, merge_datasets, preprocess
+
+
+def write_raw(raw_path, n_results, seed=42):
+    rng = np.random.default_rng(seed)
+    n_cases = max(100, n_results // 2)
+    n_tutors = max(50, n_results // 20)
+    descriptions = ["A-Level Physics student, SEN-friendly", "IB Math tutoring required",
+                    "GCSE Chemistry tutoring, online", "English tutoring, SEN-friendly"]
+    bios = ["Experienced Physics tutor, SEN-friendly", "Math tutor, IB and A-Level",
+            "Chemistry tutor with exam success", "English tutor, SEN-friendly"]
+    pd.DataFrame({
+        'case_id': np.arange(1, n_cases + 1),
+        'case_description': rng.choice(descriptions, n_cases),
+        'case_budget': rng.integers(30, 150, n_cases),
+        'case_lat': rng.uniform(22.28, 22.35, n_cases),
+        'case_lon': rng.uniform(114.15, 114.25, n_cases),
+        'preferred_gender': rng.choice(["Male", "Female", "Any"], n_cases),
+    }).to_csv(os.path.join(raw_path, "cases.csv"), index=False)
+    pd.DataFrame({
+        'tutor_id': np.arange(1, n_tutors + 1),
+        'tutor_name': [f"Tutor_{i}" for i in range(1, n_tutors + 1)],
+        'tutor_bio': rng.choice(bios, n_tutors),
+        'tutor_rate': rng.integers(30, 150, n_tutors),
+        'tutor_lat': rng.uniform(22.28, 22.35, n_tutors),
+        'tutor_lon': rng.uniform(114.15, 114.25, n_tutors),
+        'gender': rng.choice(["Male", "Female"], n_tutors),
+    }).to_csv(os.path.join(raw_path, "tutors.csv"), index=False)
+    results = lambda n: pd.DataFrame({
+        'case_id': rng.integers(1, n_cases + 1, n),
+        'tutor_id': rng.integers(1, n_tutors + 1, n),
+        'success': rng.integers(0, 2, n),
+    })
+    results(n_results).to_csv(os.path.join(raw_path, "results.csv"), index=False)
+    return results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'results':>10} {'csv s':>7} {'merged csv s':>13} {'cold s':>7} {'warm s':>7} {'append s':>9}"
+          f" {'csv MB':>8} {'cache MB':>9}")
+    for n in args.results:
+        with tempfile.TemporaryDirectory() as tmp:
+            raw, cache = os.path.join(tmp, "raw"), os.path.join(tmp, "cache")
+            os.makedirs(raw)
+            more_results = write_raw(raw, n)
+
+            csv_s, csv_df = timed(lambda: preprocess(merge_datasets(*load_data(raw))))
+            merged_csv = os.path.join(tmp, "merged.csv")
+            csv_df.to_csv(merged_csv, index=False)
+            merged_csv_s, _ = timed(lambda: pd.read_csv(merged_csv))
+
+            cold_s, _ = timed(lambda: load_merged(raw, cache))
+            warm_s, warm_df = timed(lambda: load_merged(raw, cache))
+
+            more_results(max(1, n // 100)).to_csv(os.path.join(raw, "results.csv"), mode="a",
+                                                  header=False, index=False)
+            append_s, _ = timed(lambda: load_merged(raw, cache))
+
+            print(f"{n:>10,} {csv_s:7.2f} {merged_csv_s:13.2f} {cold_s:7.2f} {warm_s:7.2f} {append_s:9.2f}"
+                  f" {mb(csv_df):8.1f} {mb(warm_df):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Load time and memory of the memory-mapped embedding store against the row-aligned .npy.
+
+Run from the project root:
+    python -m scripts.benchmark_embedding_store --tutors 100000 1000000 --k 500
+
+For each pool size a fresh process loads the tutor embeddings and gathers the
+vectors of `k` candidate tutors, the way two-stage ranking does:
+  * npy:      np.load of the float64 row-aligned array, tail slice, one vector per tutor
+  * mmap f32: EmbeddingStore (float32), tutor_id lookup, gather of the candidates
+  * mmap f16: the same with float16 vectors
+Reports load seconds, gather milliseconds and the child's peak RSS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from src.embedding_store import EmbeddingStore
+
+CHILD_CODE = """
+import json, sys, time
+import numpy as np
+mode, path, n_rows, k = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+ids = np.random.default_rng(0).choice(np.arange(n_rows // 2), size=k, replace=False)
+start = time.perf_counter()
+if mode == "npy":
+    import pandas as pd
+    from src.feature_store import per_tutor_embeddings
+    row_tutor_ids = np.load(path + ".rows.npy")
+    embeddings = np.load(path + ".npy")[-n_rows:]
+    vectors = per_tutor_embeddings(row_tutor_ids, embeddings, np.unique(row_tutor_ids))
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    candidates = vectors[ids]
+else:
+    from src.embedding_store import EmbeddingStore
+    store = EmbeddingStore(path)
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    candidates = store.get(ids)
+gather_ms = (time.perf_counter() - start) * 1000
+# VmHWM, not ru_maxrss: the latter keeps the parent's high-water mark across fork + exec
+with open("/proc/self/status") as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+print(json.dumps({"load_s": load_s, "gather_ms": gather_ms, "peak_rss_mb": peak_kb / 1024}))
+"""
+
+
+def write_fixtures(root, n_tutors, dim, rows_per_tutor=2, seed=42):
+    """Legacy row-aligned .npy (one row per result) and float32/float16 stores of the same tutors."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n_tutors, dim)).astype(np.float32)
+    row_tutor_ids = np.repeat(np.arange(n_tutors), rows_per_tutor)
+    np.save(os.path.join(root, "legacy.rows.npy"), row_tutor_ids)
+    np.save(os.path.join(root, "legacy.npy"), vectors[row_tutor_ids].astype(np.float64))
+    for dtype in ("float32", "float16"):
+        store = EmbeddingStore.create(os.path.join(root, dtype), dim, dtype)
+        for start in range(0, n_tutors, 100_000):
+            store.upsert(np.arange(start, min(start + 100_000, n_tutors)), vectors[start:start + 100_000])
+    return len(row_tutor_ids)
+
+
+def run_child(mode, path, n_rows, k):
+    out = subprocess.run([sys.executable, "-c", CHILD_CODE, mode, path, str(n_rows), str(k)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tutors", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=32)
+    parser.add_argument("--k", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'tutors':>9} {'path':>9} {'file MB':>8} {'load s':>8} {'gather ms':>10} {'peak RSS MB':>12}")
+    for n in args.tutors:
+        with tempfile.TemporaryDirectory() as root:
+            n_rows = write_fixtures(root, n, args.dim)
+            for label, mode, name, size_file in (("npy", "npy", "legacy", "legacy.npy"),
+                                                 ("mmap f32", "mmap", "float32", "float32.vec"),
+                                                 ("mmap f16", "mmap", "float16", "float16.vec")):
+                r = run_child(mode, os.path.join(root, name), n_rows, args.k)
+                size_mb = os.path.getsize(os.path.join(root, size_file)) / 2**20
+                print(f"{n:>9} {label:>9} {size_mb:>8.1f} {r['load_s']:>8.3f} {r['gather_ms']:>10.2f} "
+                      f"{r['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Explanation time versus number of explained rows.
+
+Run from the project root:
+    python -m scripts.benchmark_explanations --rows 10 100 1000 10000
+
+Compares the original path (new TreeExplainer per call, nested Python loops over
+every feature) with the cached explainer + argpartition top-k, and with
+XGBoost's native pred_contribs backend. The last column is what the rank path
+now pays: N rows scored, only the displayed top 10 explained.
+"""
+import argparse
+import time
+
+import numpy as np
+import shap
+
+from src.feature_store import NUMERIC_COLUMNS
+from src.ranking_model import explain_predictions_human, get_explainer, load_model
+
+
+def legacy_explain(model, X, feature_names):
+    explainer = shap.TreeExplainer(model)
+    shap_values = explainer.shap_values(X)
+    explanations = []
+    for row_idx in range(X.shape[0]):
+        impact = {}
+        for f_idx, f_name in enumerate(feature_names):
+            shap_val = shap_values[row_idx][f_idx]
+            if abs(shap_val) > 0.01:
+                impact[f_name] = shap_val
+        explanations.append(", ".join(f"{k} {'high' if v > 0 else 'low'}" for k, v in impact.items()))
+    return explanations
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--model", default="models/xgb_model.json")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    get_explainer(model)  # warm the cache, as the web app does after the first request
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>8} {'legacy ms':>10} {'shap top-k ms':>14} {'pred_contribs ms':>17} {'top-10 only ms':>15}")
+    for n in args.rows:
+        X = rng.normal(size=(n, model.n_features_in_))
+        legacy = best_of(lambda: legacy_explain(model, X, NUMERIC_COLUMNS))
+        cached = best_of(lambda: explain_predictions_human(model, X, NUMERIC_COLUMNS, top_k=args.top_k))
+        native = best_of(lambda: explain_predictions_human(model, X, NUMERIC_COLUMNS, top_k=args.top_k,
+                                                           backend="xgboost"))
+        top10 = best_of(lambda: explain_predictions_human(model, X[:10], NUMERIC_COLUMNS, top_k=args.top_k))
+        print(f"{n:>8,} {legacy:10.2f} {cached:14.2f} {native:17.2f} {top10:15.2f}")
+
+
+if __name__ == "__main__":
+    main()
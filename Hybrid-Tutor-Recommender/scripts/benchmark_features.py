@@ -0,0 +1,89 @@
+"""
+Memory and latency of FeatureSpec.transform against the frame-copy assembly it replaced.
+
+Run from the project root:
+    python -m scripts.benchmark_features --rows 100000 1000000
+
+Both paths build the scaled training matrix from the merged frame, tiled to the
+requested number of rows:
+  * legacy: the old encode_features + combine_features (frame copy, per-column
+            category codes, column drops, .values + np.hstack), reproduced
+            below as a baseline, then StandardScaler fit + transform
+  * spec:   FeatureSpec.transform into one float32 array, chunked scaler fit
+            (fit_scaler) + in-place transform
+Reports the best of --repeat wall times and the peak memory allocated by the
+call (tracemalloc, which sees NumPy and pandas buffers), plus the same for one
+serving-sized batch written into a reused buffer.
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from src.data_cache import load_merged
+from src.feature_spec import FeatureSpec, fit_scaler
+
+
+def legacy(df, embeddings):
+    df_enc = df.copy()
+    for col in ['preferred_gender', 'gender']:
+        df_enc[col] = df_enc[col].astype('category').cat.codes
+    df_enc = df_enc.drop(columns=['case_description', 'tutor_name', 'tutor_bio'], errors='ignore')
+    X = np.hstack([df_enc.drop(columns=['success', 'case_id', 'tutor_id'], errors='ignore').values, embeddings])
+    return StandardScaler().fit(X).transform(X)
+
+
+def compiled(spec, df, embeddings, out=None):
+    X = spec.transform(df, embeddings, out=out)
+    return fit_scaler(X).transform(X, copy=False)
+
+
+def measure(fn, repeat):
+    """(best seconds, peak MB allocated during one call)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def tiled(df, n_rows, emb_dim, seed=42):
+    """`df` repeated to n_rows, with row-aligned float64 embeddings (one vector per tutor)."""
+    df = df.iloc[np.resize(np.arange(len(df)), n_rows)].reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    ids, inverse = np.unique(df['tutor_id'].to_numpy(), return_inverse=True)
+    return df, rng.normal(size=(len(ids), emb_dim))[inverse]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--batch", type=int, default=1_000, help="serving batch rows")
+    parser.add_argument("--dim", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = load_merged()
+    spec = FeatureSpec.fit(base, args.dim)
+    print(f"{'rows':>9} {'legacy s':>9} {'spec s':>8} {'speedup':>8} {'legacy MB':>10} {'spec MB':>8} "
+          f"{'matrix MB':>10}")
+    for n in args.rows + [args.batch]:
+        df, embeddings = tiled(base, n, args.dim)
+        out = np.empty((n, spec.n_features), dtype=np.float32) if n == args.batch else None
+        t_old, m_old = measure(lambda: legacy(df, embeddings), args.repeat)
+        t_new, m_new = measure(lambda: compiled(spec, df, embeddings, out=out), args.repeat)
+        label = f"{n}*" if n == args.batch else str(n)
+        print(f"{label:>9} {t_old:>9.3f} {t_new:>8.3f} {t_old / t_new:>7.1f}x {m_old:>10.1f} {m_new:>8.1f} "
+              f"{n * spec.n_features * 4 / 2**20:>10.1f}")
+    print("* serving batch written into a reused buffer")
+
+
+if __name__ == "__main__":
+    main()
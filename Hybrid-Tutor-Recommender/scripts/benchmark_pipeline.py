@@ -0,0 +1,316 @@
+"""
+End-to-end benchmark of the recommender pipeline stages at several data sizes.
+
+Run from the project root:
+    python -m scripts.benchmark_pipeline --sizes 10000 100000 1000000
+    python -m scripts.benchmark_pipeline --baseline benchmarks/pipeline_<commit>.json --threshold 0.25
+    python -m scripts.benchmark_pipeline --sizes 10000 --stages cold_start
+
+Sizes are results rows. Cases are a quarter of that and tutors a twentieth, at
+least 50. Data comes from generate_dummy_data.py. Each (stage, size) runs in a
+fresh process, so peak RSS belongs to that stage and its setup alone. Only the
+stage call itself is timed; the best of --repeat runs is kept.
+
+cold_start times a fresh interpreter from the web app's imports to its first
+recommendation (streamlit itself excluded), and reports a `-X importtime`
+summary of the slowest top-level imports.
+
+Results go to benchmarks/pipeline_<commit>.json. With --baseline, any stage whose
+wall time grew by more than --threshold is reported and the exit code is 1.
+Stages under --min-seconds in both runs are too noisy and are not compared.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+STAGES = ["load_data", "merge_datasets", "preprocess", "embedding_reduction", "assemble_features", "train_model",
+          "rank_tutors", "shap_explanation", "bi_pricing", "bi_niche_discovery", "bi_local_supply",
+          "bi_aggregates", "cold_start"]
+
+# Same imports as web_app/app.py, then load the artifacts and rank one case
+COLD_START_CODE = """
+import sys
+import numpy as np
+import pandas as pd
+from src.data_cache import load_merged
+from src.embedding_store import EmbeddingStore, load_or_build_embedding_store
+from src.feature_spec import FeatureSpec
+from src.artifacts import (ArtifactVersionError, check_model_features, load_feature_spec, load_pca, load_scaler,
+                           save_feature_spec, save_scaler)
+from src.ranking_model import load_model, train_model, explain_predictions_human
+from src.feature_store import (NUMERIC_COLUMNS, TutorFeatureStore, case_feature_matrix, retrieve_and_score,
+                               score_case)
+from src.bi_reporting import local_supply, pricing_curves
+from src.retrieval import build_index
+from src.result_cache import ResultCache, case_key
+from src.tree_inference import HybridPredictor
+from src.spatial import build_spatial_index
+from src.embeddings import EmbeddingCache, embed_texts, reduce_embeddings
+
+model_path, scaler_path, manifest_path, store_path = sys.argv[1:5]
+model = load_model(model_path)
+scaler = load_scaler(model_path, scaler_path, manifest_path)
+store = TutorFeatureStore.load(store_path)
+scores, _ = score_case(HybridPredictor(model), store, scaler, 100, 22.3, 114.2, "Any")
+np.argsort(-scores)[:10]
+"""
+
+# -----------------------------
+# Memory
+# -----------------------------
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return float("nan")
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB on Linux
+
+# -----------------------------
+# Stage setup: returns (callable to time, rows processed per call)
+# -----------------------------
+def _merged(data_dir):
+    from src.data_pipeline import load_data, merge_datasets
+    return merge_datasets(*load_data(data_dir))
+
+def _features(data_dir, rng, max_rows=None):
+    from src.data_pipeline import preprocess
+    from src.feature_spec import FeatureSpec
+    df = preprocess(_merged(data_dir))
+    if max_rows:
+        df = df.iloc[:max_rows]
+    emb = rng.normal(size=(len(df), 32))
+    X = FeatureSpec.fit(df, emb.shape[1]).transform(df, emb)
+    return df, X, df['success'].to_numpy()
+
+def _small_model(X, y, tmp):
+    from sklearn.preprocessing import StandardScaler
+    from src.ranking_model import train_model
+    scaler = StandardScaler().fit(X)
+    return train_model(scaler.transform(X), y, save_path=os.path.join(tmp, "model.json")), scaler
+
+def _store(data_dir, rng):
+    import pandas as pd
+    from src.feature_store import build_feature_store
+    tutors = pd.read_csv(os.path.join(data_dir, "tutors.csv"))
+    categories = {'preferred_gender': ["Any", "Female", "Male"], 'gender': ["Female", "Male"]}
+    return build_feature_store(tutors, rng.normal(size=(len(tutors), 32)), categories)
+
+# -----------------------------
+# Import-time profile
+# -----------------------------
+def import_profile(stderr, top=10):
+    """Slowest top-level imports from `-X importtime` output: (module, cumulative s), plus the total."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):  # nested imports are indented
+            entries.append((name.strip(), int(cumulative) / 1e6))
+    total = sum(t for _, t in entries)
+    return sorted(entries, key=lambda e: -e[1])[:top], total
+
+def setup_stage(stage, data_dir, tmp):
+    rng = np.random.default_rng(0)
+    if stage == "load_data":
+        from src.data_pipeline import load_data
+        n = sum(1 for _ in open(os.path.join(data_dir, "results.csv"))) - 1
+        return (lambda: load_data(data_dir)), n
+    if stage == "merge_datasets":
+        from src.data_pipeline import load_data, merge_datasets
+        tables = load_data(data_dir)
+        return (lambda: merge_datasets(*tables)), len(tables[2])
+    if stage == "preprocess":
+        from src.data_pipeline import preprocess
+        df = _merged(data_dir)
+        return (lambda: preprocess(df.copy())), len(df)
+    if stage == "embedding_reduction":
+        from src.config import EMBED_DIM
+        from src.embeddings import reduce_embeddings
+        emb = rng.normal(size=(len(_merged(data_dir)), EMBED_DIM))
+        return (lambda: reduce_embeddings(emb)), len(emb)
+    if stage == "assemble_features":
+        from src.data_pipeline import preprocess
+        from src.feature_spec import FeatureSpec
+        df = preprocess(_merged(data_dir))
+        emb = rng.normal(size=(len(df), 32)).astype(np.float32)
+        spec = FeatureSpec.fit(df, emb.shape[1])
+        out = np.empty((len(df), spec.n_features), dtype=np.float32)
+        return (lambda: spec.transform(df, emb, out=out)), len(df)
+    if stage == "train_model":
+        from src.ranking_model import train_model
+        _, X, y = _features(data_dir, rng)
+        return (lambda: train_model(X, y, save_path=os.path.join(tmp, "train.json"))), len(y)
+
+    if stage == "bi_aggregates":
+        from src.bi_aggregates import update_aggregates
+        n = sum(1 for _ in open(os.path.join(data_dir, "results.csv"))) - 1
+        path = os.path.join(tmp, "aggregates.npz")
+        return (lambda: update_aggregates(data_dir, path, backend="pandas", rebuild=True)), n
+
+    # Scoring / explanation / BI stages share a model trained on up to 20k rows
+    df, X, y = _features(data_dir, rng, max_rows=20_000)
+    model, scaler = _small_model(X, y, tmp)
+    if stage == "cold_start":
+        from src.artifacts import save_scaler
+        paths = [os.path.join(tmp, name) for name in ("model.json", "scaler.pkl", "artifacts.json", "store.npz")]
+        save_scaler(scaler, paths[0], path=paths[1], manifest_path=paths[2])
+        _store(data_dir, rng).save(paths[3])
+        cmd = [sys.executable, "-c", COLD_START_CODE, *paths]
+        profiled = subprocess.run([sys.executable, "-X", "importtime", *cmd[1:]], capture_output=True,
+                                  text=True, check=True)
+        imports, total = import_profile(profiled.stderr)
+        def run():
+            subprocess.run(cmd, check=True)
+        run.extra = {"import_s": total, "slowest_imports": imports}
+        return run, 1
+    if stage == "rank_tutors":
+        from src.feature_store import score_case
+        store = _store(data_dir, rng)
+        queries = [(int(b), float(la), float(lo)) for b, la, lo in
+                   zip(rng.integers(30, 150, 20), rng.uniform(22.25, 22.45, 20), rng.uniform(114.0, 114.25, 20))]
+        def run():
+            for budget, lat, lon in queries:
+                scores, _ = score_case(model, store, scaler, budget, lat, lon, "Any")
+                np.argsort(-scores)[:10]
+        return run, len(store) * len(queries)
+    if stage == "shap_explanation":
+        from src.ranking_model import feature_contributions
+        Xs = scaler.transform(X[:2_000])
+        return (lambda: feature_contributions(model, Xs)), len(Xs)
+    if stage == "bi_pricing":
+        from src.bi_reporting import pricing_curves
+        from src.feature_store import NUMERIC_COLUMNS
+        budgets = list(range(30, 160, 10))
+        kw = dict(scaler=scaler, budget_col=NUMERIC_COLUMNS.index('case_budget'),
+                  price_gap_col=NUMERIC_COLUMNS.index('price_gap'), rate_col=NUMERIC_COLUMNS.index('tutor_rate'))
+        return (lambda: pricing_curves(model, X, budgets, **kw)), len(X) * len(budgets)
+    if stage == "bi_niche_discovery":
+        from src.bi_reporting import niche_discovery
+        merged = _merged(data_dir)
+        return (lambda: niche_discovery(merged)), len(merged)
+    if stage == "bi_local_supply":
+        import pandas as pd
+        from src.bi_reporting import local_supply
+        from src.spatial import build_spatial_index
+        cases = pd.read_csv(os.path.join(data_dir, "cases.csv"))
+        index = build_spatial_index(_store(data_dir, rng))
+        return (lambda: local_supply(cases, index, radius_km=2.0)), len(cases)
+    raise ValueError(f"unknown stage {stage}")
+
+def run_stage(stage, data_dir, repeat):
+    """Runs in a fresh process: set up the stage, then time `repeat` calls."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fn, rows = setup_stage(stage, data_dir, tmp)
+        rss_before = current_rss_mb()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    wall = min(times)
+    return {"stage": stage, "wall_s": wall, "rows": rows, "rows_per_s": rows / wall if wall > 0 else float("inf"),
+            "rss_before_mb": rss_before, "peak_rss_mb": peak_rss_mb(), **getattr(fn, "extra", {})}
+
+# -----------------------------
+# Data, metadata, comparison
+# -----------------------------
+def generate(size, out_dir, seed):
+    cmd = [sys.executable, "generate_dummy_data.py", "--out", out_dir, "--seed", str(seed),
+           "--results", str(size), "--cases", str(max(100, size // 4)), "--tutors", str(max(50, size // 20))]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def metadata():
+    import pandas as pd
+    import sklearn
+    import xgboost
+    return {"commit": git_commit(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "pandas": pd.__version__, "sklearn": sklearn.__version__,
+            "xgboost": xgboost.__version__}
+
+def compare(results, baseline_path, threshold, min_seconds):
+    """Regressions as (stage, size, old, new) where wall time grew by more than `threshold`."""
+    with open(baseline_path) as f:
+        baseline = {(r["stage"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\n{'stage':<20} {'size':>10} {'base s':>9} {'new s':>9} {'change':>8}")
+    for r in results:
+        old = baseline.get((r["stage"], r["size"]))
+        if old is None:
+            continue
+        change = r["wall_s"] / old["wall_s"] - 1 if old["wall_s"] > 0 else 0.0
+        flag = ""
+        if change > threshold and max(r["wall_s"], old["wall_s"]) >= min_seconds:
+            regressions.append((r["stage"], r["size"], old["wall_s"], r["wall_s"]))
+            flag = "  REGRESSION"
+        print(f"{r['stage']:<20} {r['size']:>10,} {old['wall_s']:9.4f} {r['wall_s']:9.4f} {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="defaults to benchmarks/pipeline_<commit>.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.05)
+    args = parser.parse_args()
+
+    meta = metadata()
+    results = []
+    spawn = multiprocessing.get_context("spawn")
+    print(f"{'stage':<20} {'size':>10} {'wall s':>9} {'rows/s':>12} {'peak RSS MB':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            generate(size, data_dir, args.seed)
+            for stage in args.stages:
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    r = pool.submit(run_stage, stage, data_dir, args.repeat).result()
+                r["size"] = size
+                results.append(r)
+                print(f"{stage:<20} {size:>10,} {r['wall_s']:9.4f} {r['rows_per_s']:12,.0f} {r['peak_rss_mb']:12.1f}")
+                if "slowest_imports" in r:
+                    print(f"    imports {r['import_s']:.2f}s; slowest top-level (cumulative):")
+                    for name, seconds in r["slowest_imports"]:
+                        print(f"      {name:<40} {seconds:7.3f}")
+
+    output = args.output or os.path.join("benchmarks", f"pipeline_{meta['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Recall@K and latency of retrieve-then-rank against brute-force scoring.
+
+Run from the project root:
+    python -m scripts.benchmark_retrieval --tutors 10000 50000 --k 200
+
+Tutor embeddings are drawn from a clustered Gaussian mixture so the ANN index has
+structure to exploit. Reports:
+  * ann recall@K: overlap of IVF top-K with exact cosine top-K
+  * final overlap@10: overlap of the two-stage top-10 with brute-force XGBoost top-10
+  * per-query latency of both paths
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from src.feature_store import (NUMERIC_COLUMNS, build_feature_store, case_feature_matrix,
+                               retrieve_and_score, score_case)
+from src.ranking_model import load_model
+from src.retrieval import ExactIndex, build_index, recall_at_k
+
+
+def make_store(n, dim, n_clusters=64, seed=42):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    emb = centers[rng.integers(0, n_clusters, n)] + 0.3 * rng.normal(size=(n, dim))
+    tutors = pd.DataFrame({
+        'tutor_id': np.arange(n),
+        'tutor_name': [f"Tutor_{i}" for i in range(n)],
+        'tutor_rate': rng.integers(30, 150, n),
+        'tutor_lat': rng.uniform(22.28, 22.35, n),
+        'tutor_lon': rng.uniform(114.15, 114.25, n),
+        'gender': rng.choice(["Male", "Female"], n),
+    })
+    categories = {'preferred_gender': ["Any", "Female", "Male"], 'gender': ["Female", "Male"]}
+    return build_feature_store(tutors, emb, categories), centers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tutors", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--k", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--backend", default="ivf", choices=["ivf", "faiss"])
+    parser.add_argument("--model", default="models/xgb_model.json")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    dim = model.n_features_in_ - len(NUMERIC_COLUMNS)
+    rng = np.random.default_rng(0)
+
+    print(f"{'tutors':>8} {'build s':>8} {'ann recall@K':>13} {'final overlap@10':>17} "
+          f"{'brute ms':>9} {'2-stage ms':>11}")
+    for n in args.tutors:
+        store, centers = make_store(n, dim)
+        scaler = StandardScaler().fit(case_feature_matrix(store, 100, 22.31, 114.2, "Any"))
+
+        start = time.perf_counter()
+        index = build_index(store.embeddings, backend=args.backend, nprobe=args.nprobe)
+        build_s = time.perf_counter() - start
+        exact = ExactIndex().fit(store.embeddings)
+
+        recalls, overlaps, brute_t, two_t = [], [], [], []
+        for _ in range(args.queries):
+            query = centers[rng.integers(len(centers))] + 0.3 * rng.normal(size=dim)
+            budget = int(rng.integers(30, 200))
+
+            recalls.append(recall_at_k(index.search(query, args.k)[0], exact.search(query, args.k)[0]))
+
+            start = time.perf_counter()
+            scores, _ = score_case(model, store, scaler, budget, 22.31, 114.2, "Any")
+            brute_top = store.tutor_ids[np.argsort(-scores)[:10]]
+            brute_t.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cand, cand_scores, _ = retrieve_and_score(model, store, scaler, index, query, args.k,
+                                                      budget, 22.31, 114.2, "Any")
+            two_top = cand.tutor_ids[np.argsort(-cand_scores)[:10]]
+            two_t.append(time.perf_counter() - start)
+
+            overlaps.append(recall_at_k(two_top, brute_top))
+
+        print(f"{n:>8,} {build_s:8.2f} {np.mean(recalls):13.3f} {np.mean(overlaps):17.3f} "
+              f"{np.median(brute_t) * 1000:9.2f} {np.median(two_t) * 1000:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
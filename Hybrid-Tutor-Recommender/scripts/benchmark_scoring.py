@@ -0,0 +1,94 @@
+"""
+Per-request latency of the tutor feature store versus the legacy rank path.
+
+Run from the project root:
+    python -m scripts.benchmark_scoring --tutors 50 1000 10000 --requests 200
+
+The legacy path copies the merged frame, re-encodes it, re-stacks embeddings and
+refits a StandardScaler on every request; the store path broadcasts the case
+against prebuilt tutor arrays and calls predict_proba once.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from src.feature_store import (NUMERIC_COLUMNS, build_feature_store, case_feature_matrix,
+                               category_vocab, score_case)
+from src.ranking_model import load_model
+
+
+def make_history(n_tutors, emb_dim, seed=42):
+    rng = np.random.default_rng(seed)
+    tutors = pd.DataFrame({
+        'tutor_id': np.arange(1, n_tutors + 1),
+        'tutor_name': [f"Tutor_{i}" for i in range(1, n_tutors + 1)],
+        'tutor_rate': rng.integers(30, 150, n_tutors),
+        'tutor_lat': rng.uniform(22.28, 22.35, n_tutors),
+        'tutor_lon': rng.uniform(114.15, 114.25, n_tutors),
+        'gender': rng.choice(["Male", "Female"], n_tutors),
+    })
+    # One historical row per tutor, so the legacy path scores the same N rows
+    df = pd.DataFrame({
+        'case_id': np.arange(1, n_tutors + 1),
+        'case_budget': rng.integers(30, 150, n_tutors),
+        'case_lat': rng.uniform(22.28, 22.35, n_tutors),
+        'case_lon': rng.uniform(114.15, 114.25, n_tutors),
+        'preferred_gender': rng.choice(["Male", "Female", "Any"], n_tutors),
+        'tutor_id': tutors['tutor_id'],
+        'success': rng.integers(0, 2, n_tutors),
+    }).merge(tutors, on='tutor_id')
+    df['distance_km'] = 0.0
+    df['price_gap'] = (df['tutor_rate'] - df['case_budget']).abs()
+    embeddings = rng.random((n_tutors, emb_dim))
+    return tutors, df, embeddings
+
+
+def legacy_rank(df, model, embeddings, budget):
+    df_temp = df.copy()
+    df_temp['case_budget'] = budget
+    for col in ['preferred_gender', 'gender']:
+        df_temp[col] = df_temp[col].astype('category').cat.codes
+    df_temp = df_temp.drop(columns=['tutor_name'])
+    X_numeric = df_temp.drop(columns=['success', 'case_id', 'tutor_id']).values
+    X = StandardScaler().fit_transform(np.hstack([X_numeric, embeddings]))
+    return model.predict_proba(X)[:, 1]
+
+
+def latency_ms(fn, n_requests):
+    times = np.empty(n_requests)
+    for i in range(n_requests):
+        start = time.perf_counter()
+        fn(i)
+        times[i] = time.perf_counter() - start
+    return np.percentile(times, [50, 99]) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tutors", type=int, nargs="+", default=[50, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--model", default="models/xgb_model.json")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    emb_dim = model.n_features_in_ - len(NUMERIC_COLUMNS)
+    budgets = np.random.default_rng(0).integers(30, 200, args.requests)
+
+    print(f"{'tutors':>8} {'legacy p50':>11} {'legacy p99':>11} {'store p50':>10} {'store p99':>10}  (ms)")
+    for n in args.tutors:
+        tutors, df, embeddings = make_history(n, emb_dim)
+        store = build_feature_store(tutors, embeddings, category_vocab(df))
+        X_train = np.vstack([case_feature_matrix(store, b, 22.31, 114.2, "Any") for b in (50, 100, 150)])
+        scaler = StandardScaler().fit(X_train)
+
+        legacy = latency_ms(lambda i: legacy_rank(df, model, embeddings, budgets[i]), args.requests)
+        stored = latency_ms(lambda i: score_case(model, store, scaler, budgets[i], 22.31, 114.2, "Any"),
+                            args.requests)
+        print(f"{n:>8,} {legacy[0]:11.2f} {legacy[1]:11.2f} {stored[0]:10.2f} {stored[1]:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
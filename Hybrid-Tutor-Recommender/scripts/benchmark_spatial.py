@@ -0,0 +1,63 @@
+"""
+Query latency of the tutor spatial index against a brute-force distance scan.
+
+Run from the project root:
+    python -m scripts.benchmark_spatial --tutors 1000 100000 1000000 --km 2
+
+Tutors are spread uniformly over a Hong Kong-sized box. For each pool size the
+grid and BallTree backends are built once, then timed on tutors_within and
+k_nearest_tutors for random case locations. The brute-force column is
+haversine_np against every tutor followed by a filter, which is what scoring
+does today without pruning.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.data_pipeline import haversine_np
+from src.spatial import TutorSpatialIndex
+
+
+def timed(fn, queries):
+    times = []
+    for lat, lon in queries:
+        start = time.perf_counter()
+        fn(lat, lon)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000, np.percentile(times, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tutors", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--km", type=float, default=2.0)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = list(zip(rng.uniform(22.2, 22.5, args.queries), rng.uniform(113.9, 114.4, args.queries)))
+
+    print(f"{'tutors':>10} {'backend':>9} {'build s':>8} {'within p50/p99 ms':>18} "
+          f"{'knn p50/p99 ms':>15} {'avg hits':>9}")
+    for n in args.tutors:
+        lat = rng.uniform(22.2, 22.5, n)
+        lon = rng.uniform(113.9, 114.4, n)
+
+        p50, p99 = timed(lambda a, b: np.flatnonzero(haversine_np(a, b, lat, lon) <= args.km), queries)
+        print(f"{n:>10,} {'brute':>9} {0:8.2f} {p50:8.3f}/{p99:<9.3f} {'-':>15} {'-':>9}")
+
+        for backend in ("grid", "balltree"):
+            start = time.perf_counter()
+            index = TutorSpatialIndex(lat, lon, backend=backend)
+            build_s = time.perf_counter() - start
+            hits = np.mean([len(index.tutors_within(a, b, args.km)[0]) for a, b in queries[:20]])
+            w50, w99 = timed(lambda a, b: index.tutors_within(a, b, args.km), queries)
+            k50, k99 = timed(lambda a, b: index.k_nearest_tutors(a, b, args.k), queries)
+            print(f"{n:>10,} {backend:>9} {build_s:8.2f} {w50:8.3f}/{w99:<9.3f} "
+                  f"{k50:6.3f}/{k99:<8.3f} {hits:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Latency of the compiled tree ensemble against XGBoost's native predictor.
+
+Run from the project root:
+    python -m scripts.benchmark_tree_inference --batch-sizes 1 10 100 1000 10000 100000
+
+Rows are standard-normal feature vectors, which is what the scaler produces, with
+a few NaNs mixed in. Each backend is timed per call (median over repeats), and
+its max absolute probability difference from predict_proba is reported.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.ranking_model import load_model
+from src.tree_inference import NUMBA_AVAILABLE, compile_model
+
+
+def median_ms(fn, X, min_time=0.2, max_repeats=200):
+    fn(X)  # warm-up (and JIT compile for numba)
+    times = []
+    while len(times) < 3 or (sum(times) < min_time and len(times) < max_repeats):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--model", default="models/xgb_model.json")
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    backends = {"native": lambda X: model.predict_proba(X)[:, 1]}
+    for name in ("numpy", "numba") if NUMBA_AVAILABLE else ("numpy",):
+        compiled = compile_model(model, backend=name)
+        backends[name] = lambda X, c=compiled: c.predict_proba(X)[:, 1]
+
+    rng = np.random.default_rng(0)
+    print(f"trees: {model.get_booster().num_boosted_rounds()}, features: {model.n_features_in_}")
+    print(f"{'batch':>8} " + " ".join(f"{name + ' ms':>12}" for name in backends) + f" {'max |diff|':>11}")
+    for n in args.batch_sizes:
+        X = rng.normal(size=(n, model.n_features_in_))
+        X[rng.random(X.shape) < 0.01] = np.nan
+        reference = backends["native"](X)
+        diff = max(np.abs(fn(X) - reference).max() for name, fn in backends.items() if name != "native")
+        timings = [median_ms(fn, X) for fn in backends.values()]
+        print(f"{n:>8,} " + " ".join(f"{t:12.3f}" for t in timings) + f" {diff:11.2e}")
+
+
+if __name__ == "__main__":
+    main()
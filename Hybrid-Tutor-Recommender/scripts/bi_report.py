@@ -0,0 +1,60 @@
+"""
+Supply-gap and niche reports over the full results history, out of core.
+
+Run from the project root:
+    python -m scripts.bi_report
+    python -m scripts.bi_report --raw data/bench --backend duckdb --rebuild --output reports/
+
+The aggregate tables (data/processed/aggregates/aggregates.npz) are brought up
+to date first: rows appended to results.csv since the last run are streamed
+and folded in, anything else rebuilds them with --backend (duckdb or polars
+when installed, else chunked pandas). The reports are then read off the
+tables, so memory stays bounded by the number of locations and tutors.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from src.config import BI_AGGREGATES_PATH, RAW_DATA_PATH
+from src.bi_aggregates import resolve_backend, update_aggregates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--raw", default=RAW_DATA_PATH)
+    parser.add_argument("--tables", default=os.path.join(BI_AGGREGATES_PATH, "aggregates.npz"))
+    parser.add_argument("--backend", default="auto", choices=["auto", "duckdb", "polars", "pandas"])
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="results rows per pandas chunk")
+    parser.add_argument("--location-km", type=float, default=2.0, help="size of the location grid cells")
+    parser.add_argument("--min-requests", type=int, default=20, help="ignore cells with fewer requests")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--output", default=None, help="directory for supply_gap.csv and niches.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tables, mode = update_aggregates(args.raw, args.tables, backend=args.backend, chunk_size=args.chunk_size,
+                                     location_km=args.location_km, rebuild=args.rebuild)
+    via = f" ({resolve_backend(args.backend)})" if mode == "full" else ""
+    print(f"Aggregates {mode}{via}: {tables.rows:,} result rows, "
+          f"{len(tables.locations):,} locations, {time.perf_counter() - start:.1f}s")
+
+    supply_gap = tables.supply_gap()
+    niches = tables.niches(pd.read_csv(os.path.join(args.raw, "tutors.csv"), usecols=['tutor_id', 'tutor_bio']))
+    weakest = supply_gap[supply_gap['request_count'] >= args.min_requests]
+    print(f"\nWeakest supply (>= {args.min_requests} requests):")
+    print(weakest.sort_values('failure_rate', ascending=False).head(args.top).to_string())
+    print("\nNiches (tutors with results):")
+    print(niches.to_string())
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        supply_gap.to_csv(os.path.join(args.output, "supply_gap.csv"))
+        niches.to_csv(os.path.join(args.output, "niches.csv"))
+        print(f"\nSaved reports to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
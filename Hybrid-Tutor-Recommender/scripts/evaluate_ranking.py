@@ -0,0 +1,96 @@
+"""
+Compare pointwise and learning-to-rank objectives on ranking quality per case.
+
+Run from the project root:
+    python -m scripts.evaluate_ranking --objectives rank:pairwise rank:ndcg --k 5 10
+    python -m scripts.evaluate_ranking --results-only      # historical result rows only
+
+Training pairs come from the candidate generator (every result row plus nearby
+same-subject tutors sampled as negatives), so each case has a list to rank.
+Cases are split into train and test. Each model is scored on the held-out
+cases with NDCG@k and MAP@k, treating each case_id as one query.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from src.candidates import candidate_feature_chunks, iter_candidate_pairs, tutor_subject_masks
+from src.feature_store import get_store, result_feature_matrix
+from src.ranking_metrics import ranking_report
+from src.ranking_model import train_model, train_ranker
+
+
+def load_pairs(store, cases, results, results_only, radius_km, neg_ratio, seed):
+    """(X, y, case_id per row) for either raw result rows or sampled candidate pairs."""
+    if results_only:
+        pairs = results.merge(cases[['case_id']], on='case_id')
+        pairs = pairs[store.rows_for(pairs['tutor_id']) >= 0]
+        X, y = result_feature_matrix(store, cases, pairs)
+        return X, y, pairs['case_id'].to_numpy()
+    masks = tutor_subject_masks(store, pd.read_csv("data/raw/tutors.csv"))
+    chunks = list(iter_candidate_pairs(store, cases, results, tutor_masks=masks, radius_km=radius_km,
+                                       neg_ratio=neg_ratio, seed=seed))
+    case_rows = np.concatenate([c[0] for c in chunks])
+    X, y = zip(*candidate_feature_chunks(store, cases, chunks))
+    return np.vstack(X), np.concatenate(y), cases['case_id'].to_numpy()[case_rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--objectives", nargs="+", default=["rank:pairwise", "rank:ndcg"])
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--test-fraction", type=float, default=0.3)
+    parser.add_argument("--results-only", action="store_true")
+    parser.add_argument("--radius-km", type=float, default=10.0)
+    parser.add_argument("--neg-ratio", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store = get_store()
+    cases = pd.read_csv("data/raw/cases.csv")
+    results = pd.read_csv("data/raw/results.csv")
+    X, y, groups = load_pairs(store, cases, results, args.results_only, args.radius_km, args.neg_ratio,
+                              args.seed)
+
+    # Split by case so no query is seen in training
+    rng = np.random.default_rng(args.seed)
+    case_ids = np.unique(groups)
+    test_cases = rng.choice(case_ids, size=max(1, int(len(case_ids) * args.test_fraction)), replace=False)
+    is_test = np.isin(groups, test_cases)
+    scaler = StandardScaler().fit(X[~is_test])
+    X_train, X_test = scaler.transform(X[~is_test]), scaler.transform(X[is_test])
+    y_train, y_test = y[~is_test], y[is_test]
+    print(f"{len(y)} pairs over {len(case_ids)} cases; {int(y.sum())} positive; "
+          f"{is_test.sum()} test rows over {len(test_cases)} cases")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        model = train_model(X_train, y_train, save_path=os.path.join(tmp, "pointwise.json"))
+        train_s = time.perf_counter() - start
+        scores = model.predict_proba(X_test)[:, 1]
+        rows.append(("binary:logistic", train_s, scores))
+
+        for objective in args.objectives:
+            start = time.perf_counter()
+            ranker = train_ranker(X_train, y_train, groups[~is_test], objective=objective,
+                                  save_path=os.path.join(tmp, objective.replace(":", "_") + ".json"))
+            train_s = time.perf_counter() - start
+            rows.append((objective, train_s, ranker.predict(X_test)))
+
+    metrics = [f"{m}@{k}" for k in args.k for m in ("ndcg", "map")]
+    print(f"{'objective':<18} {'train s':>8} " + " ".join(f"{m:>8}" for m in metrics) + f" {'eval ms':>8}")
+    for name, train_s, scores in rows:
+        start = time.perf_counter()
+        report = ranking_report(y_test, scores, groups[is_test], ks=args.k)
+        eval_ms = (time.perf_counter() - start) * 1000
+        print(f"{name:<18} {train_s:8.2f} " + " ".join(f"{report[m]:8.3f}" for m in metrics) + f" {eval_ms:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,36 @@
-from src.tagging import extract_tags
+"""
+Tag case descriptions and tutor bios with the subject/level/niche vocabulary.
+
+Run from the project root:
+    python -m scripts.extract_tags
+
+Writes the tag lists next to the raw rows (data/processed/*_with_tags.csv) and
+the sparse multi-hot matrices (data/processed/*_tags.npz) for use as features.
+"""
+import json
+
 import pandas as pd
+from scipy import sparse
+
+from src.tagging import tag_matrix, tags_to_lists
+
+
+def tag_file(csv_path, text_col, tag_col, out_prefix):
+    df = pd.read_csv(csv_path)
+    tags, names = tag_matrix(df[text_col])
+    df[tag_col] = tags_to_lists(tags, names)
+    df.to_csv(f"{out_prefix}_with_tags.csv", index=False)
+    sparse.save_npz(f"{out_prefix}_tags.npz", tags)
+    return names
+
+
+def main():
+    tag_file("data/raw/cases.csv", "case_description", "case_tags", "data/processed/cases")
+    names = tag_file("data/raw/tutors.csv", "tutor_bio", "tutor_tags", "data/processed/tutors")
+    with open("data/processed/tag_names.json", "w") as f:
+        json.dump(names, f)
+    print("Tags extracted!")
+
 
-df = pd.read_csv("data/processed/merged_data.csv")
-df['case_tags'] = df['case_description'].apply(extract_tags)
-df['tutor_tags'] = df['tutor_bio'].apply(extract_tags)
-df.to_csv("data/processed/merged_data_with_tags.csv", index=False)
-print("Tags extracted!")
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,26 @@
-from src.embeddings import get_embedding, reduce_embeddings
-import pandas as pd
+from src.embeddings import EmbeddingCache, embed_texts, fit_pca, reduce_embeddings
+from src.artifacts import save_pca
+from src.data_cache import load_merged
+from src.embedding_store import EmbeddingStore, bio_rows, load_or_build_embedding_store
+import numpy as np
 
-df = pd.read_csv("data/processed/merged_data.csv")
+# Same merged table (and tutor set) the training scripts and the app read
+df = load_merged()
 texts = df['case_description'].tolist() + df['tutor_bio'].tolist()
-embeddings = [get_embedding(t) for t in texts]
-reduced = reduce_embeddings(embeddings)
+
+# Batched, deduplicated and cached: repeated bios are only embedded once
+cache = EmbeddingCache()
+embeddings = embed_texts(texts, cache=cache)
+cache.close()
+
+pca = fit_pca(embeddings)
+save_pca(pca)
+reduced = reduce_embeddings(embeddings, pca=pca)
+# Bio vectors keyed by tutor_id: tutors the store lacks are appended, then known
+# tutors are overwritten in place, which replaces the mean placeholders the
+# training scripts give tutors they had not seen
+bios = bio_rows(reduced, len(df))
+load_or_build_embedding_store(df, bios)
+tutor_ids, first = np.unique(df['tutor_id'].to_numpy(), return_index=True)
+EmbeddingStore(mode="r+").upsert(tutor_ids, bios[first])
 print("Embeddings generated and reduced!")
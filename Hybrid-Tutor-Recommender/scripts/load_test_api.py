@@ -0,0 +1,70 @@
+"""
+Load-test the /recommend endpoint and report throughput and latency percentiles.
+
+Start the service first:
+    uvicorn web_app.api:app --port 8000
+then run from the project root:
+    python -m scripts.load_test_api --requests 2000 --concurrency 32
+
+Request bodies are drawn from data/raw/cases.csv so budgets, locations and gender
+preferences look like real traffic.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+
+async def run(url, bodies, concurrency):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            resp = await client.post(url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if resp.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies), errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000/recommend")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--max-km", type=float, default=None)
+    args = parser.parse_args()
+
+    cases = pd.read_csv("data/raw/cases.csv")
+    rng = np.random.default_rng(0)
+    picks = cases.iloc[rng.integers(0, len(cases), args.requests)]
+    bodies = [{"case_budget": float(r.case_budget), "case_lat": float(r.case_lat), "case_lon": float(r.case_lon),
+               "preferred_gender": r.preferred_gender, "k": args.k, "max_km": args.max_km}
+              for r in picks.itertuples()]
+
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in args.concurrency:
+        latencies, errors, elapsed = asyncio.run(run(args.url, bodies, concurrency))
+        print(f"{concurrency:>11} {len(latencies) / elapsed:8.1f} {np.percentile(latencies, 50) * 1000:8.2f} "
+              f"{np.percentile(latencies, 99) * 1000:8.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,135 @@
-# Can reuse train_model.py logic
-from scripts.train_model import *
-print("Monthly retraining complete!")
+"""
+Retrain the tutor ranker.
+
+Run from the project root:
+    python -m scripts.retrain_model                        # full rebuild (monthly)
+    python -m scripts.retrain_model --mode incremental     # boost on rows added since last training (nightly)
+    python -m scripts.retrain_model --mode window --window-rows 100000
+    python -m scripts.retrain_model --compare              # wall clock + AUC of each mode
+
+Incremental mode continues boosting the saved models/xgb_model.json using only the
+results.csv rows appended since the model was last trained, and keeps the saved
+scaler so the existing trees stay valid. It falls back to a full rebuild when the
+model's training state is unknown.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+from src.config import MODEL_PATH
+from src.artifacts import (load_scaler, rebind_model, record_training, save_feature_spec, save_scaler,
+                           trained_results_rows)
+from src.data_pipeline import load_data
+from src.feature_spec import fit_scaler
+from src.feature_store import get_spec_and_store, get_store, result_feature_matrix
+from src.ranking_model import continue_training, train_model
+from scripts.train_model import train_full
+
+
+def retrain_incremental(n_rounds):
+    seen = trained_results_rows()
+    if seen is None or not os.path.exists(MODEL_PATH):
+        print("No training state for the current model; running a full rebuild")
+        return train_full()
+    cases, _, results = load_data()
+    new_rows = results.iloc[seen:]
+    if new_rows.empty:
+        print("No new results since last training")
+        return None
+
+    X, y = result_feature_matrix(get_store(), cases, new_rows)
+    scaler = load_scaler(mmap_mode=None)
+    model = continue_training(scaler.transform(X), y, MODEL_PATH, n_rounds=n_rounds)
+    rebind_model(MODEL_PATH)
+    record_training(len(results), mode="incremental")
+    print(f"Boosted {n_rounds} rounds on {len(y)} new rows")
+    return model
+
+
+def retrain_window(window_rows):
+    cases, _, results = load_data()
+    spec, store = get_spec_and_store()
+    X, y = result_feature_matrix(store, cases, results.iloc[-window_rows:])
+    scaler = fit_scaler(X)
+    model = train_model(scaler.transform(X, copy=False), y, save_path=MODEL_PATH)
+    save_feature_spec(spec)
+    save_scaler(scaler, MODEL_PATH)
+    record_training(len(results), mode="window")
+    return model
+
+
+def compare(new_fraction, holdout, n_rounds, window_rows, seed=42):
+    """
+    Replays a nightly update: the base model sees the older rows, then the newest
+    `new_fraction` of rows arrive. A random `holdout` of all rows is kept for AUC.
+    """
+    cases, _, results = load_data()
+    X, y = result_feature_matrix(get_store(), cases, results)
+    rng = np.random.default_rng(seed)
+    is_test = rng.random(len(y)) < holdout
+    X_test, y_test = X[is_test], y[is_test]
+    X_train, y_train = X[~is_test], y[~is_test]
+    split = int(len(y_train) * (1 - new_fraction))
+
+    def auc(model, scaler):
+        if len(np.unique(y_test)) < 2:
+            return float('nan')
+        return roc_auc_score(y_test, model.predict_proba(scaler.transform(X_test))[:, 1])
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "base.json")
+        scaler = fit_scaler(X_train[:split])
+        base = train_model(scaler.transform(X_train[:split]), y_train[:split], save_path=base_path)
+        rows.append(("base (old rows only)", float('nan'), auc(base, scaler)))
+
+        start = time.perf_counter()
+        inc = continue_training(scaler.transform(X_train[split:]), y_train[split:], base_path,
+                                n_rounds=n_rounds, save_path=os.path.join(tmp, "inc.json"))
+        rows.append((f"incremental (+{n_rounds} rounds)", time.perf_counter() - start, auc(inc, scaler)))
+
+        start = time.perf_counter()
+        full_scaler = fit_scaler(X_train)
+        full = train_model(full_scaler.transform(X_train), y_train, save_path=os.path.join(tmp, "full.json"))
+        rows.append(("full rebuild", time.perf_counter() - start, auc(full, full_scaler)))
+
+        start = time.perf_counter()
+        win_scaler = fit_scaler(X_train[-window_rows:])
+        win = train_model(win_scaler.transform(X_train[-window_rows:]), y_train[-window_rows:],
+                          save_path=os.path.join(tmp, "window.json"))
+        rows.append((f"rolling window ({min(window_rows, len(y_train))} rows)", time.perf_counter() - start,
+                     auc(win, win_scaler)))
+
+    print(f"train rows: {len(y_train)} ({len(y_train) - split} new), test rows: {len(y_test)}")
+    print(f"{'mode':<32} {'wall s':>8} {'AUC':>7}")
+    for name, secs, score in rows:
+        print(f"{name:<32} {secs:8.3f} {score:7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["full", "incremental", "window"], default="full")
+    parser.add_argument("--rounds", type=int, default=20, help="trees added per incremental update")
+    parser.add_argument("--window-rows", type=int, default=100_000)
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--new-fraction", type=float, default=0.1)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.new_fraction, args.holdout, args.rounds, args.window_rows)
+    elif args.mode == "incremental":
+        retrain_incremental(args.rounds)
+    elif args.mode == "window":
+        retrain_window(args.window_rows)
+    else:
+        train_full()
+    print("Retraining complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Train the tutor ranker on sampled candidate pairs instead of results.csv alone.
+
+Run from the project root:
+    python -m scripts.train_candidates --radius-km 10 --neg-ratio 3
+    python -m scripts.train_candidates --cache-dir data/processed/xgb_cache   # external memory
+
+Every historical result row is kept. Nearby tutors who share a subject with a
+case but were never offered it are added as sampled negatives. Pairs are
+generated and featurized one chunk of cases at a time, so the full
+cases x tutors product is never held in memory. With --cache-dir, XGBoost also
+pages the training matrix to disk.
+"""
+import argparse
+import time
+
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from src.config import MODEL_PATH
+from src.artifacts import check_model_features, record_training, save_feature_spec, save_scaler
+from src.candidates import (candidate_dmatrix, candidate_feature_chunks, iter_candidate_pairs,
+                            train_on_candidates, tutor_subject_masks)
+from src.feature_store import get_spec_and_store
+from src.ranking_model import get_train_params, load_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--radius-km", type=float, default=10.0)
+    parser.add_argument("--neg-ratio", type=float, default=3.0, help="sampled negatives per positive")
+    parser.add_argument("--no-subject-filter", action="store_true")
+    parser.add_argument("--chunk-cases", type=int, default=5_000)
+    parser.add_argument("--max-rows", type=int, default=1_000_000, help="rows per block handed to XGBoost")
+    parser.add_argument("--cache-dir", default=None, help="use XGBoost external memory under this dir")
+    parser.add_argument("--save-path", default=MODEL_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    spec, store = get_spec_and_store()
+    cases = pd.read_csv("data/raw/cases.csv")
+    results = pd.read_csv("data/raw/results.csv")
+    masks = None if args.no_subject_filter else tutor_subject_masks(store, pd.read_csv("data/raw/tutors.csv"))
+
+    def pairs():
+        return iter_candidate_pairs(store, cases, results, tutor_masks=masks, radius_km=args.radius_km,
+                                    neg_ratio=args.neg_ratio, chunk_cases=args.chunk_cases, seed=args.seed)
+
+    # First pass fits the scaler incrementally; the DMatrix pass then sees scaled blocks
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    n_rows = n_pos = 0
+    for X, y in candidate_feature_chunks(store, cases, pairs(), max_rows=args.max_rows):
+        scaler.partial_fit(X)
+        n_rows += len(y)
+        n_pos += int(y.sum())
+    print(f"{n_rows} candidate pairs ({n_pos} positive) in {time.perf_counter() - start:.1f}s")
+
+    def blocks():
+        return candidate_feature_chunks(store, cases, pairs(), max_rows=args.max_rows, scaler=scaler)
+
+    start = time.perf_counter()
+    dtrain = candidate_dmatrix(blocks, cache_dir=args.cache_dir)
+    train_on_candidates(dtrain, get_train_params(), save_path=args.save_path)
+    print(f"Trained in {time.perf_counter() - start:.1f}s")
+    check_model_features(load_model(args.save_path), scaler, spec)
+
+    if args.save_path == MODEL_PATH:
+        save_feature_spec(spec)
+        save_scaler(scaler, MODEL_PATH)
+        record_training(len(results), mode="candidates")
+    print(f"Model saved to {args.save_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,30 @@
-from src.data_pipeline import load_data, merge_datasets, preprocess
+from src.config import MODEL_PATH
+from src.data_cache import load_merged
+from src.embedding_store import load_tutor_embeddings
+from src.feature_spec import FeatureSpec, fit_scaler
 from src.ranking_model import train_model
+from src.artifacts import save_feature_spec, save_scaler, record_training
 import pandas as pd
 
-cases, tutors, results = load_data()
-df = merge_datasets(cases, tutors, results)
-df = preprocess(df)
+def train_full():
+    df = load_merged()
 
-X = df.drop(columns=['success', 'case_id', 'tutor_id'])
-y = df['success']
+    # Same features as the web app: frozen column order and vocabularies + tutor embeddings
+    embeddings = load_tutor_embeddings(df)
+    spec = FeatureSpec.fit(df, embeddings.dim)
+    X = spec.transform(df, embeddings)
+    y = df['success'].to_numpy()
 
-model = train_model(X, y)
-print("Model trained and saved!")
+    # Fit the scaler once here; serving only ever calls transform. Scaling is in
+    # place, so the float32 matrix is the only copy of the features.
+    scaler = fit_scaler(X)
+    model = train_model(scaler.transform(X, copy=False), y, save_path=MODEL_PATH)
+    save_feature_spec(spec)
+    save_scaler(scaler, MODEL_PATH)
+    # Remember how much of results.csv this model has seen, for incremental retraining
+    record_training(len(pd.read_csv("data/raw/results.csv", usecols=['case_id'])), mode="full")
+    return model
+
+if __name__ == "__main__":
+    train_full()
+    print("Model trained and saved!")
@@ -0,0 +1,48 @@
+"""
+Cross-validated hyperparameter search for the tutor ranker.
+
+Run from the project root:
+    python -m scripts.tune_model --trials 60 --method halving
+
+Trials run in a process pool sized to the machine's cores; each worker builds
+the fold DMatrix objects once and reuses them. The best configuration is written
+to models/params/xgb_params_vNNNN.json, which train_model picks up next time.
+"""
+import argparse
+
+from src.data_cache import load_merged
+from src.embedding_store import load_tutor_embeddings
+from src.feature_spec import FeatureSpec
+from src.tuning import save_best_params, tune
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=40)
+    parser.add_argument("--method", choices=["random", "halving"], default="random")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--metric", default="auc")
+    parser.add_argument("--max-rounds", type=int, default=500)
+    parser.add_argument("--early-stopping", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to os.cpu_count()")
+    args = parser.parse_args()
+
+    df = load_merged()
+    embeddings = load_tutor_embeddings(df)
+    X = FeatureSpec.fit(df, embeddings.dim).transform(df, embeddings)
+    y = df['success'].to_numpy()
+
+    best, _, stats = tune(X, y, n_trials=args.trials, method=args.method, n_folds=args.folds,
+                          metric=args.metric, max_rounds=args.max_rounds,
+                          early_stopping_rounds=args.early_stopping, n_workers=args.workers)
+    path = save_best_params(best, stats)
+
+    print(f"{stats['trials']} trials in {stats['seconds']:.1f}s on {stats['workers']} workers "
+          f"({stats['trials_per_minute']:.1f} trials/min)")
+    print(f"best CV {args.metric}: {best['score']:.4f} with {best['n_estimators']} trees")
+    print(f"params: {best['params']}")
+    print(f"saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
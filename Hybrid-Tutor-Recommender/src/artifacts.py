@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+
+import joblib
+
+from src.config import MODEL_PATH, SCALER_PATH, PCA_PATH, FEATURE_SPEC_PATH, ARTIFACT_MANIFEST_PATH
+
+# -----------------------------
+# Fitted-transform artifacts
+# -----------------------------
+# The scaler, PCA and feature spec are fitted once at train time and saved next
+# to the model. A small JSON manifest records content hashes so that serving
+# refuses to pair a scaler with a model (or PCA) it was not fitted alongside.
+
+class ArtifactVersionError(ValueError):
+    """Raised when saved transforms do not belong to the model on disk."""
+
+def file_sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def read_manifest(manifest_path=ARTIFACT_MANIFEST_PATH):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def _write_manifest(manifest, manifest_path):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def _dump(obj, path):
+    # Uncompressed so numpy attributes can be memory-mapped on load
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(obj, path)
+    return file_sha256(path)
+
+def _check(entry, path, name):
+    if not entry:
+        raise FileNotFoundError(f"No {name} recorded in the artifact manifest")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} artifact missing: {path}")
+    if file_sha256(path) != entry["sha256"]:
+        raise ArtifactVersionError(f"{path} changed since it was recorded; refit the {name}")
+
+# -----------------------------
+# PCA (embedding reduction)
+# -----------------------------
+def save_pca(pca, path=PCA_PATH, manifest_path=ARTIFACT_MANIFEST_PATH):
+    manifest = read_manifest(manifest_path)
+    manifest["pca"] = {"path": path, "sha256": _dump(pca, path),
+                       "n_components": int(pca.n_components_)}
+    _write_manifest(manifest, manifest_path)
+
+def load_pca(path=PCA_PATH, manifest_path=ARTIFACT_MANIFEST_PATH, mmap_mode="r"):
+    _check(read_manifest(manifest_path).get("pca"), path, "PCA")
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+# -----------------------------
+# Feature spec (column order + category vocabularies)
+# -----------------------------
+def save_feature_spec(spec, path=FEATURE_SPEC_PATH, manifest_path=ARTIFACT_MANIFEST_PATH):
+    spec.save(path)
+    manifest = read_manifest(manifest_path)
+    manifest["feature_spec"] = {"path": path, "sha256": file_sha256(path), "n_features": spec.n_features}
+    _write_manifest(manifest, manifest_path)
+
+def load_feature_spec(path=FEATURE_SPEC_PATH, manifest_path=ARTIFACT_MANIFEST_PATH):
+    from src.feature_spec import FeatureSpec
+    _check(read_manifest(manifest_path).get("feature_spec"), path, "feature spec")
+    return FeatureSpec.load(path)
+
+# -----------------------------
+# Scaler (bound to a trained model)
+# -----------------------------
+def save_scaler(scaler, model_path=MODEL_PATH, path=SCALER_PATH, manifest_path=ARTIFACT_MANIFEST_PATH):
+    """Save the scaler the model at `model_path` was trained on, and bind the two."""
+    manifest = read_manifest(manifest_path)
+    manifest["scaler"] = {"path": path, "sha256": _dump(scaler, path),
+                          "n_features": int(scaler.n_features_in_)}
+    manifest["model"] = {"path": model_path, "sha256": file_sha256(model_path),
+                         "pca_sha256": manifest.get("pca", {}).get("sha256")}
+    _write_manifest(manifest, manifest_path)
+
+def rebind_model(model_path=MODEL_PATH, manifest_path=ARTIFACT_MANIFEST_PATH):
+    """Record an updated model (e.g. after warm-start boosting) that keeps the existing scaler."""
+    manifest = read_manifest(manifest_path)
+    if "scaler" not in manifest:
+        raise FileNotFoundError("No scaler recorded in the artifact manifest")
+    manifest["model"] = {"path": model_path, "sha256": file_sha256(model_path),
+                         "pca_sha256": manifest.get("model", {}).get("pca_sha256")}
+    _write_manifest(manifest, manifest_path)
+
+def load_scaler(model_path=MODEL_PATH, path=SCALER_PATH, manifest_path=ARTIFACT_MANIFEST_PATH, mmap_mode="r"):
+    """
+    Load the scaler for `model_path`, memory-mapping its arrays.
+    Raises ArtifactVersionError if the model, scaler or PCA changed since training.
+    """
+    manifest = read_manifest(manifest_path)
+    _check(manifest.get("scaler"), path, "scaler")
+    model_entry = manifest.get("model")
+    if not model_entry or file_sha256(model_path) != model_entry["sha256"]:
+        raise ArtifactVersionError(f"{model_path} does not match the model the scaler was fitted for")
+    if manifest.get("pca", {}).get("sha256") != model_entry.get("pca_sha256"):
+        raise ArtifactVersionError("PCA was refitted after the model was trained; retrain the model")
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+# -----------------------------
+# Training state (which results rows the model has seen)
+# -----------------------------
+def record_training(results_rows, mode, manifest_path=ARTIFACT_MANIFEST_PATH):
+    manifest = read_manifest(manifest_path)
+    manifest["training"] = {"results_rows": int(results_rows), "mode": mode,
+                            "model_sha256": manifest.get("model", {}).get("sha256")}
+    _write_manifest(manifest, manifest_path)
+
+def trained_results_rows(manifest_path=ARTIFACT_MANIFEST_PATH):
+    """Number of results.csv rows the current model was trained on, or None if unknown."""
+    manifest = read_manifest(manifest_path)
+    training = manifest.get("training")
+    if not training or training.get("model_sha256") != manifest.get("model", {}).get("sha256"):
+        return None
+    return training["results_rows"]
+
+def check_model_features(model, scaler, spec=None):
+    if getattr(model, "n_features_in_", scaler.n_features_in_) != scaler.n_features_in_:
+        raise ArtifactVersionError(
+            f"Model expects {model.n_features_in_} features but scaler was fitted on {scaler.n_features_in_}")
+    if spec is not None and spec.n_features != scaler.n_features_in_:
+        raise ArtifactVersionError(
+            f"Feature spec builds {spec.n_features} features but scaler was fitted on {scaler.n_features_in_}")
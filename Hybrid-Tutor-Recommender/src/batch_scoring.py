@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.feature_store import CASE_COLUMNS, FEATURE_DTYPE, pair_feature_matrix
+from src.ranking_metrics import group_offsets
+
+# -----------------------------
+# Reading / writing case files in chunks
+# -----------------------------
+def iter_case_chunks(path, chunk_size=1_000):
+    """Yield DataFrames of at most `chunk_size` cases from a CSV or Parquet file."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+class RecommendationWriter:
+    """Appends top-K frames to a CSV or Parquet file as they are produced."""
+    def __init__(self, path):
+        self.path = path
+        self._parquet = path.endswith(".parquet")
+        self._writer = None
+        self._header = True
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, df):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def _candidate_pairs(store, cases, spatial_index=None, max_km=None, fallback_k=10):
+    """
+    (case position, store row) pairs: every tutor, or only those within `max_km`.
+    A case with nobody within reach gets its `fallback_k` nearest tutors instead,
+    as in the web app, so every case appears in the output.
+    """
+    if max_km and spatial_index is not None:
+        lat = cases['case_lat'].to_numpy(dtype=np.float64)
+        lon = cases['case_lon'].to_numpy(dtype=np.float64)
+        q, rows, _ = spatial_index.pairs_within(lat, lon, max_km)
+        missing = np.setdiff1d(np.arange(len(cases)), q)
+        if len(missing):
+            nearest = [spatial_index.k_nearest_tutors(lat[i], lon[i], fallback_k)[0] for i in missing]
+            q = np.concatenate([q, np.repeat(missing, [len(r) for r in nearest])])
+            rows = np.concatenate([rows] + nearest).astype(np.int64)
+        return q, rows
+    n_cases, n_tutors = len(cases), len(store)
+    return np.repeat(np.arange(n_cases), n_tutors), np.tile(np.arange(n_tutors), n_cases)
+
+def top_k_per_case(model, store, scaler, cases, k=10, spatial_index=None, max_km=None,
+                   max_rows=1_000_000):
+    """
+    Top-k tutors for every case in `cases` (needs case_id and the CASE_COLUMNS;
+    preferred_gender defaults to "Any"). Pairs are featurized and scored in blocks
+    of at most `max_rows`. Returns one row per (case, tutor) kept:
+    case_id, rank, tutor_id, tutor_name, tutor_rate, ai_score.
+    """
+    cases = cases.reset_index(drop=True)
+    if 'preferred_gender' not in cases.columns:
+        cases = cases.assign(preferred_gender="Any")
+    q, rows = _candidate_pairs(store, cases, spatial_index, max_km)
+    case_cols = {col: cases[col].to_numpy() for col in CASE_COLUMNS}
+
+    scores = np.empty(len(q), dtype=np.float64)
+    block = np.empty((min(max_rows, max(len(q), 1)), store.n_features), dtype=FEATURE_DTYPE)
+    for start in range(0, len(q), max_rows):
+        sl = slice(start, start + max_rows)
+        X = pair_feature_matrix(store, {c: v[q[sl]] for c, v in case_cols.items()}, rows[sl],
+                                out=block[:len(q[sl])])
+        scores[sl] = model.predict_proba(scaler.transform(X))[:, 1]
+
+    # Rank within each case: sort by (case, -score) and keep the first k of every group
+    order = np.lexsort((-scores, q))
+    q, rows, scores = q[order], rows[order], scores[order]
+    offsets = group_offsets(q)
+    sizes = np.diff(offsets)
+    rank = np.arange(len(q)) - np.repeat(offsets[:-1], sizes)
+    keep = rank < k
+    q, rows, scores, rank = q[keep], rows[keep], scores[keep], rank[keep]
+    return pd.DataFrame({
+        'case_id': cases['case_id'].to_numpy()[q],
+        'rank': rank + 1,
+        'tutor_id': store.tutor_ids[rows],
+        'tutor_name': store.tutor_names[rows],
+        'tutor_rate': store.tutor_rate[rows],
+        'ai_score': scores,
+    })
+
+# -----------------------------
+# Worker processes: model, scaler and store are loaded once per process
+# -----------------------------
+_WORKER = {}
+
+def init_worker(model_path, store_path, max_km=None):
+    from src.artifacts import load_scaler
+    from src.feature_store import TutorFeatureStore
+    from src.ranking_model import load_model
+    from src.spatial import build_spatial_index
+    store = TutorFeatureStore.load(store_path)
+    _WORKER.update(model=load_model(model_path), scaler=load_scaler(model_path), store=store,
+                   spatial_index=build_spatial_index(store) if max_km else None, max_km=max_km)
+
+def score_chunk(cases, k):
+    w = _WORKER
+    return top_k_per_case(w['model'], w['store'], w['scaler'], cases, k=k,
+                          spatial_index=w['spatial_index'], max_km=w['max_km'])
@@ -0,0 +1,311 @@
+import hashlib
+import importlib.util
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config import BI_AGGREGATES_PATH, RAW_DATA_PATH
+from src.spatial import KM_PER_DEG_LAT
+from src.tagging import get_tagger
+
+# -----------------------------
+# Out-of-core BI aggregates
+# -----------------------------
+# The results history is never loaded whole. Cases and tutors are reduced to
+# small per-id keys held in memory; results are streamed and folded into
+# additive partial aggregates (counts per (location, subject) cell and a
+# "tutor appears in results" flag). Partials from different chunks, backends
+# or incremental runs combine by addition, so the materialized tables on disk
+# only ever need the rows appended since the last update.
+
+BACKENDS = ("duckdb", "polars", "pandas")
+TAIL_BYTES = 1 << 20
+
+def resolve_backend(backend="auto"):
+    if backend != "auto":
+        if backend != "pandas" and importlib.util.find_spec(backend) is None:
+            raise ImportError(f"{backend} is not installed")
+        return backend
+    return next(b for b in BACKENDS if b == "pandas" or importlib.util.find_spec(b) is not None)
+
+# -----------------------------
+# Group keys (one row per input row)
+# -----------------------------
+def location_labels(lat, lon, cell_km=2.0):
+    """Grid cell of about cell_km x cell_km, labelled by its centre, e.g. "22.303,114.171"."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    cell_lat = cell_km / KM_PER_DEG_LAT
+    centre_lat = (np.floor(lat / cell_lat) + 0.5) * cell_lat
+    # Longitude width follows each cell's own latitude
+    cell_lon = cell_km / (KM_PER_DEG_LAT * np.maximum(np.cos(np.radians(centre_lat)), 0.01))
+    centre_lon = (np.floor(lon / cell_lon) + 0.5) * cell_lon
+    codes, cells = pd.MultiIndex.from_arrays([centre_lat.round(3), centre_lon.round(3)]).factorize()
+    labels = np.array([f"{a:.3f},{b:.3f}" for a, b in cells], dtype=object)
+    return labels[codes]
+
+def subject_labels(descriptions):
+    """First subject tag of each description, or "other"."""
+    tagger = get_tagger()
+    cols = tagger.group_columns("subject")
+    tags = tagger.transform(descriptions)[:, cols].tocsr()
+    tags.sort_indices()
+    names = np.array([tagger.tag_names[c] for c in cols] + ["other"], dtype=object)
+    has_subject = np.diff(tags.indptr) > 0
+    first = np.full(tags.shape[0], len(cols))
+    first[has_subject] = tags.indices[tags.indptr[:-1][has_subject]]
+    return names[first]
+
+def case_keys(cases, location_km=2.0):
+    """
+    location and subject for each row of `cases` (or of a merged frame).
+    Existing location/subject columns are kept; otherwise location is a grid
+    cell of case_lat/case_lon and subject comes from case_description.
+    """
+    keys = pd.DataFrame(index=cases.index)
+    keys['location'] = (cases['location'].astype(str) if 'location' in cases.columns
+                        else location_labels(cases['case_lat'], cases['case_lon'], location_km))
+    keys['subject'] = (cases['subject'].astype(str) if 'subject' in cases.columns
+                       else subject_labels(cases['case_description']))
+    return keys
+
+# -----------------------------
+# Materialized partial aggregates
+# -----------------------------
+class AggregateTables:
+    """
+    Requests and successes per (location, subject) cell plus, per tutor,
+    whether they appear in any result. Labels only ever grow, so the codes of
+    existing cells and tutors stay valid as cases and tutors are appended.
+    """
+    def __init__(self, location_km=2.0):
+        tagger = get_tagger()
+        self.location_km = location_km
+        self.subjects = pd.Index([tagger.tag_names[c] for c in tagger.group_columns("subject")] + ["other"])
+        self.locations = pd.Index([], dtype=object)
+        self.tutor_ids = pd.Index([], dtype=np.int64)
+        self.requests = np.zeros((0, len(self.subjects)), dtype=np.int64)
+        self.successes = np.zeros((0, len(self.subjects)), dtype=np.int64)
+        self.seen = np.zeros(0, dtype=bool)
+        self.rows = 0
+        self.sources = {}
+
+    def register(self, cases, tutors):
+        """
+        Add any new locations and tutors; returns (case_ids, cell code per case)
+        for mapping result rows onto cells.
+        """
+        keys = case_keys(cases, self.location_km)
+        new = pd.Index(keys['location'].unique()).difference(self.locations)
+        if len(new):
+            self.locations = self.locations.append(new)
+            pad = np.zeros((len(new), len(self.subjects)), dtype=np.int64)
+            self.requests = np.vstack([self.requests, pad])
+            self.successes = np.vstack([self.successes, pad])
+        new = pd.Index(tutors['tutor_id'].astype(np.int64).unique()).difference(self.tutor_ids)
+        if len(new):
+            self.tutor_ids = self.tutor_ids.append(new)
+            self.seen = np.concatenate([self.seen, np.zeros(len(new), dtype=bool)])
+        cells = (self.locations.get_indexer(keys['location']) * len(self.subjects)
+                 + self.subjects.get_indexer(keys['subject']))
+        return pd.Index(cases['case_id'].astype(np.int64)), cells
+
+    def fold(self, cells, requests, successes, tutor_rows, rows):
+        """Add one partial: per-cell counts (cells may repeat) and the tutor rows seen."""
+        np.add.at(self.requests.reshape(-1), cells, requests)
+        np.add.at(self.successes.reshape(-1), cells, successes)
+        self.seen[tutor_rows] = True
+        self.rows += int(rows)
+
+    def supply_gap(self):
+        """Same layout as bi_reporting.supply_gap_analysis, for every cell with requests."""
+        from src.bi_reporting import add_failure_rate
+        loc, subj = np.nonzero(self.requests)
+        supply_gap = pd.DataFrame({'request_count': self.requests[loc, subj],
+                                   'success_count': self.successes[loc, subj]},
+                                  index=pd.MultiIndex.from_arrays([self.locations[loc], self.subjects[subj]],
+                                                                  names=['location', 'subject']))
+        return add_failure_rate(supply_gap.sort_index())
+
+    def niches(self, tutors):
+        """bi_reporting.niche_discovery over the tutors that appear in results."""
+        from src.bi_reporting import niche_discovery
+        rows = self.tutor_ids.get_indexer(tutors['tutor_id'].astype(np.int64))
+        return niche_discovery(tutors[self.seen[rows]])
+
+    # Persistence: one .npz, replaced atomically, so counts and the sources they cover never disagree
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {"location_km": self.location_km, "rows": self.rows, "sources": self.sources}
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, requests=self.requests, successes=self.successes, seen=self.seen,
+                 tutor_ids=self.tutor_ids.to_numpy(), locations=self.locations.to_numpy(dtype=str),
+                 subjects=self.subjects.to_numpy(dtype=str), meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            tables = cls(meta["location_km"])
+            if list(data["subjects"]) != list(tables.subjects):
+                raise ValueError("subject vocabulary changed since the tables were built")
+            tables.locations = pd.Index(data["locations"].astype(object))
+            tables.tutor_ids = pd.Index(data["tutor_ids"].astype(np.int64))
+            tables.requests, tables.successes, tables.seen = data["requests"], data["successes"], data["seen"]
+        tables.rows, tables.sources = meta["rows"], meta["sources"]
+        return tables
+
+# -----------------------------
+# Scanning results (each backend folds whole-file partials into the tables)
+# -----------------------------
+def iter_results(path, chunk_size=1_000_000, offset=0, names=None):
+    """Results in chunks of case_id, tutor_id, success; CSV can start at a byte offset (rows appended later)."""
+    columns = ['case_id', 'tutor_id', 'success']
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        header = dict(header=None, names=names) if offset else {}
+        yield from pd.read_csv(f, usecols=columns, chunksize=chunk_size, **header)
+
+def scan_pandas(tables, path, case_ids, cells, chunk_size=1_000_000, offset=0, names=None):
+    for chunk in iter_results(path, chunk_size, offset, names):
+        case_rows = case_ids.get_indexer(chunk['case_id'])
+        tutor_rows = tables.tutor_ids.get_indexer(chunk['tutor_id'])
+        keep = (case_rows >= 0) & (tutor_rows >= 0)  # same rows as the inner merge
+        chunk_cells = cells[case_rows[keep]]
+        n_cells = tables.requests.size
+        tables.fold(np.arange(n_cells), np.bincount(chunk_cells, minlength=n_cells),
+                    np.bincount(chunk_cells, weights=chunk['success'].to_numpy()[keep], minlength=n_cells).astype(np.int64),
+                    tutor_rows[keep], keep.sum())
+
+def _key_frames(tables, case_ids, cells):
+    return (pd.DataFrame({'case_id': case_ids.to_numpy(), 'cell': cells}),
+            pd.DataFrame({'tutor_id': tables.tutor_ids.to_numpy(), 'tutor_row': np.arange(len(tables.tutor_ids))}))
+
+def scan_duckdb(tables, path, case_ids, cells):
+    import duckdb
+    con = duckdb.connect()
+    case_cells, tutor_rows = _key_frames(tables, case_ids, cells)
+    con.register("case_cells", case_cells)
+    con.register("tutor_rows", tutor_rows)
+    reader = "read_parquet" if path.endswith(".parquet") else "read_csv_auto"
+    source = "'" + path.replace("'", "''") + "'"  # views cannot take bound parameters
+    con.execute(f"""CREATE TEMP VIEW matched AS
+                    SELECT c.cell, t.tutor_row, r.success FROM {reader}({source}) r
+                    JOIN case_cells c ON r.case_id = c.case_id JOIN tutor_rows t ON r.tutor_id = t.tutor_id""")
+    by_cell = con.execute("SELECT cell, COUNT(*) AS n, SUM(success) AS s FROM matched GROUP BY cell").df()
+    seen = con.execute("SELECT DISTINCT tutor_row FROM matched").df()['tutor_row'].to_numpy()
+    tables.fold(by_cell['cell'].to_numpy(), by_cell['n'].to_numpy(), by_cell['s'].to_numpy().astype(np.int64),
+                seen, by_cell['n'].sum())
+    con.close()
+
+def _collect(frame):
+    try:
+        return frame.collect(engine="streaming")
+    except TypeError:  # polars < 1.0
+        return frame.collect(streaming=True)
+
+def scan_polars(tables, path, case_ids, cells):
+    import polars as pl
+    case_cells, tutor_rows = _key_frames(tables, case_ids, cells)
+    results = pl.scan_parquet(path) if path.endswith(".parquet") else pl.scan_csv(path)
+    matched = (results.select(["case_id", "tutor_id", "success"])
+               .join(pl.from_pandas(case_cells).lazy(), on="case_id")
+               .join(pl.from_pandas(tutor_rows).lazy(), on="tutor_id"))
+    by_cell = _collect(matched.group_by("cell").agg(pl.len().alias("n"), pl.col("success").sum().alias("s")))
+    seen = _collect(matched.select(pl.col("tutor_row").unique()))
+    tables.fold(by_cell["cell"].to_numpy(), by_cell["n"].to_numpy(), by_cell["s"].to_numpy().astype(np.int64),
+                seen["tutor_row"].to_numpy(), by_cell["n"].sum())
+
+# -----------------------------
+# Incremental updates
+# -----------------------------
+def source_state(path, size=None):
+    """Size, mtime and a hash of the last TAIL_BYTES up to `size` (the history is too large to rehash)."""
+    st = os.stat(path)
+    size = st.st_size if size is None else size
+    with open(path, "rb") as f:
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read(size - max(0, size - TAIL_BYTES))
+    return {"size": size, "mtime_ns": st.st_mtime_ns, "tail_sha256": hashlib.sha256(tail).hexdigest(),
+            "ends_with_newline": tail.endswith(b"\n")}
+
+def appended_since(path, old):
+    """True if `path` only grew since `old` was recorded (same tail bytes, old end on a row boundary)."""
+    if old is None or not old["ends_with_newline"] or os.path.getsize(path) < old["size"]:
+        return False
+    return source_state(path, old["size"])["tail_sha256"] == old["tail_sha256"]
+
+def update_aggregates(raw_path=RAW_DATA_PATH, path=BI_AGGREGATES_PATH + "aggregates.npz", backend="auto",
+                      chunk_size=1_000_000, location_km=2.0, rebuild=False):
+    """
+    Bring the materialized tables up to date with cases, tutors and results
+    under `raw_path` (results.csv, or results.parquet if that is what exists).
+
+    Rows appended to results.csv since the last update are streamed and folded
+    in; appended cases and tutors just add labels. Any other change (a rewritten
+    file, a new location_km) rebuilds from a full scan with `backend`. Parquet
+    results cannot be read from a byte offset, so any change to results.parquet
+    is a full rescan too. Returns (tables, mode) with mode "unchanged",
+    "incremental" or "full".
+
+    Rows are counted as logged: unlike preprocess(), duplicate result rows are
+    not dropped, since that would need the whole history in memory. Result rows
+    are matched against the cases and tutors known when they are folded in.
+    """
+    csv_results = os.path.join(raw_path, "results.csv")
+    results_path = csv_results if os.path.exists(csv_results) else os.path.join(raw_path, "results.parquet")
+    paths = {"cases": os.path.join(raw_path, "cases.csv"), "tutors": os.path.join(raw_path, "tutors.csv"),
+             "results": results_path}
+
+    tables = None
+    if not rebuild and os.path.exists(path):
+        try:
+            tables = AggregateTables.load(path)
+        except (ValueError, KeyError):
+            tables = None
+    if tables is not None:
+        old = tables.sources
+        same_layout = tables.location_km == location_km and old.get("results_path") == results_path
+        if same_layout and all(source_state(p) == old.get(name) for name, p in paths.items()):
+            return tables, "unchanged"
+        if (not same_layout or results_path.endswith(".parquet")
+                or not all(appended_since(p, old.get(name)) for name, p in paths.items())):
+            tables = None  # rewritten inputs: the partials no longer describe them
+
+    cases = pd.read_csv(paths["cases"], usecols=lambda c: c in ('case_id', 'case_lat', 'case_lon',
+                                                                'case_description', 'location', 'subject'))
+    tutors = pd.read_csv(paths["tutors"], usecols=['tutor_id'])
+    mode = "incremental" if tables is not None else "full"
+    if tables is None:
+        tables = AggregateTables(location_km)
+    case_ids, cells = tables.register(cases, tutors)
+
+    if mode == "incremental":
+        old = tables.sources["results"]
+        if source_state(results_path)["size"] > old["size"]:
+            scan_pandas(tables, results_path, case_ids, cells, chunk_size, offset=old["size"],
+                        names=tables.sources["results_columns"])
+    else:
+        backend = resolve_backend(backend)
+        if backend == "duckdb":
+            scan_duckdb(tables, results_path, case_ids, cells)
+        elif backend == "polars":
+            scan_polars(tables, results_path, case_ids, cells)
+        else:
+            scan_pandas(tables, results_path, case_ids, cells, chunk_size)
+
+    results_columns = (list(pd.read_csv(results_path, nrows=0).columns) if results_path.endswith(".csv")
+                       else None)
+    tables.sources = {**{name: source_state(p) for name, p in paths.items()}, "results_path": results_path,
+                      "results_columns": results_columns, "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    tables.save(path)
+    return tables, mode
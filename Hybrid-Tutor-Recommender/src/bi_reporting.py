@@ -1,26 +1,131 @@
+import numpy as np
 import pandas as pd
 
-def niche_discovery(df):
-    """Find rare skills or niches in tutor bios."""
-    # Example: count niche tags
-    niches = df['niche'].explode().value_counts()
-    return niches
+def niche_discovery(df, tags=None, tag_names=None, group="niche"):
+    """
+    Find rare skills or niches in tutor bios.
+    Uses a precomputed multi-hot `tags` matrix (rows aligned with df) when given;
+    otherwise the bios are tagged here. Each tutor is counted once.
+    """
+    if 'niche' in df.columns and tags is None:
+        return df['niche'].explode().value_counts()
+    from src.tagging import get_tagger
+    tagger = get_tagger()
+    if tags is None:
+        tags, tag_names = tagger.transform(df['tutor_bio']), tagger.tag_names
+    if 'tutor_id' in df.columns:
+        first = ~df['tutor_id'].duplicated().to_numpy()
+        tags = tags[np.flatnonzero(first)]
+    group_tags = {tagger.tag_names[j] for j in tagger.group_columns(group)}
+    cols = [i for i, name in enumerate(tag_names) if name in group_tags]
+    counts = np.asarray(tags[:, cols].sum(axis=0, dtype=np.int64)).ravel()
+    niches = pd.Series(counts, index=[tag_names[i] for i in cols], name='count')
+    return niches[niches > 0].sort_values(ascending=False)
 
-def supply_gap_analysis(df):
-    """Compute weak supply areas."""
+def add_failure_rate(supply_gap):
+    supply_gap['failure_rate'] = 1 - supply_gap['success_count']/supply_gap['request_count']
+    return supply_gap
+
+def supply_gap_analysis(df, location_km=2.0):
+    """
+    Compute weak supply areas. location/subject come from the frame when present,
+    otherwise from a grid cell of the case location and the case's subject tag.
+    For histories that do not fit in memory use src.bi_aggregates.update_aggregates.
+    """
+    if 'location' not in df.columns or 'subject' not in df.columns:
+        from src.bi_aggregates import case_keys
+        df = df.assign(**case_keys(df, location_km))
     supply_gap = df.groupby(['location', 'subject']).agg(
         request_count=('case_id', 'count'),
         success_count=('success', 'sum')
     )
-    supply_gap['failure_rate'] = 1 - supply_gap['success_count']/supply_gap['request_count']
-    return supply_gap
+    return add_failure_rate(supply_gap)
+
+def local_supply(cases, spatial_index, radius_km=5.0, min_tutors=3):
+    """
+    Tutor supply around each case: how many tutors are within `radius_km` and how
+    far the nearest of them is. Only tutors inside the radius are ever touched.
+    Cases with fewer than `min_tutors` nearby are flagged as supply gaps.
+    """
+    lat = cases['case_lat'].to_numpy(dtype=np.float64)
+    lon = cases['case_lon'].to_numpy(dtype=np.float64)
+    q, _, dist = spatial_index.pairs_within(lat, lon, radius_km)
+    nearest = np.full(len(cases), np.inf)
+    np.minimum.at(nearest, q, dist)
+    out = pd.DataFrame({
+        'case_id': cases['case_id'].to_numpy(),
+        'tutors_nearby': np.bincount(q, minlength=len(cases)),
+        'nearest_km': np.where(np.isinf(nearest), np.nan, nearest),
+    })
+    out['supply_gap'] = out['tutors_nearby'] < min_tutors
+    return out
+
+# -----------------------------
+# Dynamic pricing
+# -----------------------------
+def _column_index(X, col):
+    if col is None or isinstance(col, (int, np.integer)):
+        return col
+    if not isinstance(X, pd.DataFrame):
+        raise TypeError(f"X is an array; pass the column index of {col!r} instead of its name")
+    return X.columns.get_loc(col) if col in X.columns else None
+
+def budget_sweep(model, X, budgets, budget_col='case_budget', price_gap_col='price_gap',
+                 rate_col='tutor_rate', scaler=None, max_batch_rows=65_536):
+    """
+    Success probability of every row at every budget, shape (n_rows, n_budgets).
+
+    All (row x budget) variants are written into one preallocated block and scored
+    with a single predict_proba call per chunk; rows are chunked so a block never
+    exceeds `max_batch_rows` (about 21 MB of float64 at the serving feature width).
+    X is a DataFrame or an unscaled array (pass column indices then); `price_gap`
+    is recomputed from the rate when both are present.
+    """
+    budget_col = _column_index(X, budget_col)
+    if budget_col is None:
+        raise KeyError("budget column not found in X")
+    price_gap_col = _column_index(X, price_gap_col)
+    rate_col = _column_index(X, rate_col)
+    X = np.asarray(X, dtype=np.float64)
+    budgets = np.asarray(budgets, dtype=np.float64)
+    n, n_feat = X.shape
+    n_b = len(budgets)
+
+    out = np.empty((n, n_b), dtype=np.float64)
+    rows_per_chunk = max(1, max_batch_rows // max(n_b, 1))
+    block = np.empty((n_b, min(rows_per_chunk, n), n_feat), dtype=np.float64)
+    for start in range(0, n, rows_per_chunk):
+        chunk = X[start:start + rows_per_chunk]
+        m = chunk.shape[0]
+        view = block[:, :m]
+        view[:] = chunk
+        view[:, :, budget_col] = budgets[:, None]
+        if price_gap_col is not None and rate_col is not None:
+            np.abs(view[:, :, rate_col] - budgets[:, None], out=view[:, :, price_gap_col])
+        flat = view.reshape(n_b * m, n_feat)
+        if scaler is not None:
+            flat = scaler.transform(flat)
+        out[start:start + m] = model.predict_proba(flat)[:, 1].reshape(n_b, m).T
+    return out
+
+def pricing_curves(model, X, budgets, ids=None, **kwargs):
+    """
+    Per-tutor and aggregate price-success curves.
+    Returns (per_tutor, aggregate): per_tutor has one row per X row and one column
+    per budget; aggregate has budget, probability (mean), p25 and p75.
+    """
+    probs = budget_sweep(model, X, budgets, **kwargs)
+    index = ids if ids is not None else (X.index if isinstance(X, pd.DataFrame) else None)
+    per_tutor = pd.DataFrame(probs, index=index, columns=list(budgets))
+    aggregate = pd.DataFrame({
+        'budget': list(budgets),
+        'probability': probs.mean(axis=0),
+        'p25': np.percentile(probs, 25, axis=0),
+        'p75': np.percentile(probs, 75, axis=0),
+    })
+    return per_tutor, aggregate
 
-def dynamic_pricing_simulator(model, X, budgets):
+def dynamic_pricing_simulator(model, X, budgets, **kwargs):
     """Simulate success probability for different budgets."""
-    results = []
-    for b in budgets:
-        X_temp = X.copy()
-        X_temp['case_budget'] = b
-        prob = model.predict_proba(X_temp)[:,1]
-        results.append({'budget': b, 'probability': prob.mean()})
-    return pd.DataFrame(results)
+    probs = budget_sweep(model, X, budgets, **kwargs)
+    return pd.DataFrame({'budget': list(budgets), 'probability': probs.mean(axis=0)})
@@ -0,0 +1,152 @@
+import os
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.feature_store import CASE_COLUMNS, pair_feature_matrix
+from src.spatial import GridIndex
+from src.tagging import get_tagger
+
+# -----------------------------
+# Subject overlap (one bit per subject tag)
+# -----------------------------
+def subject_masks(texts, tagger=None):
+    """Bitmask of the subject tags found in each text; 0 means no known subject."""
+    tagger = tagger or get_tagger()
+    subjects = tagger.transform(texts)[:, tagger.group_columns("subject")]
+    bits = np.left_shift(np.int64(1), np.arange(subjects.shape[1], dtype=np.int64))
+    return np.asarray(subjects.astype(np.int64) @ bits).ravel()
+
+def tutor_subject_masks(store, tutors):
+    """Subject bitmask per store row, from the tutor bios in tutors.csv."""
+    tutors = tutors.drop_duplicates(subset='tutor_id')
+    masks = np.zeros(len(store), dtype=np.int64)
+    rows = store.rows_for(tutors['tutor_id'])
+    keep = rows >= 0
+    masks[rows[keep]] = subject_masks(tutors['tutor_bio'])[keep]
+    return masks
+
+# -----------------------------
+# Streaming candidate pairs
+# -----------------------------
+def _labeled_pairs(store, cases, results):
+    """Result rows as (case row, store row, label), sorted by case row; unknown ids dropped."""
+    case_rows = pd.Index(cases['case_id']).get_indexer(results['case_id'])
+    tutor_rows = store.rows_for(results['tutor_id'])
+    keep = (case_rows >= 0) & (tutor_rows >= 0)
+    order = np.argsort(case_rows[keep], kind="stable")
+    return (case_rows[keep][order], tutor_rows[keep][order],
+            results['success'].to_numpy()[keep][order].astype(np.float32))
+
+def iter_candidate_pairs(store, cases, results, tutor_masks=None, radius_km=10.0, neg_ratio=3.0,
+                         chunk_cases=5_000, cell_km=None, seed=42):
+    """
+    Yield training pairs chunk by chunk as (case_rows, tutor_rows, labels).
+
+    Every historical result row is kept with its label. On top of that, tutors
+    within `radius_km` of a case who share a subject with it (when `tutor_masks`
+    is given) and were never offered it are sampled as negatives, about
+    `neg_ratio` per positive of that case. Only one chunk of `chunk_cases` cases
+    is materialized at a time, and the same seed yields the same pairs.
+    """
+    rng = np.random.default_rng(seed)
+    grid = GridIndex(store.tutor_features[:, 1], store.tutor_features[:, 2], cell_km=cell_km or radius_km)
+    lab_case, lab_tutor, lab_y = _labeled_pairs(store, cases, results)
+    case_lat = cases['case_lat'].to_numpy(dtype=np.float64)
+    case_lon = cases['case_lon'].to_numpy(dtype=np.float64)
+    descriptions = cases['case_description'] if tutor_masks is not None else None
+    n_tutors = len(store)
+
+    for start in range(0, len(cases), chunk_cases):
+        stop = min(start + chunk_cases, len(cases))
+        lo, hi = np.searchsorted(lab_case, [start, stop])
+        pos_case, pos_tutor, pos_y = lab_case[lo:hi], lab_tutor[lo:hi], lab_y[lo:hi]
+
+        q, t, _ = grid.query_pairs(case_lat[start:stop], case_lon[start:stop], radius_km)
+        if tutor_masks is not None:
+            case_masks = subject_masks(descriptions.iloc[start:stop])
+            overlap = (case_masks[q] & tutor_masks[t]) != 0
+            q, t = q[overlap], t[overlap]
+        q = q + start
+
+        # Drop pairs that already have a label
+        seen = np.isin(q * n_tutors + t, pos_case * n_tutors + pos_tutor)
+        q, t = q[~seen], t[~seen]
+
+        # Per-case sampling rate so each case gets ~neg_ratio negatives per positive
+        n_pos = np.bincount(pos_case - start, weights=pos_y, minlength=stop - start)
+        n_cand = np.bincount(q - start, minlength=stop - start)
+        rate = np.minimum(1.0, neg_ratio * n_pos / np.maximum(n_cand, 1))
+        sampled = rng.random(len(q)) < rate[q - start]
+
+        case_rows = np.concatenate([pos_case, q[sampled]])
+        tutor_rows = np.concatenate([pos_tutor, t[sampled]])
+        labels = np.concatenate([pos_y, np.zeros(sampled.sum(), dtype=np.float32)])
+        order = np.argsort(case_rows, kind="stable")
+        yield case_rows[order], tutor_rows[order], labels[order]
+
+def candidate_feature_chunks(store, cases, pair_chunks, max_rows=1_000_000, scaler=None):
+    """
+    Turn pair chunks into (X, y) float32 blocks of at most `max_rows` rows,
+    in training column order.
+    """
+    case_cols = {col: cases[col].to_numpy() for col in CASE_COLUMNS}
+    for case_rows, tutor_rows, labels in pair_chunks:
+        for s in range(0, len(labels), max_rows):
+            rows = case_rows[s:s + max_rows]
+            X = pair_feature_matrix(store, {col: v[rows] for col, v in case_cols.items()},
+                                    tutor_rows[s:s + max_rows])
+            if scaler is not None:
+                X = scaler.transform(X)
+            yield X.astype(np.float32), labels[s:s + max_rows]
+
+# -----------------------------
+# XGBoost iterator / external memory
+# -----------------------------
+class CandidateIter(xgb.DataIter):
+    """
+    Feeds candidate blocks to XGBoost one at a time. `make_chunks` must return a
+    fresh (X, y) generator on each call, since XGBoost makes several passes.
+    With `cache_prefix` set, XGBoost pages the data to disk (external memory).
+    """
+    def __init__(self, make_chunks, cache_prefix=None):
+        self._make_chunks = make_chunks
+        self._it = None
+        self.n_rows = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._it is None:
+            self._it = self._make_chunks()
+        try:
+            X, y = next(self._it)
+        except StopIteration:
+            return False
+        self.n_rows += len(y)
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self._it = None
+        self.n_rows = 0
+
+def candidate_dmatrix(make_chunks, cache_dir=None):
+    """QuantileDMatrix held in memory, or a disk-backed DMatrix when `cache_dir` is given."""
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        return xgb.DMatrix(CandidateIter(make_chunks, cache_prefix=os.path.join(cache_dir, "candidates")))
+    return xgb.QuantileDMatrix(CandidateIter(make_chunks))
+
+def train_on_candidates(dtrain, params, save_path="models/xgb_model.json"):
+    """
+    Train with xgb.train on a candidate DMatrix using sklearn-style `params`
+    (e.g. get_train_params()); the saved model loads with ranking_model.load_model.
+    """
+    params = dict(params)
+    num_boost_round = params.pop("n_estimators", 100)
+    params.pop("use_label_encoder", None)
+    booster = xgb.train({**params, "objective": "binary:logistic", "tree_method": "hist"},
+                        dtrain, num_boost_round=num_boost_round)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    booster.save_model(save_path)
+    return booster
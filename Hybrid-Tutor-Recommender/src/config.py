@@ -3,20 +3,23 @@ import os
 # Paths
 RAW_DATA_PATH = "data/raw/"
 PROCESSED_DATA_PATH = "data/processed/"
+PROCESSED_CACHE_PATH = "data/processed/cache/"
 EMBEDDINGS_PATH = "data/embeddings/"
 MODEL_PATH = "models/xgb_model.json"
 SCALER_PATH = "models/scaler.pkl"
+FEATURE_SPEC_PATH = "models/feature_spec.json"
 PCA_PATH = "models/pca.pkl"
+ARTIFACT_MANIFEST_PATH = "models/artifacts.json"
+PARAMS_DIR = "models/params/"
+FEATURE_STORE_PATH = "data/processed/tutor_features.npz"
+BI_AGGREGATES_PATH = "data/processed/aggregates/"
+EMBEDDING_CACHE_PATH = "data/embeddings/cache.sqlite"
+TUTOR_EMBEDDINGS_PATH = "data/embeddings/tutor_vectors"
 
 # API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Hyperparameters
+EMBEDDING_MODEL = "text-embedding-3-small"
 EMBED_DIM = 128
-XGB_PARAMS = {
-    "n_estimators": 500,
-    "max_depth": 6,
-    "learning_rate": 0.05,
-    "objective": "binary:logistic",
-    "random_state": 42
-}
+# Model hyperparameters: ranking_model.TRAIN_PARAMS, overridden by tuned params in PARAMS_DIR
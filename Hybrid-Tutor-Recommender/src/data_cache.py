@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from src.config import RAW_DATA_PATH, PROCESSED_CACHE_PATH
+from src.data_pipeline import load_data, merge_datasets, preprocess
+
+# -----------------------------
+# Columnar cache of the merged + preprocessed table
+# -----------------------------
+# The cache is a directory of Parquet parts plus a manifest recording a
+# fingerprint of each raw CSV. Unchanged inputs -> read Parquet. Rows appended
+# to results.csv -> only the new rows are merged and written as a new part.
+# Anything else -> full rebuild.
+
+SOURCES = ["cases", "tutors", "results"]
+CATEGORICAL_COLUMNS = ['case_description', 'preferred_gender', 'tutor_name', 'tutor_bio', 'gender']
+KEY_COLUMNS = ['case_id', 'tutor_id', 'success']
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _sha256(path, limit=None, block_size=1 << 20):
+    h = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            block = f.read(block_size if remaining is None else min(block_size, remaining))
+            if not block:
+                break
+            h.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return h.hexdigest()
+
+def _last_byte(path, size):
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1)
+
+def fingerprint(path, previous=None):
+    """Size, mtime and content hash; the hash is reused when size and mtime are unchanged."""
+    st = os.stat(path)
+    if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+        return dict(previous)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _sha256(path)}
+
+def optimize_dtypes(df):
+    """Categoricals for repeated text, narrow ints for ids and labels."""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in ['case_id', 'tutor_id', 'case_budget', 'tutor_rate']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    if 'success' in df.columns:
+        df['success'] = df['success'].astype('int8')
+    return df
+
+def _read_manifest(cache_dir):
+    path = os.path.join(cache_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def _read_parts(cache_dir, parts, columns=None):
+    frames = [pd.read_parquet(os.path.join(cache_dir, p), columns=columns) for p in parts]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    # Parts may carry different category sets; re-unify them
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype != 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+def _full_rebuild(raw_path, cache_dir, fps):
+    for name in os.listdir(cache_dir):
+        if name.startswith("part-") and name.endswith(".parquet"):
+            os.remove(os.path.join(cache_dir, name))
+    cases, tutors, results = load_data(raw_path)
+    df = optimize_dtypes(preprocess(merge_datasets(cases, tutors, results)))
+    df.to_parquet(os.path.join(cache_dir, "part-00000.parquet"), index=False)
+    _write_manifest(cache_dir, {"sources": fps, "results_columns": list(results.columns),
+                                "parts": ["part-00000.parquet"]})
+    return df
+
+def _append_results(raw_path, cache_dir, manifest, fps):
+    """Merge only rows appended to results.csv since the last build."""
+    old = manifest["sources"]["results"]
+    results_path = os.path.join(raw_path, "results.csv")
+    with open(results_path, "rb") as f:
+        f.seek(old["size"])
+        new_results = pd.read_csv(f, header=None, names=manifest["results_columns"])
+
+    parts = list(manifest["parts"])
+    if len(new_results):
+        cases = pd.read_csv(os.path.join(raw_path, "cases.csv"))
+        tutors = pd.read_csv(os.path.join(raw_path, "tutors.csv"))
+        delta = preprocess(merge_datasets(cases, tutors, new_results))
+        # preprocess() drops duplicate rows; drop rows already present in earlier parts too
+        seen = _read_parts(cache_dir, parts, columns=KEY_COLUMNS)
+        seen_keys = pd.MultiIndex.from_frame(seen[KEY_COLUMNS].astype('int64'))
+        delta = delta[~pd.MultiIndex.from_frame(delta[KEY_COLUMNS].astype('int64')).isin(seen_keys)]
+        if len(delta):
+            name = f"part-{len(parts):05d}.parquet"
+            optimize_dtypes(delta).to_parquet(os.path.join(cache_dir, name), index=False)
+            parts.append(name)
+
+    _write_manifest(cache_dir, {**manifest, "sources": fps, "parts": parts})
+    return _read_parts(cache_dir, parts)
+
+def load_merged(raw_path=RAW_DATA_PATH, cache_dir=PROCESSED_CACHE_PATH):
+    """
+    Merged, preprocessed tutor data with typed columns, served from the Parquet
+    cache when the raw CSVs are unchanged. Falls back to building in memory
+    when pyarrow is not installed.
+    """
+    if not parquet_available():
+        cases, tutors, results = load_data(raw_path)
+        return preprocess(merge_datasets(cases, tutors, results))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _read_manifest(cache_dir)
+    previous = manifest.get("sources", {})
+    fps = {name: fingerprint(os.path.join(raw_path, f"{name}.csv"), previous.get(name)) for name in SOURCES}
+
+    if not previous or not manifest.get("parts"):
+        return _full_rebuild(raw_path, cache_dir, fps)
+
+    changed = [name for name in SOURCES if fps[name]["sha256"] != previous[name]["sha256"]]
+    if not changed:
+        if fps != previous:  # touched but identical: remember the new mtimes
+            _write_manifest(cache_dir, {**manifest, "sources": fps})
+        return _read_parts(cache_dir, manifest["parts"])
+
+    if changed == ["results"]:
+        old = previous["results"]
+        path = os.path.join(raw_path, "results.csv")
+        appended = (fps["results"]["size"] > old["size"]
+                    and _last_byte(path, old["size"]) == b"\n"
+                    and _sha256(path, limit=old["size"]) == old["sha256"])
+        if appended:
+            return _append_results(raw_path, cache_dir, manifest, fps)
+
+    return _full_rebuild(raw_path, cache_dir, fps)
@@ -1,10 +1,18 @@
+import os
+import numpy as np
 import pandas as pd
-from haversine import haversine
 
-def load_data():
-    cases = pd.read_csv("data/raw/cases.csv")
-    tutors = pd.read_csv("data/raw/tutors.csv")
-    results = pd.read_csv("data/raw/results.csv")
+from src.profiling import profiled
+
+# Same mean Earth radius as the `haversine` package, so both paths return the same km
+AVG_EARTH_RADIUS_KM = 6371.0088
+DISTANCE_CHUNK_SIZE = 1_000_000
+
+@profiled()
+def load_data(raw_path="data/raw/"):
+    cases = pd.read_csv(os.path.join(raw_path, "cases.csv"))
+    tutors = pd.read_csv(os.path.join(raw_path, "tutors.csv"))
+    results = pd.read_csv(os.path.join(raw_path, "results.csv"))
     return cases, tutors, results
 
 def merge_datasets(cases, tutors, results):
@@ -12,12 +20,51 @@ def merge_datasets(cases, tutors, results):
     return df
 
 def compute_distance(row):
-    return haversine((row['case_lat'], row['case_lon']), 
+    from haversine import haversine  # imports numba when installed; keep it off the import path
+    return haversine((row['case_lat'], row['case_lon']),
                      (row['tutor_lat'], row['tutor_lon']))
 
+def haversine_np(lat1, lon1, lat2, lon2, chunk_size=DISTANCE_CHUNK_SIZE):
+    """
+    Vectorized great-circle distance in km between paired coordinate arrays.
+    Inputs broadcast against each other; large inputs are processed in chunks
+    so the temporaries stay bounded.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (lat1, lon1, lat2, lon2))
+    )
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = (a.ravel() for a in (lat1, lon1, lat2, lon2))
+    out = np.empty(lat1.shape[0], dtype=np.float64)
+    step = chunk_size or max(out.shape[0], 1)
+    for start in range(0, out.shape[0], step):
+        sl = slice(start, start + step)
+        _haversine_kernel(lat1[sl], lon1[sl], lat2[sl], lon2[sl], out[sl])
+    return out.reshape(shape)
+
+def _haversine_kernel(lat1, lon1, lat2, lon2, out):
+    # Mirrors haversine._haversine_kernel operation for operation
+    lat1 = np.radians(lat1)
+    lon1 = np.radians(lon1)
+    lat2 = np.radians(lat2)
+    lon2 = np.radians(lon2)
+    d = np.sin((lat2 - lat1) * 0.5) ** 2
+    d += np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    np.sqrt(d, out=d)
+    np.arcsin(d, out=d)
+    d *= 2
+    np.multiply(d, AVG_EARTH_RADIUS_KM, out=out)
+
+def compute_distances(df, chunk_size=DISTANCE_CHUNK_SIZE):
+    """Distance in km between each case and its tutor, for the whole frame at once."""
+    return haversine_np(df['case_lat'].to_numpy(), df['case_lon'].to_numpy(),
+                        df['tutor_lat'].to_numpy(), df['tutor_lon'].to_numpy(),
+                        chunk_size=chunk_size)
+
+@profiled()
 def preprocess(df):
     df = df.drop_duplicates()
-    df['distance_km'] = df.apply(compute_distance, axis=1)
+    df['distance_km'] = compute_distances(df)
     df['price_gap'] = abs(df['tutor_rate'] - df['case_budget'])
     # Add more feature engineering here
     return df
@@ -0,0 +1,213 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.config import EMBEDDINGS_PATH, TUTOR_EMBEDDINGS_PATH
+
+# -----------------------------
+# Memory-mapped tutor embeddings
+# -----------------------------
+# One vector per tutor in three files sharing a path prefix:
+#   <path>.vec   raw float16/float32 rows in append order
+#   <path>.ids   raw int64 tutor_id of each row
+#   <path>.json  {"dim", "dtype", "count"}; count is the commit point
+# Appends write past the end of .vec/.ids and then bump count, so existing rows
+# are never rewritten and a reader that mapped the old count keeps a consistent
+# view. Bytes past count (an interrupted append) are ignored and overwritten by
+# the next append.
+
+def _meta_path(path):
+    return path + ".json"
+
+class EmbeddingStore:
+    """
+    Tutor embeddings in a memory-mapped file with an explicit tutor_id -> row index.
+    Only the rows that are gathered are paged in; nothing is loaded up front.
+    """
+    def __init__(self, path=TUTOR_EMBEDDINGS_PATH, mode="r"):
+        self.path = path
+        self.mode = mode
+        self._map()
+
+    @classmethod
+    def create(cls, path=TUTOR_EMBEDDINGS_PATH, dim=32, dtype="float32"):
+        """Empty store; an existing store at `path` is replaced."""
+        if np.dtype(dtype) not in (np.float16, np.float32):
+            raise ValueError(f"embedding dtype must be float16 or float32, got {dtype}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        for suffix in (".vec", ".ids"):
+            open(path + suffix, "wb").close()
+        _write_meta(path, {"dim": int(dim), "dtype": np.dtype(dtype).name, "count": 0})
+        return cls(path, mode="r+")
+
+    @staticmethod
+    def exists(path=TUTOR_EMBEDDINGS_PATH):
+        return os.path.exists(_meta_path(path))
+
+    def _map(self):
+        with open(_meta_path(self.path)) as f:
+            meta = json.load(f)
+        self.dim, self.dtype, count = meta["dim"], np.dtype(meta["dtype"]), meta["count"]
+        if count:
+            self.vectors = np.memmap(self.path + ".vec", dtype=self.dtype, mode=self.mode, shape=(count, self.dim))
+            self.tutor_ids = np.fromfile(self.path + ".ids", dtype=np.int64, count=count)
+        else:
+            # mmap cannot map an empty file
+            self.vectors = np.empty((0, self.dim), dtype=self.dtype)
+            self.tutor_ids = np.empty(0, dtype=np.int64)
+        # Ids appended in increasing order (the usual case) are looked up by binary
+        # search; otherwise a hash index is built on first use
+        self._sorted = bool((self.tutor_ids[1:] > self.tutor_ids[:-1]).all())
+        self._index = None
+
+    def __len__(self):
+        return self.tutor_ids.shape[0]
+
+    def __contains__(self, tutor_id):
+        return self.rows_for([tutor_id])[0] >= 0
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def rows_for(self, tutor_ids):
+        """Row of each tutor_id; -1 for tutors not in the store."""
+        tutor_ids = np.asarray(tutor_ids)
+        if not len(self):
+            return np.full(tutor_ids.shape, -1, dtype=np.int64)
+        if self._sorted:
+            rows = np.minimum(np.searchsorted(self.tutor_ids, tutor_ids), len(self) - 1)
+            return np.where(self.tutor_ids[rows] == tutor_ids, rows, -1)
+        if self._index is None:
+            self._index = pd.Index(self.tutor_ids)
+        return self._index.get_indexer(tutor_ids)
+
+    def gather(self, rows):
+        """
+        Vectors for store `rows`. A contiguous ascending run comes back as a view of
+        the mapping (no copy); anything else copies just the requested rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size and rows[-1] - rows[0] == rows.size - 1 and (rows.size == 1 or (np.diff(rows) == 1).all()):
+            return self.vectors[rows[0]:rows[-1] + 1]
+        return self.vectors[rows]
+
+    def get(self, tutor_ids, fill=None):
+        """
+        Vectors for `tutor_ids` in the given order. Unknown tutors raise KeyError
+        unless `fill` (e.g. `store.mean()`) is given.
+        """
+        rows = self.rows_for(tutor_ids)
+        missing = rows < 0
+        if not missing.any():
+            return self.gather(rows)
+        if fill is None:
+            raise KeyError(f"{int(missing.sum())} tutor_ids have no embedding, e.g. {np.asarray(tutor_ids)[missing][0]}")
+        out = np.empty((len(rows), self.dim), dtype=self.dtype)
+        out[missing] = fill
+        out[~missing] = self.vectors[rows[~missing]]
+        return out
+
+    def mean(self, chunk_rows=65536):
+        """Mean vector, accumulated in float64 one chunk of rows at a time."""
+        total = np.zeros(self.dim, dtype=np.float64)
+        for start in range(0, len(self), chunk_rows):
+            total += self.vectors[start:start + chunk_rows].sum(axis=0, dtype=np.float64)
+        return (total / max(len(self), 1)).astype(self.dtype)
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def upsert(self, tutor_ids, vectors):
+        """
+        Overwrite the rows of known tutors in place and append new tutors at the
+        end of the file. Returns the number of appended rows.
+        """
+        if self.mode == "r":
+            raise ValueError("store is opened read-only; open it with mode='r+' to write")
+        tutor_ids = np.asarray(tutor_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(len(tutor_ids), self.dim)
+        tutor_ids, first = np.unique(tutor_ids, return_index=True)
+        vectors = vectors[first]
+        rows = self.rows_for(tutor_ids)
+        known = rows >= 0
+        if known.any():
+            self.vectors[rows[known]] = vectors[known]
+            self.vectors.flush()
+        new_ids, new_vectors = tutor_ids[~known], vectors[~known]
+        if len(new_ids):
+            count = len(self)
+            for suffix, data in ((".vec", new_vectors), (".ids", new_ids)):
+                with open(self.path + suffix, "r+b") as f:
+                    f.seek(count * data.itemsize * (self.dim if suffix == ".vec" else 1))
+                    f.write(np.ascontiguousarray(data).tobytes())
+                    f.truncate()
+                    f.flush()
+                    os.fsync(f.fileno())
+            _write_meta(self.path, {"dim": self.dim, "dtype": self.dtype.name, "count": count + len(new_ids)})
+            self._map()
+        return len(new_ids)
+
+def _write_meta(path, meta):
+    tmp = _meta_path(path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(path))
+
+# -----------------------------
+# Build from the merged frame
+# -----------------------------
+def bio_rows(embeddings, n_rows):
+    """
+    Rows of a legacy embeddings_reduced.npy that belong to the merged frame.
+    generate_embeddings stacks case descriptions before tutor bios, so with 2n rows
+    the bios are the second half; an n-row array is already row-aligned.
+    """
+    if embeddings.shape[0] == n_rows:
+        return embeddings
+    if embeddings.shape[0] == 2 * n_rows:
+        return embeddings[n_rows:]
+    raise ValueError(f"{embeddings.shape[0]} embedding rows do not match {n_rows} merged rows")
+
+def load_or_build_embedding_store(df, embeddings=None, path=TUTOR_EMBEDDINGS_PATH, dtype="float32"):
+    """
+    Open the store, first appending a vector for every tutor in `df` it does not
+    have yet. `embeddings` is either row-aligned with `df` (the tutor's first row
+    is used) or a function mapping those first rows to vectors, e.g. one that
+    embeds their bios. Stored tutors are never rewritten.
+    """
+    tutor_ids, first = np.unique(df['tutor_id'].to_numpy(), return_index=True)
+    exists = EmbeddingStore.exists(path)
+    if exists:
+        new = EmbeddingStore(path).rows_for(tutor_ids) < 0
+        if not new.any():
+            return EmbeddingStore(path)
+        tutor_ids, first = tutor_ids[new], first[new]
+    if embeddings is None:
+        raise FileNotFoundError(f"{len(tutor_ids)} tutors have no embedding in {path} and no embeddings were given")
+    if callable(embeddings):
+        vectors = np.asarray(embeddings(df.iloc[first]))
+    else:
+        vectors = bio_rows(np.asarray(embeddings), len(df))[first]
+    writer = EmbeddingStore(path, mode="r+") if exists else EmbeddingStore.create(path, vectors.shape[1], dtype)
+    writer.upsert(tutor_ids, vectors)
+    return EmbeddingStore(path)
+
+def load_tutor_embeddings(df, seed_path=os.path.join(EMBEDDINGS_PATH, "embeddings_reduced.npy"),
+                          path=TUTOR_EMBEDDINGS_PATH):
+    """
+    Store covering every tutor in `df`, for the training scripts. The legacy
+    row-aligned .npy only seeds a store that does not exist yet; tutors seen since
+    (e.g. in appended results) get the mean vector until generate_embeddings
+    embeds their bios.
+    """
+    if not EmbeddingStore.exists(path):
+        seed = np.load(seed_path, mmap_mode='r')
+        try:
+            return load_or_build_embedding_store(df, seed, path)
+        except ValueError as e:
+            raise ValueError(f"{seed_path} cannot seed the embedding store ({e}); "
+                             f"run scripts/generate_embeddings.py") from None
+    mean = EmbeddingStore(path).mean()
+    return load_or_build_embedding_store(df, lambda rows: np.tile(mean, (len(rows), 1)), path)
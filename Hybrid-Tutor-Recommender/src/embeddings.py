@@ -1,31 +1,207 @@
-import openai
-import numpy as np
-from sklearn.decomposition import PCA
+import asyncio
+import hashlib
 import os
+import random
+import re
+import sqlite3
+
+import numpy as np
+
+from src.config import OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, EMBED_DIM
 
 # Optionally set API key via environment variable
 # os.environ["OPENAI_API_KEY"] = "YOUR_OPENAI_KEY"
 
+# -----------------------------
+# Embedders
+# -----------------------------
+class OpenAIEmbedder:
+    """
+    Batched OpenAI embeddings. One request carries up to `batch_size` texts.
+    """
+    def __init__(self, model=EMBEDDING_MODEL, batch_size=100, api_key=None):
+        self.model = model
+        self.name = model
+        self.batch_size = batch_size
+        self.api_key = api_key or OPENAI_API_KEY
+        self._clients = {}
+
+    def _client(self):
+        import openai
+        loop = asyncio.get_running_loop()
+        if id(loop) not in self._clients:
+            self._clients = {id(loop): openai.AsyncOpenAI(api_key=self.api_key)}
+        return self._clients[id(loop)]
+
+    async def embed(self, texts):
+        import openai
+        if hasattr(openai, "AsyncOpenAI"):
+            response = await self._client().embeddings.create(input=texts, model=self.model)
+            data = sorted(response.data, key=lambda d: d.index)
+            return np.array([d.embedding for d in data], dtype=np.float32)
+        # openai<1.0
+        response = await openai.Embedding.acreate(input=texts, model=self.model)
+        data = sorted(response['data'], key=lambda d: d['index'])
+        return np.array([d['embedding'] for d in data], dtype=np.float32)
+
+class HashEmbedder:
+    """
+    Local deterministic embedder (hashed bag of words), for offline runs and tests.
+    Texts sharing words get similar vectors; no network or model download needed.
+    """
+    def __init__(self, dim=EMBED_DIM, batch_size=1000):
+        self.dim = dim
+        self.name = f"local-hash-{dim}"
+        self.batch_size = batch_size
+
+    def embed_one(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", str(text).lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    async def embed(self, texts):
+        return np.stack([self.embed_one(t) for t in texts])
+
+def get_default_embedder():
+    if os.getenv("EMBEDDER", "openai") == "local":
+        return HashEmbedder()
+    return OpenAIEmbedder()
+
+# -----------------------------
+# Persistent cache (SQLite, keyed by text hash + model name)
+# -----------------------------
+def text_key(text, model):
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT, vector BLOB)"
+        )
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items, model):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+            [(k, model, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# -----------------------------
+# Batch embedding API
+# -----------------------------
+# openai>=1.0 and openai<1.0 names for failures worth retrying that carry no status code
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "RateLimitError", "Timeout", "TryAgain",
+                    "ServiceUnavailableError")
+
+def is_retryable(exc):
+    """Rate limits, timeouts, connection failures and 5xx responses; not auth or bad requests."""
+    if isinstance(exc, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "http_status", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    return type(exc).__name__ in RETRYABLE_ERRORS
+
+async def _embed_batch(embedder, texts, semaphore, max_retries, backoff):
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            try:
+                return await embedder.embed(texts)
+            except Exception as e:
+                if attempt == max_retries or not is_retryable(e):
+                    raise
+                # Exponential backoff with jitter (rate limits, transient network errors)
+                await asyncio.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+async def aembed_texts(texts, embedder=None, cache=None, max_concurrency=8, max_retries=5, backoff=0.5):
+    """
+    Embed `texts`, returning an (n, dim) float32 array aligned with the input.
+    Identical texts are embedded once; cached vectors are reused across runs.
+    """
+    embedder = embedder or get_default_embedder()
+    texts = [str(t) for t in texts]
+    keys = [text_key(t, embedder.name) for t in texts]
+    unique = dict(zip(keys, texts))
+
+    vectors = cache.get_many(unique) if cache is not None else {}
+    missing = [k for k in unique if k not in vectors]
+
+    if missing:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async def embed_and_store(batch):
+            # Cached as soon as the batch returns, so a later failing batch does not
+            # throw away (paid-for) batches that already succeeded
+            emb = await _embed_batch(embedder, [unique[k] for k in batch], semaphore, max_retries, backoff)
+            fresh = list(zip(batch, emb))
+            vectors.update(fresh)
+            if cache is not None:
+                cache.put_many(fresh, embedder.name)
+
+        batches = [missing[i:i + embedder.batch_size] for i in range(0, len(missing), embedder.batch_size)]
+        # Let in-flight batches finish (and be cached) before surfacing a failure
+        outcomes = await asyncio.gather(*[embed_and_store(batch) for batch in batches], return_exceptions=True)
+        errors = [e for e in outcomes if isinstance(e, BaseException)]
+        if errors:
+            raise errors[0]
+
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([vectors[k] for k in keys]).astype(np.float32, copy=False)
+
+def embed_texts(texts, embedder=None, cache=None, **kwargs):
+    """Synchronous wrapper around `aembed_texts`; not usable inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(aembed_texts(texts, embedder=embedder, cache=cache, **kwargs))
+    raise RuntimeError("embed_texts was called from a running event loop (e.g. FastAPI or a notebook); "
+                       "use `await aembed_texts(...)` there instead")
+
 # -----------------------------
 # Get embedding from OpenAI
 # -----------------------------
-def get_embedding(text, model="text-embedding-3-small"):
+def get_embedding(text, model=EMBEDDING_MODEL):
     """
     Returns a numeric embedding for a given text using OpenAI embeddings.
     """
-    response = openai.Embedding.create(
-        input=text,
-        model=model
-    )
-    return np.array(response['data'][0]['embedding'])
+    return embed_texts([text], embedder=OpenAIEmbedder(model))[0]
 
 # -----------------------------
 # Dimensionality reduction
 # -----------------------------
-def reduce_embeddings(embeddings, n_components=32):
+def fit_pca(embeddings, n_components=32):
+    """
+    Fit the PCA used to reduce embeddings (train time only).
+    """
+    from sklearn.decomposition import PCA
+    return PCA(n_components=n_components).fit(embeddings)
+
+def reduce_embeddings(embeddings, n_components=32, pca=None):
     """
     Reduce embedding dimensionality using PCA.
+    Pass a fitted `pca` to transform only; otherwise a fresh one is fitted.
     """
-    pca = PCA(n_components=n_components)
-    reduced = pca.fit_transform(embeddings)
-    return reduced
+    if pca is None:
+        pca = fit_pca(embeddings, n_components)
+    return pca.transform(embeddings)
@@ -0,0 +1,143 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.config import FEATURE_SPEC_PATH
+from src.data_pipeline import haversine_np
+from src.embedding_store import EmbeddingStore, bio_rows
+from src.profiling import profiled
+
+# -----------------------------
+# Feature layout (the single definition, shared by training and serving)
+# -----------------------------
+CASE_COLUMNS = ['case_budget', 'case_lat', 'case_lon', 'preferred_gender']
+TUTOR_COLUMNS = ['tutor_rate', 'tutor_lat', 'tutor_lon', 'gender']
+DERIVED_COLUMNS = ['distance_km', 'price_gap']
+NUMERIC_COLUMNS = CASE_COLUMNS + TUTOR_COLUMNS + DERIVED_COLUMNS
+CATEGORICAL_COLUMNS = ['preferred_gender', 'gender']
+# XGBoost splits on float32, so features are assembled in float32 end to end
+FEATURE_DTYPE = np.float32
+
+def category_vocab(df, cols=CATEGORICAL_COLUMNS):
+    """Sorted category lists, i.e. the order pandas assigns codes in."""
+    return {col: sorted(df[col].dropna().unique().tolist()) for col in cols if col in df.columns}
+
+# -----------------------------
+# Compiled feature spec
+# -----------------------------
+# The column order and category vocabularies are fixed when the spec is fitted
+# and saved next to the model, so a code never depends on which values happen to
+# be in the frame being encoded. Every feature matrix (training frames, online
+# cases, batch pairs) is written by assemble() straight into one preallocated
+# float32 matrix instead of copying the frame, dropping columns and stacking the
+# embeddings.
+
+class FeatureSpec:
+    """Frozen feature layout: NUMERIC_COLUMNS, then `emb_dim` embedding columns."""
+    def __init__(self, categories, emb_dim, columns=NUMERIC_COLUMNS):
+        self.columns = list(columns)
+        self.categories = {k: list(v) for k, v in categories.items()}
+        self.emb_dim = int(emb_dim)
+        self._lookups = {col: pd.Index(vocab) for col, vocab in self.categories.items()}
+
+    @classmethod
+    def fit(cls, df, emb_dim):
+        """Vocabularies from the training frame, in the order pandas assigns codes."""
+        return cls(category_vocab(df), emb_dim)
+
+    @property
+    def n_features(self):
+        return len(self.columns) + self.emb_dim
+
+    @property
+    def feature_names(self):
+        return self.columns + [f"emb_{i}" for i in range(self.emb_dim)]
+
+    def encode(self, col, values):
+        """Codes of `values` (array or scalar) in the frozen vocabulary; unknown or missing -> -1."""
+        lookup = self._lookups.get(col, pd.Index([]))
+        if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+            # Map the (few) categories instead of every row
+            codes = values.cat.codes.to_numpy()
+            return np.where(codes >= 0, lookup.get_indexer(values.cat.categories)[codes], -1)
+        return lookup.get_indexer(np.atleast_1d(np.asarray(values, dtype=object)))
+
+    def assemble(self, columns, n, embeddings, out=None, encoded=(), chunk_rows=65536):
+        """
+        (n, n_features) float32 matrix written into `out` (reused across batches
+        when it has enough rows). `columns` maps feature columns to length-n arrays
+        or scalars (broadcast); categorical values are encoded unless listed in
+        `encoded` (already codes in this vocabulary), and distance_km/price_gap are
+        computed when absent. `embeddings` is an EmbeddingStore (looked up by the
+        tutor_id column) or an array row-aligned with the rows.
+        """
+        if out is None or out.shape[0] < n:
+            out = np.empty((n, self.n_features), dtype=FEATURE_DTYPE)
+        out = out[:n]
+        for j, col in enumerate(self.columns):
+            if col in CATEGORICAL_COLUMNS and col not in encoded:
+                out[:, j] = self.encode(col, columns.get(col))
+            elif col in columns:
+                out[:, j] = columns[col]
+            elif col == 'distance_km':
+                out[:, j] = haversine_np(columns['case_lat'], columns['case_lon'],
+                                         columns['tutor_lat'], columns['tutor_lon'])
+            elif col == 'price_gap':
+                out[:, j] = np.abs(np.asarray(columns['tutor_rate'], dtype=np.float64)
+                                   - np.asarray(columns['case_budget'], dtype=np.float64))
+            else:
+                raise KeyError(col)
+        emb = out[:, len(self.columns):]
+        if isinstance(embeddings, EmbeddingStore):
+            rows = embeddings.rows_for(np.asarray(columns['tutor_id']))
+            if (rows < 0).any():
+                raise KeyError(f"{int((rows < 0).sum())} rows have tutors without an embedding")
+            # Gather in chunks so the temporary copy stays bounded
+            for start in range(0, n, chunk_rows):
+                emb[start:start + chunk_rows] = embeddings.vectors[rows[start:start + chunk_rows]]
+        else:
+            emb[:] = bio_rows(embeddings, n)
+        return out
+
+    @profiled("assemble_features")
+    def transform(self, df, embeddings, out=None, chunk_rows=65536):
+        """
+        Feature matrix for merged rows (see assemble). `embeddings` is an
+        EmbeddingStore or an array row-aligned with `df`.
+        """
+        columns = {col: df[col] for col in df.columns}
+        return self.assemble(columns, len(df), embeddings, out=out, chunk_rows=chunk_rows)
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def to_dict(self):
+        return {"columns": self.columns, "categories": self.categories, "emb_dim": self.emb_dim,
+                "dtype": np.dtype(FEATURE_DTYPE).name}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["categories"], d["emb_dim"], d["columns"])
+
+    def save(self, path=FEATURE_SPEC_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path=FEATURE_SPEC_PATH):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+def fit_scaler(X, chunk_rows=65536):
+    """
+    StandardScaler fitted chunk by chunk. A single fit() upcasts a float32 matrix
+    to a full float64 copy; partial_fit only ever upcasts one chunk.
+    """
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    for start in range(0, X.shape[0], chunk_rows):
+        scaler.partial_fit(X[start:start + chunk_rows])
+    return scaler
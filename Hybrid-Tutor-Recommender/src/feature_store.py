@@ -0,0 +1,243 @@
+import os
+import numpy as np
+import pandas as pd
+
+from src.config import FEATURE_STORE_PATH, RAW_DATA_PATH
+from src.embedding_store import EmbeddingStore
+from src.feature_spec import (CASE_COLUMNS, CATEGORICAL_COLUMNS, DERIVED_COLUMNS, FEATURE_DTYPE,  # noqa: F401
+                              NUMERIC_COLUMNS, TUTOR_COLUMNS, FeatureSpec, category_vocab)
+from src.profiling import profiled
+
+class TutorFeatureStore:
+    """
+    Array-backed tutor features, one row per tutor_id (categorical columns hold
+    their codes). Case features are broadcast against it at request time, through
+    a FeatureSpec over the store's vocabularies.
+
+    Embeddings may be a view of an EmbeddingStore mapping (`embedding_path` is then
+    its path): they are kept in the stored float16/float32 dtype and only the rows
+    a request gathers are read.
+    """
+    def __init__(self, tutor_ids, tutor_features, embeddings, tutor_names, categories, embedding_path=None,
+                 spec=None):
+        self.tutor_ids = np.asarray(tutor_ids)
+        self.tutor_features = np.ascontiguousarray(tutor_features, dtype=np.float64)
+        embeddings = np.asarray(embeddings)
+        self.embeddings = embeddings if embeddings.dtype.kind == 'f' else embeddings.astype(np.float64)
+        self.tutor_names = np.asarray(tutor_names)
+        self.categories = {k: list(v) for k, v in categories.items()}
+        self.embedding_path = embedding_path
+        self.spec = spec or FeatureSpec(self.categories, self.embeddings.shape[1])
+
+    def __len__(self):
+        return self.tutor_ids.shape[0]
+
+    @property
+    def n_features(self):
+        return self.spec.n_features
+
+    @property
+    def feature_names(self):
+        return self.spec.feature_names
+
+    @property
+    def tutor_rate(self):
+        return self.tutor_features[:, 0]
+
+    def take(self, rows):
+        """Store restricted to `rows` (e.g. retrieved candidates); gathers only those rows."""
+        rows = np.asarray(rows)
+        return TutorFeatureStore(self.tutor_ids[rows], self.tutor_features[rows], self.embeddings[rows],
+                                 self.tutor_names[rows], self.categories, self.embedding_path, self.spec)
+
+    def rows_for(self, tutor_ids):
+        """Store row of each tutor_id; -1 for tutors not in the store."""
+        return pd.Index(self.tutor_ids).get_indexer(np.asarray(tutor_ids))
+
+    def encode_category(self, col, value):
+        """Same codes as `astype('category').cat.codes` on the training frame; unknown -> -1."""
+        return int(self.spec.encode(col, value)[0])
+
+    def save(self, path=FEATURE_STORE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Vectors that live in an EmbeddingStore are referenced, not copied
+        vectors = {'embedding_path': np.asarray(self.embedding_path)} if self.embedding_path else \
+            {'embeddings': self.embeddings}
+        np.savez(path,
+                 tutor_ids=self.tutor_ids,
+                 tutor_features=self.tutor_features,
+                 **vectors,
+                 tutor_names=self.tutor_names.astype(str),
+                 **{f"cat_{k}": np.asarray(v, dtype=str) for k, v in self.categories.items()})
+
+    @classmethod
+    def load(cls, path=FEATURE_STORE_PATH):
+        with np.load(path) as data:
+            categories = {k[len("cat_"):]: data[k].tolist() for k in data.files if k.startswith("cat_")}
+            if 'embedding_path' not in data.files:
+                return cls(data['tutor_ids'], data['tutor_features'], data['embeddings'],
+                           data['tutor_names'], categories)
+            tutor_ids, embedding_path = data['tutor_ids'], str(data['embedding_path'])
+            embeddings = tutor_embeddings(EmbeddingStore(embedding_path), tutor_ids)
+            return cls(tutor_ids, data['tutor_features'], embeddings, data['tutor_names'], categories, embedding_path)
+
+# -----------------------------
+# Build store
+# -----------------------------
+def per_tutor_embeddings(row_tutor_ids, row_embeddings, tutor_ids):
+    """
+    Collapse row-aligned embeddings to one vector per tutor (first occurrence).
+    Tutors with no rows get the mean embedding.
+    """
+    row_tutor_ids = np.asarray(row_tutor_ids)
+    row_embeddings = np.asarray(row_embeddings, dtype=np.float64)
+    uniq, first = np.unique(row_tutor_ids, return_index=True)
+    out = np.tile(row_embeddings.mean(axis=0), (len(tutor_ids), 1))
+    pos = np.searchsorted(uniq, tutor_ids)
+    pos = np.clip(pos, 0, len(uniq) - 1)
+    found = uniq[pos] == tutor_ids
+    out[found] = row_embeddings[first[pos[found]]]
+    return out
+
+def tutor_embeddings(embedding_store, tutor_ids):
+    """
+    Vectors for `tutor_ids` from an EmbeddingStore, in that order. When the ids are
+    a contiguous run of store rows (the usual case) this is a view of the mapping;
+    tutors without a vector yet get the mean embedding.
+    """
+    rows = embedding_store.rows_for(tutor_ids)
+    if (rows < 0).any():
+        return embedding_store.get(tutor_ids, fill=embedding_store.mean())
+    return embedding_store.gather(rows)
+
+def build_feature_store(tutors, embeddings, categories):
+    """
+    Build the store from tutors.csv rows and either one embedding row per tutor or
+    an EmbeddingStore keyed by tutor_id.
+    """
+    tutors = tutors.drop_duplicates(subset='tutor_id')
+    embedding_path = None
+    if isinstance(embeddings, EmbeddingStore):
+        embedding_path = embeddings.path
+        embeddings = tutor_embeddings(embeddings, tutors['tutor_id'].to_numpy())
+    spec = FeatureSpec(categories, np.shape(embeddings)[1])
+    features = np.empty((len(tutors), len(TUTOR_COLUMNS)), dtype=np.float64)
+    for j, col in enumerate(TUTOR_COLUMNS):
+        if col in CATEGORICAL_COLUMNS:
+            features[:, j] = spec.encode(col, tutors[col])
+        else:
+            features[:, j] = tutors[col].to_numpy(dtype=np.float64)
+    return TutorFeatureStore(
+        tutor_ids=tutors['tutor_id'].to_numpy(),
+        tutor_features=features,
+        embeddings=embeddings,
+        tutor_names=tutors['tutor_name'].to_numpy(),
+        categories=categories,
+        embedding_path=embedding_path,
+        spec=spec,
+    )
+
+def load_or_build_feature_store(tutors_path, df, embeddings, path=FEATURE_STORE_PATH, categories=None):
+    """
+    Reuse the saved store unless tutors.csv is newer than it. `embeddings` is an
+    EmbeddingStore, or embeddings row-aligned with `df` (collapsed per tutor and
+    copied into the saved store). `categories` (e.g. the model's FeatureSpec
+    vocabularies) default to those of `df`.
+    """
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(tutors_path):
+        store = TutorFeatureStore.load(path)
+        # A store saved from other vectors is rebuilt on top of the embedding store, and
+        # one saved under other vocabularies is rebuilt so its codes match the model's
+        same_vectors = not isinstance(embeddings, EmbeddingStore) or store.embedding_path == embeddings.path
+        same_codes = categories is None or all(store.categories.get(col) == list(vocab)
+                                               for col, vocab in categories.items())
+        if same_vectors and same_codes:
+            return store
+    tutors = pd.read_csv(tutors_path)
+    if not isinstance(embeddings, EmbeddingStore):
+        embeddings = per_tutor_embeddings(df['tutor_id'].to_numpy(), embeddings, tutors['tutor_id'].to_numpy())
+    store = build_feature_store(tutors, embeddings, category_vocab(df) if categories is None else categories)
+    store.save(path)
+    return store
+
+def get_spec_and_store(path=FEATURE_STORE_PATH):
+    """
+    The persisted FeatureSpec (the vocabularies the model was trained with) and
+    the tutor store encoded with it, built from the merged data and the embedding
+    store if needed. Without a usable spec one is fitted from the data.
+    """
+    from src.artifacts import ArtifactVersionError, load_feature_spec
+    from src.data_cache import load_merged
+    from src.embedding_store import load_tutor_embeddings
+    df = load_merged()
+    embeddings = load_tutor_embeddings(df)
+    try:
+        spec = load_feature_spec()
+    except (FileNotFoundError, ArtifactVersionError):
+        spec = None
+    if spec is None or spec.emb_dim != embeddings.dim:
+        spec = FeatureSpec.fit(df, embeddings.dim)
+    store = load_or_build_feature_store(os.path.join(RAW_DATA_PATH, "tutors.csv"), df, embeddings, path=path,
+                                        categories=spec.categories)
+    return spec, store
+
+def get_store(path=FEATURE_STORE_PATH):
+    return get_spec_and_store(path)[1]
+
+# -----------------------------
+# Online scoring
+# -----------------------------
+def _tutor_columns(store, rows=None):
+    """TUTOR_COLUMNS of the store (optionally of `rows`) as a column mapping for FeatureSpec.assemble."""
+    features = store.tutor_features if rows is None else store.tutor_features[rows]
+    return dict(zip(TUTOR_COLUMNS, features.T))
+
+def case_feature_matrix(store, budget, case_lat, case_lon, preferred_gender=None, out=None):
+    """
+    Broadcast one case against every tutor in the store.
+    Returns an (n_tutors, n_features) matrix in training column order.
+    """
+    columns = _tutor_columns(store)
+    columns.update(case_budget=budget, case_lat=case_lat, case_lon=case_lon, preferred_gender=preferred_gender)
+    return store.spec.assemble(columns, len(store), store.embeddings, out=out, encoded=('gender',))
+
+def pair_feature_matrix(store, cases, tutor_rows, out=None):
+    """
+    Features for arbitrary (case, tutor) pairs, e.g. historical result rows.
+    `cases` has one row per pair with the CASE_COLUMNS; `tutor_rows` are store rows.
+    """
+    tutor_rows = np.asarray(tutor_rows)
+    columns = _tutor_columns(store, tutor_rows)
+    columns.update({col: np.asarray(cases[col]) for col in CASE_COLUMNS})
+    return store.spec.assemble(columns, len(tutor_rows), store.embeddings[tutor_rows], out=out,
+                               encoded=('gender',))
+
+def result_feature_matrix(store, cases, results):
+    """
+    (X, y) for result rows (case_id, tutor_id, success) built from cases.csv and the
+    store. Rows whose case or tutor is unknown are dropped.
+    """
+    pairs = results.merge(cases, on='case_id', how='inner')
+    rows = store.rows_for(pairs['tutor_id'])
+    keep = rows >= 0
+    pairs, rows = pairs[keep], rows[keep]
+    return pair_feature_matrix(store, pairs, rows), pairs['success'].to_numpy()
+
+@profiled()
+def score_case(model, store, scaler, budget, case_lat, case_lon, preferred_gender=None):
+    """Score one case against all tutors in `store` in a single predict_proba call."""
+    X = case_feature_matrix(store, budget, case_lat, case_lon, preferred_gender)
+    X = scaler.transform(X)
+    return model.predict_proba(X)[:, 1], X
+
+@profiled()
+def retrieve_and_score(model, store, scaler, index, case_embedding, k, budget, case_lat, case_lon,
+                       preferred_gender=None):
+    """
+    Two-stage ranking: the index returns the k tutors closest to the case embedding,
+    and only those go through the model. Returns (candidate store, scores, X).
+    """
+    rows, _ = index.search(case_embedding, k)
+    candidates = store.take(rows)
+    scores, X = score_case(model, candidates, scaler, budget, case_lat, case_lon, preferred_gender)
+    return candidates, scores, X
@@ -0,0 +1,182 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# -----------------------------
+# Stage timing telemetry
+# -----------------------------
+# Instrumented stages append one record per call (duration, rows, RSS delta)
+# to an in-process ring buffer, so the last few thousand calls are always
+# available for a debug panel or an export, at the cost of two clock reads and
+# two /proc reads per call. Lifetime totals per stage are kept separately so the
+# exported counters stay monotonic as old records fall out of the buffer.
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def count_rows(obj):
+    """Rows in a frame, array, sparse matrix, feature store or tuple of those; None if unknown."""
+    if obj is None or isinstance(obj, (str, bytes, dict)):
+        return None
+    shape = getattr(obj, "shape", None)
+    if shape:
+        return int(shape[0])
+    if isinstance(obj, tuple):
+        counts = [c for c in map(count_rows, obj) if c is not None]
+        return sum(counts) if counts else None
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+class StageRecorder:
+    """Thread-safe ring buffer of stage records plus per-stage lifetime totals."""
+    def __init__(self, maxlen=2048):
+        self.records = deque(maxlen=maxlen)
+        self.totals = {}
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Time the block as stage `name`. The yielded record is a dict; set
+        record["rows"] inside the block when the row count is only known there.
+        """
+        record = {"stage": name, "rows": rows}
+        if not self.enabled:
+            yield record
+            return
+        stack = self._stack()
+        record["parent"] = stack[-1] if stack else None
+        stack.append(name)
+        rss_before = current_rss_bytes()
+        record["start"] = time.time()
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["duration_s"] = time.perf_counter() - start
+            rss_after = current_rss_bytes()
+            record["rss_delta_bytes"] = (rss_after - rss_before) if None not in (rss_before, rss_after) else None
+            stack.pop()
+            self._add(record)
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.setdefault(record["stage"], {"calls": 0, "errors": 0, "seconds": 0.0, "rows": 0})
+            totals["calls"] += 1
+            totals["errors"] += "error" in record
+            totals["seconds"] += record["duration_s"]
+            totals["rows"] += record["rows"] or 0
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(r) for r in self.records], {k: dict(v) for k, v in self.totals.items()}
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self.totals.clear()
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    def summary(self):
+        """Per-stage DataFrame over the buffered calls: calls, total/mean/p50/p95/max ms, rows, mean RSS delta."""
+        import pandas as pd
+        records, _ = self.snapshot()
+        if not records:
+            return pd.DataFrame(columns=['calls', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms',
+                                         'rows', 'mean_rss_delta_mb'])
+        df = pd.DataFrame(records)
+        df['ms'] = df['duration_s'] * 1000
+        df['rss_mb'] = pd.to_numeric(df['rss_delta_bytes'], errors='coerce') / 2**20
+        grouped = df.groupby('stage', sort=False)
+        return pd.DataFrame({
+            'calls': grouped.size(),
+            'total_ms': grouped['ms'].sum(),
+            'mean_ms': grouped['ms'].mean(),
+            'p50_ms': grouped['ms'].median(),
+            'p95_ms': grouped['ms'].quantile(0.95),
+            'max_ms': grouped['ms'].max(),
+            'rows': pd.to_numeric(grouped['rows'].sum(min_count=1)).astype('Int64'),
+            'mean_rss_delta_mb': grouped['rss_mb'].mean(),
+        }).sort_values('total_ms', ascending=False)
+
+    def to_json(self, indent=None):
+        records, totals = self.snapshot()
+        return json.dumps({"records": records, "totals": totals}, indent=indent)
+
+    def to_openmetrics(self, prefix="recommender_stage"):
+        """
+        OpenMetrics text: lifetime call/error/row counters and duration sums per
+        stage, plus p50/p95 durations over the buffered calls.
+        """
+        records, totals = self.snapshot()
+        by_stage = {}
+        for r in records:
+            by_stage.setdefault(r["stage"], []).append(r["duration_s"])
+        lines = [f"# TYPE {prefix}_duration_seconds summary", f"# UNIT {prefix}_duration_seconds seconds"]
+        for stage, t in totals.items():
+            label = _label(stage)
+            durations = sorted(by_stage.get(stage, []))
+            for q in (0.5, 0.95):
+                if durations:
+                    value = durations[min(len(durations) - 1, int(q * len(durations)))]
+                    lines.append(f'{prefix}_duration_seconds{{stage="{label}",quantile="{q}"}} {value:.9g}')
+            lines.append(f'{prefix}_duration_seconds_sum{{stage="{label}"}} {t["seconds"]:.9g}')
+            lines.append(f'{prefix}_duration_seconds_count{{stage="{label}"}} {t["calls"]}')
+        for metric, key in (("errors", "errors"), ("rows", "rows")):
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            lines.extend(f'{prefix}_{metric}_total{{stage="{_label(stage)}"}} {t[key]}' for stage, t in totals.items())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+RECORDER = StageRecorder(maxlen=int(os.getenv("PROFILE_BUFFER_SIZE", "2048")))
+RECORDER.enabled = os.getenv("PROFILE_STAGES", "1") != "0"
+
+def stage(name, rows=None):
+    """Context manager recording one call of `name` on the shared recorder."""
+    return RECORDER.stage(name, rows)
+
+def profiled(name=None):
+    """
+    Decorator recording every call of the function as a stage. Rows are taken
+    from the first positional argument that has rows (a frame, array or feature
+    store), else from the return value.
+    """
+    def decorate(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rows = next((n for n in map(count_rows, args) if n is not None), None)
+            with RECORDER.stage(stage_name, rows) as record:
+                result = fn(*args, **kwargs)
+                if record["rows"] is None:
+                    record["rows"] = count_rows(result)
+            return result
+        return wrapper
+    return decorate
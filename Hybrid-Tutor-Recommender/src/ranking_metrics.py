@@ -0,0 +1,94 @@
+import numpy as np
+
+# -----------------------------
+# Group-sorted arrays
+# -----------------------------
+def group_sort(group_ids, *arrays):
+    """
+    Stable-sort rows by group id so each group (e.g. case_id) is contiguous, as
+    XGBoost's ranking objectives require. Returns (sorted group ids, *sorted arrays).
+    """
+    group_ids = np.asarray(group_ids)
+    order = np.argsort(group_ids, kind="stable")
+    return (group_ids[order],) + tuple(np.asarray(a)[order] for a in arrays)
+
+def group_offsets(sorted_group_ids):
+    """Start offset of every group plus a final end offset, for contiguous groups."""
+    sorted_group_ids = np.asarray(sorted_group_ids)
+    if len(sorted_group_ids) == 0:
+        return np.zeros(1, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, sorted_group_ids[1:] != sorted_group_ids[:-1]])
+    return np.append(starts, len(sorted_group_ids))
+
+def _ranked(y, scores, group_ids):
+    """
+    Rows ordered by group, then by descending score. Returns (relevance in that
+    order, 0-based rank within the group, group index per row, number of groups).
+    """
+    order = np.lexsort((-np.asarray(scores, dtype=np.float64), np.asarray(group_ids)))
+    g = np.asarray(group_ids)[order]
+    offsets = group_offsets(g)
+    sizes = np.diff(offsets)
+    group_idx = np.repeat(np.arange(len(sizes)), sizes)
+    rank = np.arange(len(g)) - offsets[:-1][group_idx]
+    return np.asarray(y, dtype=np.float64)[order], rank, group_idx, len(sizes)
+
+# -----------------------------
+# Metrics (sorts and bincounts over all rows, no per-group Python loop)
+# -----------------------------
+def _dcg(ranked, k):
+    rel, rank, group_idx, n_groups = ranked
+    top = rank < k
+    gains = (2.0 ** rel[top] - 1) / np.log2(rank[top] + 2.0)
+    return np.bincount(group_idx[top], weights=gains, minlength=n_groups)
+
+def _ndcg(ranked, ideal, k):
+    dcg, idcg = _dcg(ranked, k), _dcg(ideal, k)
+    per_group = np.full(len(dcg), np.nan)
+    has_rel = idcg > 0
+    per_group[has_rel] = dcg[has_rel] / idcg[has_rel]
+    return per_group
+
+def _average_precision(ranked, k):
+    rel, rank, group_idx, n_groups = ranked
+    rel = rel > 0
+    hits = np.cumsum(rel)
+    # Relevant rows seen in the group up to and including this one
+    before = np.r_[0, hits][np.flatnonzero(rank == 0)][group_idx]
+    precision = (hits - before) / (rank + 1.0)
+    top = (rank < k) & rel
+    ap_sum = np.bincount(group_idx[top], weights=precision[top], minlength=n_groups)
+    n_rel = np.bincount(group_idx, weights=rel, minlength=n_groups)
+    per_group = np.full(n_groups, np.nan)
+    has_rel = n_rel > 0
+    per_group[has_rel] = ap_sum[has_rel] / np.minimum(k, n_rel[has_rel])
+    return per_group
+
+def _mean(per_group):
+    return float(np.nanmean(per_group)) if np.isfinite(per_group).any() else float("nan")
+
+def ndcg_at_k(y, scores, group_ids, k=10):
+    """
+    Mean NDCG@k over groups with at least one relevant row, using gains 2^rel - 1.
+    Returns (mean, per-group array with NaN for groups without relevant rows).
+    """
+    per_group = _ndcg(_ranked(y, scores, group_ids), _ranked(y, y, group_ids), k)
+    return _mean(per_group), per_group
+
+def map_at_k(y, scores, group_ids, k=10):
+    """
+    Mean average precision@k over groups with at least one relevant row
+    (relevant means y > 0). AP@k is normalized by min(k, relevant rows in group).
+    Returns (mean, per-group array with NaN for groups without relevant rows).
+    """
+    per_group = _average_precision(_ranked(y, scores, group_ids), k)
+    return _mean(per_group), per_group
+
+def ranking_report(y, scores, group_ids, ks=(5, 10)):
+    """NDCG@k and MAP@k for each k as a flat dict; rows are sorted once for all k."""
+    ranked, ideal = _ranked(y, scores, group_ids), _ranked(y, y, group_ids)
+    report = {}
+    for k in ks:
+        report[f"ndcg@{k}"] = _mean(_ndcg(ranked, ideal, k))
+        report[f"map@{k}"] = _mean(_average_precision(ranked, k))
+    return report
@@ -1,8 +1,22 @@
-import xgboost as xgb
 import numpy as np
-import shap
 import os
 
+from src.profiling import profiled
+
+TRAIN_PARAMS = {
+    "n_estimators": 100,
+    "max_depth": 4,
+    "learning_rate": 0.1,
+    "use_label_encoder": False,
+    "eval_metric": 'logloss',
+}
+
+def get_train_params():
+    """TRAIN_PARAMS, overridden by the latest tuned params file if one exists."""
+    from src.tuning import load_best_params
+    tuned = load_best_params()
+    return {**TRAIN_PARAMS, **tuned} if tuned else dict(TRAIN_PARAMS)
+
 # -----------------------------
 # Train XGBoost model
 # -----------------------------
@@ -10,22 +24,63 @@ def train_model(X, y, save_path="models/xgb_model.json"):
     """
     Train XGBoost classifier on numeric + tutor embeddings only.
     """
-    model = xgb.XGBClassifier(
-        n_estimators=100,
-        max_depth=4,
-        learning_rate=0.1,
-        use_label_encoder=False,
-        eval_metric='logloss'
-    )
+    import xgboost as xgb  # imported per call so explanation/serving helpers load without it
+    model = xgb.XGBClassifier(**get_train_params())
     model.fit(X, y)
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     model.save_model(save_path)
     return model
 
+# -----------------------------
+# Learning-to-rank (cases are the query groups)
+# -----------------------------
+RANK_OBJECTIVES = ("rank:pairwise", "rank:ndcg", "rank:map")
+
+def train_ranker(X, y, group_ids, objective="rank:ndcg", save_path="models/xgb_ranker.json"):
+    """
+    Train an XGBRanker with one query group per case. Rows may come in any order;
+    they are sorted by group id here. Scores are relative within a case, not
+    probabilities.
+    """
+    import xgboost as xgb
+    from src.ranking_metrics import group_sort
+    if objective not in RANK_OBJECTIVES:
+        raise ValueError(f"objective must be one of {RANK_OBJECTIVES}")
+    qid, X, y = group_sort(group_ids, X, y)
+    params = {k: v for k, v in get_train_params().items() if k not in ("use_label_encoder", "eval_metric")}
+    model = xgb.XGBRanker(**params, objective=objective, eval_metric="ndcg@10")
+    model.fit(X, y, qid=qid)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    model.save_model(save_path)
+    return model
+
+def load_ranker(path="models/xgb_ranker.json"):
+    import xgboost as xgb
+    model = xgb.XGBRanker()
+    model.load_model(path)
+    return model
+
+# -----------------------------
+# Continue boosting from a saved model
+# -----------------------------
+def continue_training(X_new, y_new, model_path="models/xgb_model.json", n_rounds=20, save_path=None):
+    """
+    Warm-start: add `n_rounds` trees fitted on new rows only, on top of the saved
+    booster, with the same tree parameters used by train_model.
+    """
+    import xgboost as xgb
+    model = xgb.XGBClassifier(**{**get_train_params(), "n_estimators": n_rounds})
+    model.fit(X_new, y_new, xgb_model=load_model(model_path).get_booster())
+    save_path = save_path or model_path
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    model.save_model(save_path)
+    return model
+
 # -----------------------------
 # Load saved model
 # -----------------------------
 def load_model(path="models/xgb_model.json"):
+    import xgboost as xgb
     model = xgb.XGBClassifier()
     model.load_model(path)
     return model
@@ -33,25 +88,58 @@ def load_model(path="models/xgb_model.json"):
 # -----------------------------
 # SHAP explanations
 # -----------------------------
-def explain_predictions_human(model, X, feature_names):
+def get_explainer(model):
+    """TreeExplainer cached on the model itself; building one walks every tree."""
+    explainer = getattr(model, "_tree_explainer", None)
+    if explainer is None:
+        import shap  # slow to import; only needed once explanations are requested
+        explainer = shap.TreeExplainer(model)
+        model._tree_explainer = explainer
+    return explainer
+
+def feature_contributions(model, X, backend="shap"):
+    """
+    Per-row, per-feature SHAP values (log-odds). backend="xgboost" uses the
+    booster's native pred_contribs, which gives the same values without shap.
+    """
+    if backend == "xgboost":
+        import xgboost as xgb
+        contribs = model.get_booster().predict(xgb.DMatrix(X), pred_contribs=True)
+        return contribs[:, :-1]  # last column is the bias term
+    shap_values = get_explainer(model).shap_values(X)
+    if isinstance(shap_values, list):  # older shap returns one array per class
+        shap_values = shap_values[-1]
+    return np.asarray(shap_values)
+
+def top_k_features(contribs, k, threshold=0.01):
+    """
+    Column indices of the k largest |contributions| per row, largest first.
+    Entries at or below `threshold` are returned as -1.
+    """
+    k = min(k, contribs.shape[1])
+    mag = np.abs(contribs)
+    idx = np.argpartition(-mag, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(mag, idx, axis=1), axis=1)
+    idx = np.take_along_axis(idx, order, axis=1)
+    idx[np.take_along_axis(mag, idx, axis=1) <= threshold] = -1
+    return idx
+
+@profiled()
+def explain_predictions_human(model, X, feature_names, top_k=None, backend="shap"):
     """
     Returns human-readable explanations for each prediction.
+    Only the first len(feature_names) columns are described; pass top_k to keep
+    the strongest reasons per row. Explain only the rows you will display.
     """
     try:
-        explainer = shap.TreeExplainer(model)
-        shap_values = explainer.shap_values(X)
+        contribs = feature_contributions(model, X, backend)[:, :len(feature_names)]
+        idx = top_k_features(contribs, top_k or contribs.shape[1])
+        signs = np.take_along_axis(contribs, np.maximum(idx, 0), axis=1) > 0
         explanations = []
-
-        for row_idx in range(X.shape[0]):
-            impact = {}
-            for f_idx, f_name in enumerate(feature_names):
-                val = X[row_idx, f_idx]
-                shap_val = shap_values[row_idx][f_idx]
-                if abs(shap_val) > 0.01:
-                    impact[f_name] = shap_val
-            impact_str = ", ".join([f"{k} {'high' if v>0 else 'low'}" for k,v in impact.items()])
+        for row_idx, row_signs in zip(idx, signs):
+            impact_str = ", ".join(f"{feature_names[f]} {'high' if pos else 'low'}"
+                                   for f, pos in zip(row_idx, row_signs) if f >= 0)
             explanations.append(impact_str if impact_str else "No major feature impact")
-
         return explanations
     except Exception:
         return ["No SHAP explanation"] * X.shape[0]
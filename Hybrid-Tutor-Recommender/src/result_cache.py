@@ -0,0 +1,116 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from src.spatial import KM_PER_DEG_LAT
+
+# -----------------------------
+# Normalized case keys
+# -----------------------------
+def normalize_description(text):
+    """Case-, accent- and punctuation-insensitive form of a case description."""
+    text = unicodedata.normalize("NFKC", str(text or "")).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+def description_hash(text):
+    return hashlib.sha1(normalize_description(text).encode("utf-8")).hexdigest()[:16]
+
+def budget_bucket(budget, width=5):
+    return int(np.floor(float(budget) / width))
+
+def location_cell(lat, lon, cell_km=0.5):
+    """Roughly cell_km x cell_km grid cell; longitude width follows the cell's latitude."""
+    i = int(np.floor(float(lat) * KM_PER_DEG_LAT / cell_km))
+    km_per_deg_lon = KM_PER_DEG_LAT * max(np.cos(np.radians((i + 0.5) * cell_km / KM_PER_DEG_LAT)), 0.01)
+    return i, int(np.floor(float(lon) * km_per_deg_lon / cell_km))
+
+def case_key(budget, lat, lon, preferred_gender="Any", description=None, budget_width=5, cell_km=0.5, **options):
+    """
+    Cache key for one ranking query. Cases whose description normalizes to the same
+    text, whose budgets fall in the same bucket and whose locations share a grid
+    cell map to the same key. Anything else that changes the result (k, max_km,
+    retrieval settings) goes in `options`.
+    """
+    return (description_hash(description) if description is not None else None,
+            budget_bucket(budget, budget_width), location_cell(lat, lon, cell_km),
+            str(preferred_gender), tuple(sorted(options.items())))
+
+# -----------------------------
+# Bounded LRU cache with TTL
+# -----------------------------
+class ResultCache:
+    """
+    Thread-safe LRU cache of ranking results with a time-to-live per entry.
+
+    Entries belong to one artifact version (model + tutor store). bind(version)
+    drops everything when the version changes, so results from a reloaded model
+    or store are never served. get() returns None on a miss. `clock` returns
+    seconds (monotonic by default; tests pass a fake one).
+    """
+    def __init__(self, maxsize=1024, ttl_s=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bind(self, version):
+        """Returns True if the version changed and the cache was cleared."""
+        with self._lock:
+            if version == self.version:
+                return False
+            if self.version is not None:
+                self.invalidations += 1
+            self.version = version
+            self._entries.clear()
+            return True
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value for `key`, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "evictions": self.evictions,
+                "expirations": self.expirations, "invalidations": self.invalidations}
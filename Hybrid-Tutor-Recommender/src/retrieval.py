@@ -0,0 +1,123 @@
+import numpy as np
+
+# -----------------------------
+# First-stage candidate retrieval over tutor embeddings
+# -----------------------------
+# All indexes score by cosine similarity and share the same interface:
+#   index = build_index(vectors, ids); ids, scores = index.search(query, k)
+
+def normalize_rows(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, sorted descending."""
+    k = min(k, scores.shape[0])
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+class ExactIndex:
+    """Brute-force cosine search; the recall reference for the approximate indexes."""
+    def fit(self, vectors, ids=None):
+        self.vectors = normalize_rows(vectors)
+        self.ids = np.arange(len(self.vectors)) if ids is None else np.asarray(ids)
+        return self
+
+    def search(self, query, k):
+        scores = self.vectors @ normalize_rows(query)
+        top = _top_k(scores, k)
+        return self.ids[top], scores[top]
+
+class IVFIndex:
+    """
+    Inverted-file index in pure NumPy: spherical k-means centroids, with each list
+    stored contiguously. A query scans only the `nprobe` closest lists.
+    """
+    def __init__(self, n_lists=None, nprobe=8, n_iter=10, seed=42):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+
+    def fit(self, vectors, ids=None):
+        vectors = normalize_rows(vectors)
+        n = vectors.shape[0]
+        ids = np.arange(n) if ids is None else np.asarray(ids)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(self.seed)
+        # Train centroids on a sample; ~256 points per list is plenty
+        sample = vectors[rng.choice(n, size=min(n, 256 * n_lists), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        assign = self._assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        self.centroids = centroids
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.ids = ids[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        return self
+
+    @staticmethod
+    def _assign(vectors, centroids, chunk=65536):
+        out = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+        return out
+
+    def search(self, query, k, nprobe=None):
+        q = normalize_rows(query)
+        probes = _top_k(self.centroids @ q, nprobe or self.nprobe)
+        rows = np.concatenate([np.arange(self.offsets[p], self.offsets[p + 1]) for p in probes])
+        scores = self.vectors[rows] @ q
+        top = _top_k(scores, k)
+        return self.ids[rows[top]], scores[top]
+
+class FaissIndex:
+    """Optional faiss IVF backend (`pip install faiss-cpu`), same interface."""
+    def __init__(self, n_lists=None, nprobe=8):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+
+    def fit(self, vectors, ids=None):
+        import faiss
+        vectors = normalize_rows(vectors)
+        n, d = vectors.shape
+        n_lists = min(self.n_lists or max(1, int(4 * np.sqrt(n))), n)
+        quantizer = faiss.IndexFlatIP(d)
+        self.index = faiss.IndexIVFFlat(quantizer, d, n_lists, faiss.METRIC_INNER_PRODUCT)
+        self.index.train(vectors)
+        self.index.add(vectors)
+        self.index.nprobe = self.nprobe
+        self.ids = np.arange(n) if ids is None else np.asarray(ids)
+        self._quantizer = quantizer
+        return self
+
+    def search(self, query, k):
+        scores, rows = self.index.search(normalize_rows(query).reshape(1, -1), k)
+        keep = rows[0] >= 0
+        return self.ids[rows[0][keep]], scores[0][keep]
+
+def build_index(vectors, ids=None, backend="ivf", **kwargs):
+    """Build a tutor index: backend is 'ivf' (NumPy), 'faiss' or 'exact'."""
+    if backend == "faiss":
+        try:
+            return FaissIndex(**kwargs).fit(vectors, ids)
+        except ImportError:
+            backend = "ivf"
+    if backend == "ivf":
+        return IVFIndex(**kwargs).fit(vectors, ids)
+    return ExactIndex().fit(vectors, ids)
+
+def recall_at_k(approx_ids, exact_ids):
+    return len(np.intersect1d(approx_ids, exact_ids)) / max(len(exact_ids), 1)
@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config import ARTIFACT_MANIFEST_PATH, FEATURE_STORE_PATH, MODEL_PATH
+from src.artifacts import ArtifactVersionError, load_scaler, read_manifest
+from src.batch_scoring import top_k_per_case
+from src.feature_store import TutorFeatureStore
+from src.ranking_model import load_model
+from src.spatial import build_spatial_index
+from src.tree_inference import HybridPredictor
+
+# -----------------------------
+# Model bundle with hot reload
+# -----------------------------
+class ModelBundle:
+    """Everything one request needs, loaded together and never mutated afterwards."""
+    def __init__(self, model, predictor, scaler, store, spatial_index, version, stamp):
+        self.model = model
+        self.predictor = predictor
+        self.scaler = scaler
+        self.store = store
+        self.spatial_index = spatial_index
+        self.version = version
+        self.stamp = stamp
+
+def file_stamp(*paths):
+    return tuple((os.stat(p).st_mtime_ns, os.stat(p).st_size) if os.path.exists(p) else None for p in paths)
+
+class ModelHandle:
+    """
+    Holds the current ModelBundle. reload_if_changed() builds a complete new
+    bundle when the model or feature store file changes on disk, then swaps it in
+    with a single assignment, so requests see either the old bundle or the new
+    one and never a mix. A model file that does not match the artifact manifest
+    (e.g. training is still writing it) is skipped and retried on the next check.
+    """
+    def __init__(self, model_path=MODEL_PATH, store_path=FEATURE_STORE_PATH,
+                 manifest_path=ARTIFACT_MANIFEST_PATH):
+        self.model_path = model_path
+        self.store_path = store_path
+        self.manifest_path = manifest_path
+        self.bundle = None
+        self.reloads = 0
+
+    def _load(self, stamp):
+        with open(self.model_path, "rb") as f:
+            raw = f.read()
+        version = hashlib.sha256(raw).hexdigest()
+        if read_manifest(self.manifest_path).get("model", {}).get("sha256") != version:
+            raise ArtifactVersionError(f"{self.model_path} is not the model recorded in the manifest")
+        # Scaler arrays are read into memory: retraining rewrites scaler.pkl in place
+        scaler = load_scaler(self.model_path, manifest_path=self.manifest_path, mmap_mode=None)
+        store = TutorFeatureStore.load(self.store_path)
+        model = load_model(bytearray(raw))
+        # Compiled trees for small batches, native XGBoost for large ones; warm up (JIT) before swap-in
+        predictor = HybridPredictor(model)
+        predictor.predict_proba(np.zeros((1, predictor.n_features_in_)))
+        return ModelBundle(model, predictor, scaler, store, build_spatial_index(store), version, stamp)
+
+    def reload_if_changed(self):
+        """Returns True if a new bundle was swapped in."""
+        stamp = file_stamp(self.model_path, self.store_path)
+        if self.bundle is not None and stamp == self.bundle.stamp:
+            return False
+        try:
+            bundle = self._load(stamp)
+        except (ArtifactVersionError, FileNotFoundError, ValueError):
+            if self.bundle is None:
+                raise
+            return False
+        self.bundle = bundle
+        self.reloads += 1
+        return True
+
+# -----------------------------
+# Micro-batching
+# -----------------------------
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to `max_wait_ms` (or `max_batch` requests)
+    and ranks them together, so one predict_proba call serves the whole batch.
+    Scoring runs in a worker thread to keep the event loop responsive.
+    """
+    def __init__(self, handle, max_batch=64, max_wait_ms=5.0, on_batch=None):
+        self.handle = handle
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.on_batch = on_batch
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, case):
+        """`case` is a dict with CASE_COLUMNS, k and max_km; resolves to (top-k frame, model version)."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((case, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = await asyncio.to_thread(self._score, [case for case, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _score(self, cases):
+        start = time.perf_counter()
+        bundle = self.handle.bundle  # one bundle for the whole batch
+        frame = pd.DataFrame(cases)
+        frame['case_id'] = np.arange(len(frame))
+        k = int(frame['k'].max())
+        parts = []
+        # Requests with the same radius share one scoring call
+        for max_km, group in frame.groupby(frame['max_km'].fillna(0), sort=False):
+            parts.append(top_k_per_case(bundle.predictor, bundle.store, bundle.scaler, group, k=k,
+                                        spatial_index=bundle.spatial_index, max_km=max_km or None))
+        ranked = pd.concat(parts, ignore_index=True)
+        by_case = dict(tuple(ranked.groupby('case_id', sort=False)))
+        empty = ranked.iloc[:0]
+        results = [(by_case.get(i, empty).head(int(frame['k'].iat[i])), bundle.version)
+                   for i in range(len(frame))]
+        if self.on_batch is not None:
+            self.on_batch(len(cases), time.perf_counter() - start)
+        return results
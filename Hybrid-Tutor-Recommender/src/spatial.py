@@ -0,0 +1,175 @@
+import numpy as np
+
+from src.data_pipeline import AVG_EARTH_RADIUS_KM, haversine_np
+
+KM_PER_DEG_LAT = np.pi * AVG_EARTH_RADIUS_KM / 180.0
+HALF_CIRCUMFERENCE_KM = np.pi * AVG_EARTH_RADIUS_KM
+CELL_VISIT_COST = 256  # one vectorized cell-offset pass costs about as much as this many distance evaluations
+
+# -----------------------------
+# Uniform lat/lon grid over tutor locations
+# -----------------------------
+class GridIndex:
+    """
+    Buckets points into square-ish cells of `cell_km`. Points are stored sorted by
+    cell so each cell is one contiguous slice; radius queries scan the surrounding
+    cells and confirm with an exact haversine check.
+    """
+    def __init__(self, lat, lon, cell_km=2.0):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.cell_km = cell_km
+        self.cell_lat = cell_km / KM_PER_DEG_LAT
+        # Longitude cells are sized for the highest latitude present so they are never narrower than cell_km
+        max_lat = np.abs(self.lat).max() if len(self.lat) else 0.0
+        min_cell_lon = cell_km / (KM_PER_DEG_LAT * max(np.cos(np.radians(max_lat)), 0.01))
+        # Whole number of equal cells around the globe, so wrapping at +/-180 keeps neighbours adjacent
+        self.n_lon_cells = max(1, int(360.0 // min_cell_lon))
+        self.cell_lon = 360.0 / self.n_lon_cells
+
+        keys = self._keys(self.lat, self.lon)
+        self.order = np.argsort(keys, kind="stable")
+        self.cell_keys, starts = np.unique(keys[self.order], return_index=True)
+        self.cell_starts = starts
+        self.cell_ends = np.append(starts[1:], len(keys))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cells(self, lat, lon):
+        i = np.floor((np.asarray(lat) + 90.0) / self.cell_lat).astype(np.int64)
+        j = np.floor((np.asarray(lon) + 180.0) / self.cell_lon).astype(np.int64) % self.n_lon_cells
+        return i, j
+
+    def _keys(self, lat, lon, di=0, dj=0):
+        i, j = self._cells(lat, lon)
+        return (i + di) * self.n_lon_cells + (j + dj) % self.n_lon_cells
+
+    def query_pairs(self, lat, lon, radius_km):
+        """
+        All (query, point) pairs within `radius_km`, for a batch of query points.
+        Returns (query_idx, point_idx, distance_km) arrays; point_idx indexes the
+        arrays the grid was built from.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+        reach = int(np.ceil(radius_km / self.cell_km))
+        # Distinct longitude offsets only, in case the ring wraps all the way round
+        lon_offsets = sorted({dj % self.n_lon_cells for dj in range(-reach, reach + 1)})
+        n_visits = (2 * reach + 1) * len(lon_offsets)
+        if n_visits > len(self.cell_keys) or n_visits * CELL_VISIT_COST > len(self.lat) * len(lat):
+            # Small pools or radii spanning most cells: a straight scan is cheaper
+            return self._scan_pairs(lat, lon, radius_km)
+        q_parts, p_parts = [], []
+        for di in range(-reach, reach + 1):
+            for dj in lon_offsets:
+                keys = self._keys(lat, lon, di, dj)
+                pos = np.searchsorted(self.cell_keys, keys)
+                pos = np.clip(pos, 0, len(self.cell_keys) - 1)
+                hit = np.flatnonzero(self.cell_keys[pos] == keys)
+                if not len(hit):
+                    continue
+                starts, ends = self.cell_starts[pos[hit]], self.cell_ends[pos[hit]]
+                counts = ends - starts
+                q_parts.append(np.repeat(hit, counts))
+                # Flattened ranges [start, end) for every hit cell
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                p_parts.append(self.order[np.repeat(starts, counts) + offsets])
+        if not q_parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        q = np.concatenate(q_parts)
+        p = np.concatenate(p_parts)
+        d = haversine_np(lat[q], lon[q], self.lat[p], self.lon[p])
+        keep = d <= radius_km
+        return q[keep], p[keep], d[keep]
+
+    def _scan_pairs(self, lat, lon, radius_km, max_block=1_000_000):
+        q_parts, p_parts, d_parts = [], [], []
+        step = max(1, max_block // max(len(self.lat), 1))
+        for start in range(0, len(lat), step):
+            d = haversine_np(lat[start:start + step, None], lon[start:start + step, None],
+                             self.lat[None, :], self.lon[None, :])
+            q, p = np.nonzero(d <= radius_km)
+            q_parts.append(q + start)
+            p_parts.append(p)
+            d_parts.append(d[q, p])
+        if not q_parts:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        return np.concatenate(q_parts), np.concatenate(p_parts), np.concatenate(d_parts)
+
+# -----------------------------
+# Tutor lookup by location
+# -----------------------------
+class TutorSpatialIndex:
+    """
+    Radius and k-nearest lookups over tutor coordinates. Results are store rows
+    (positions in the arrays the index was built from) with distances in km,
+    nearest first.
+
+    backend="grid" uses GridIndex; backend="balltree" uses sklearn's BallTree
+    with the haversine metric.
+    """
+    def __init__(self, lat, lon, backend="grid", cell_km=2.0):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.backend = backend
+        if backend == "balltree":
+            from sklearn.neighbors import BallTree
+            self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), metric="haversine")
+        else:
+            self._grid = GridIndex(self.lat, self.lon, cell_km=cell_km)
+
+    @classmethod
+    def from_store(cls, store, **kw):
+        return cls(store.tutor_features[:, 1], store.tutor_features[:, 2], **kw)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def tutors_within(self, lat, lon, km):
+        """Rows of all tutors within `km` of (lat, lon), with their distances, nearest first."""
+        if self.backend == "balltree":
+            rows, dist = self._tree.query_radius(np.radians([[lat, lon]]), r=km / AVG_EARTH_RADIUS_KM,
+                                                 return_distance=True, sort_results=True)
+            return rows[0], dist[0] * AVG_EARTH_RADIUS_KM
+        _, rows, dist = self._grid.query_pairs(lat, lon, km)
+        order = np.argsort(dist, kind="stable")
+        return rows[order], dist[order]
+
+    def k_nearest_tutors(self, lat, lon, k):
+        """Rows and distances of the `k` nearest tutors, nearest first."""
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        if self.backend == "balltree":
+            dist, rows = self._tree.query(np.radians([[lat, lon]]), k=k)
+            return rows[0], dist[0] * AVG_EARTH_RADIUS_KM
+        # Grow the radius until it holds k tutors; everything nearer than the k-th is then inside it.
+        # Start from the radius that would hold about k tutors at the average occupied-cell density.
+        per_cell = len(self) / len(self._grid.cell_keys)
+        km = self._grid.cell_km * max(1.0, np.sqrt(k / per_cell))
+        while True:
+            rows, dist = self.tutors_within(lat, lon, km)
+            if len(rows) >= k or km >= HALF_CIRCUMFERENCE_KM:
+                return rows[:k], dist[:k]
+            km *= 2
+
+    def pairs_within(self, lat, lon, km):
+        """All (query, tutor row, distance) pairs within `km` for a batch of query points."""
+        if self.backend == "balltree":
+            rows, dist = self._tree.query_radius(np.radians(np.column_stack([lat, lon])),
+                                                 r=km / AVG_EARTH_RADIUS_KM, return_distance=True)
+            q = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+            return q, np.concatenate(rows).astype(np.int64), np.concatenate(dist) * AVG_EARTH_RADIUS_KM
+        return self._grid.query_pairs(lat, lon, km)
+
+def build_spatial_index(store, backend="grid", cell_km=2.0):
+    """Spatial index over the tutors in a feature store; falls back to the grid without sklearn."""
+    if backend == "balltree":
+        try:
+            return TutorSpatialIndex.from_store(store, backend="balltree")
+        except ImportError:
+            pass
+    return TutorSpatialIndex.from_store(store, backend="grid", cell_km=cell_km)
@@ -1,14 +1,114 @@
+import re
+import numpy as np
 import pandas as pd
-from src.tagging import extract_tags
+from scipy import sparse
 
-cases = pd.read_csv("data/raw/cases.csv")
-tutors = pd.read_csv("data/raw/tutors.csv")
+# -----------------------------
+# Vocabulary: tag -> surface forms (matched case-insensitively on word boundaries)
+# -----------------------------
+TAG_VOCABULARY = {
+    "subject": {
+        "math": ["math", "maths", "mathematics"],
+        "physics": ["physics"],
+        "chemistry": ["chemistry"],
+        "biology": ["biology"],
+        "english": ["english"],
+        "economics": ["economics"],
+        "medical": ["medical", "medicine"],
+        "aviation": ["aviation"],
+    },
+    "level": {
+        "a_level": ["a-level", "a level", "a-levels"],
+        "gcse": ["gcse", "igcse"],
+        "ib": ["ib"],
+        "dse": ["dse", "hkdse"],
+        "primary": ["primary"],
+        "university": ["university", "undergraduate"],
+    },
+    "niche": {
+        "sen": ["sen", "sen-friendly", "special needs"],
+        "olympiad": ["olympiad"],
+        "interview": ["interview"],
+        "exam": ["exam", "exams"],
+        "online": ["online"],
+    },
+}
 
-# Extract tags
-cases['case_tags'] = cases['case_description'].apply(extract_tags)
-tutors['tutor_tags'] = tutors['tutor_bio'].apply(extract_tags)
+class Tagger:
+    """
+    The whole vocabulary compiled once into a single alternation regex. Each
+    distinct text is scanned once; results come back as a sparse multi-hot
+    matrix with one column per tag (see `tag_names`).
+    """
+    def __init__(self, vocabulary=TAG_VOCABULARY):
+        self.tag_names = []
+        self.tag_groups = {}
+        term_to_tag = {}
+        for group, tags in vocabulary.items():
+            self.tag_groups[group] = []
+            for tag, terms in tags.items():
+                self.tag_groups[group].append(len(self.tag_names))
+                for term in terms:
+                    term_to_tag[term.lower()] = len(self.tag_names)
+                self.tag_names.append(tag)
+        self._term_to_tag = term_to_tag
+        # Longest terms first so "sen-friendly" wins over "sen"
+        terms = sorted(term_to_tag, key=len, reverse=True)
+        self._pattern = re.compile(r"(?<![a-z0-9])(?:" + "|".join(map(re.escape, terms)) + r")(?![a-z0-9])")
 
-# Save for later
-cases.to_csv("data/processed/cases_with_tags.csv", index=False)
-tutors.to_csv("data/processed/tutors_with_tags.csv", index=False)
-print("✅ Tags extracted")
+    def extract(self, text):
+        """Sorted tag names found in one text."""
+        if not isinstance(text, str):
+            return []
+        found = {self._term_to_tag[m] for m in self._pattern.findall(text.lower())}
+        return [self.tag_names[i] for i in sorted(found)]
+
+    def transform(self, texts):
+        """
+        (n_texts, n_tags) CSR multi-hot matrix. Identical texts are tagged once and
+        the rows are gathered back, so repeated descriptions cost nothing extra.
+        """
+        codes, uniques = pd.factorize(pd.Series(texts, dtype=object).fillna("").str.lower())
+        indptr, indices = [0], []
+        for text in uniques:
+            found = sorted({self._term_to_tag[m] for m in self._pattern.findall(text)})
+            indices.extend(found)
+            indptr.append(len(indices))
+        unique_matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.uint8), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(uniques), len(self.tag_names)),
+        )
+        # Empty/missing texts factorize to -1; point them at an all-zero row
+        empty_row = len(uniques)
+        unique_matrix = sparse.vstack([unique_matrix, sparse.csr_matrix((1, len(self.tag_names)), dtype=np.uint8)])
+        return unique_matrix.tocsr()[np.where(codes < 0, empty_row, codes)]
+
+    def group_columns(self, group):
+        """Column indices of one vocabulary group, e.g. "subject"."""
+        return self.tag_groups[group]
+
+_DEFAULT_TAGGER = None
+
+def get_tagger():
+    """Shared Tagger built from TAG_VOCABULARY on first use."""
+    global _DEFAULT_TAGGER
+    if _DEFAULT_TAGGER is None:
+        _DEFAULT_TAGGER = Tagger()
+    return _DEFAULT_TAGGER
+
+# -----------------------------
+# Convenience wrappers
+# -----------------------------
+def extract_tags(text):
+    return get_tagger().extract(text)
+
+def tag_matrix(texts, tagger=None):
+    """Sparse multi-hot tags for a column of texts; returns (matrix, tag_names)."""
+    tagger = tagger or get_tagger()
+    return tagger.transform(texts), list(tagger.tag_names)
+
+def tags_to_lists(matrix, tag_names):
+    """Per-row lists of tag names from a multi-hot matrix, e.g. for CSV export."""
+    matrix = sparse.csr_matrix(matrix)
+    names = np.asarray(tag_names, dtype=object)
+    return [names[matrix.indices[s:e]].tolist() for s, e in zip(matrix.indptr[:-1], matrix.indptr[1:])]
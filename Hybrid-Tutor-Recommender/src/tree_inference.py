@@ -0,0 +1,209 @@
+import importlib.util
+import json
+from functools import lru_cache
+
+import numpy as np
+
+# Optional; the NumPy evaluator is used without it. Imported on first use, not here.
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+SIGMOID_OBJECTIVES = ("binary:logistic", "reg:logistic")
+
+# -----------------------------
+# Flattened tree ensemble
+# -----------------------------
+class CompiledEnsemble:
+    """
+    An XGBoost gbtree model exported to flat node arrays (all trees concatenated):
+    feature, threshold, left, right, default_left and value per node, plus the
+    root offset of each tree. Leaves point to themselves, so every row can take
+    exactly max_depth steps without checking for leaves.
+
+    Follows XGBoost's rules: inputs are compared as float32, `x < threshold`
+    goes left, and NaN follows the node's default direction. predict_proba has
+    the same shape as XGBClassifier.predict_proba, so this can replace the
+    model anywhere only scores are needed.
+    """
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, max_depth,
+                 base_margin, objective, n_features, backend="auto"):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=np.bool_)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.objective = objective
+        self.n_features_in_ = int(n_features)
+        if backend == "auto":
+            backend = "numba" if NUMBA_AVAILABLE else "numpy"
+        if backend == "numba" and not NUMBA_AVAILABLE:
+            raise ImportError("numba is not installed")
+        self.backend = backend
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_booster(cls, booster, backend="auto"):
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("only gbtree models can be compiled")
+        if int(learner["learner_model_param"].get("num_class", "0")) > 1:
+            raise ValueError("multi-class models are not supported")
+        trees = learner["gradient_booster"]["model"]["trees"]
+        # Match the sklearn wrapper, which predicts up to best_iteration when one is recorded
+        best = learner.get("attributes", {}).get("best_iteration")
+        if best is not None:
+            trees = trees[:int(best) + 1]
+
+        parts = {k: [] for k in ("feature", "threshold", "left", "right", "default_left", "value")}
+        roots, offset, max_depth = [], 0, 0
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("categorical splits are not supported")
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            n = len(left)
+            nodes = np.arange(n)
+            is_leaf = left == -1
+            parts["feature"].append(np.where(is_leaf, 0, tree["split_indices"]))
+            parts["threshold"].append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            # Leaves loop back to themselves; leaf values live in split_conditions
+            parts["left"].append(np.where(is_leaf, nodes, left) + offset)
+            parts["right"].append(np.where(is_leaf, nodes, right) + offset)
+            parts["default_left"].append(np.asarray(tree["default_left"], dtype=bool))
+            parts["value"].append(np.where(is_leaf, parts["threshold"][-1], 0.0))
+            # Children always come after their parent, so one forward pass gives depths
+            depth = np.zeros(n, dtype=np.int64)
+            for node in nodes[~is_leaf]:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+            roots.append(offset)
+            offset += n
+
+        objective = learner["objective"]["name"]
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        if objective in SIGMOID_OBJECTIVES:
+            base_margin = np.log(base_score / (1.0 - base_score))
+        else:
+            base_margin = base_score
+        flat = {k: np.concatenate(v) if v else np.empty(0) for k, v in parts.items()}
+        return cls(flat["feature"], flat["threshold"], flat["left"], flat["right"], flat["default_left"],
+                   flat["value"], roots, max_depth, base_margin, objective,
+                   learner["learner_model_param"]["num_feature"], backend=backend)
+
+    @classmethod
+    def from_model(cls, model, backend="auto"):
+        return cls.from_booster(model.get_booster(), backend=backend)
+
+    # -----------------------------
+    # Evaluation
+    # -----------------------------
+    def margin(self, X, block_rows=16_384):
+        """Raw margin (log-odds for logistic objectives) per row."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if self.backend == "numba":
+            out = _numba_margin()(X, self.feature, self.threshold, self.left, self.right, self.default_left,
+                                  self.value, self.roots, self.max_depth)
+            return out + self.base_margin
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], block_rows):
+            out[start:start + block_rows] = self._numpy_margin(X[start:start + block_rows])
+        return out + self.base_margin
+
+    def _numpy_margin(self, X):
+        n = X.shape[0]
+        rows = np.arange(n)[:, None]
+        node = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        margin = self.margin(X)
+        if self.objective in SIGMOID_OBJECTIVES:
+            return 1.0 / (1.0 + np.exp(-margin))
+        return margin
+
+    def predict_proba(self, X):
+        p = self.predict(X)
+        return np.column_stack([1.0 - p, p])
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                 default_left=self.default_left, value=self.value, roots=self.roots,
+                 meta=np.array(json.dumps({"max_depth": self.max_depth, "base_margin": self.base_margin,
+                                           "objective": self.objective, "n_features": self.n_features_in_})))
+
+    @classmethod
+    def load(cls, path, backend="auto"):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(data["feature"], data["threshold"], data["left"], data["right"], data["default_left"],
+                       data["value"], data["roots"], meta["max_depth"], meta["base_margin"],
+                       meta["objective"], meta["n_features"], backend=backend)
+
+def compile_model(model, backend="auto"):
+    """CompiledEnsemble for an XGBClassifier/XGBRanker or a raw Booster."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    return CompiledEnsemble.from_booster(booster, backend=backend)
+
+class HybridPredictor:
+    """
+    Scores small batches with the compiled ensemble, where XGBoost's per-call
+    overhead dominates, and larger ones with the native predictor, which is
+    faster per row. The crossover defaults to about where the two meet
+    (see scripts/benchmark_tree_inference.py).
+    """
+    def __init__(self, model, backend="auto", native_above=None):
+        self.model = model
+        self.compiled = compile_model(model, backend=backend)
+        self.native_above = native_above or (128 if self.compiled.backend == "numba" else 32)
+        self.n_features_in_ = self.compiled.n_features_in_
+
+    def predict_proba(self, X):
+        if len(X) > self.native_above:
+            return self.model.predict_proba(X)
+        return self.compiled.predict_proba(X)
+
+# -----------------------------
+# Optional Numba kernel (built on first use)
+# -----------------------------
+@lru_cache(maxsize=None)
+def _numba_margin():
+    import numba
+
+    # Serial on purpose: batches routed here are at most a few hundred rows, and a
+    # parallel kernel run from a worker thread (serving, Streamlit) leaves numba's
+    # TBB threading layer blocking interpreter exit.
+    @numba.njit(cache=True, nogil=True)
+    def margin(X, feature, threshold, left, right, default_left, value, roots, max_depth):
+        n = X.shape[0]
+        out = np.zeros(n, dtype=np.float64)
+        for i in range(n):
+            acc = 0.0
+            for t in range(roots.shape[0]):
+                node = roots[t]
+                for _ in range(max_depth):
+                    x = X[i, feature[node]]
+                    if np.isnan(x):
+                        go_left = default_left[node]
+                    else:
+                        go_left = x < threshold[node]
+                    node = left[node] if go_left else right[node]
+                acc += value[node]
+            out[i] = acc
+        return out
+    return margin
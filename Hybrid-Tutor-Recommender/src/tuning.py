@@ -0,0 +1,158 @@
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import StratifiedKFold
+
+from src.config import PARAMS_DIR
+
+# -----------------------------
+# Search space (sklearn-style names; xgb.train accepts them as aliases)
+# -----------------------------
+SEARCH_SPACE = {
+    "max_depth": ("int", 2, 10),
+    "learning_rate": ("log", 0.01, 0.3),
+    "subsample": ("float", 0.5, 1.0),
+    "colsample_bytree": ("float", 0.5, 1.0),
+    "min_child_weight": ("log", 0.5, 20.0),
+    "reg_lambda": ("log", 0.1, 10.0),
+    "gamma": ("float", 0.0, 5.0),
+}
+
+def sample_params(rng, space=SEARCH_SPACE):
+    params = {}
+    for name, (kind, low, high) in space.items():
+        if kind == "int":
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+# -----------------------------
+# Worker side: fold DMatrices are built once per process and reused by every trial
+# -----------------------------
+_FOLDS = None
+_NTHREAD = 1
+
+def _init_worker(X, y, folds, nthread):
+    global _FOLDS, _NTHREAD
+    _NTHREAD = nthread
+    _FOLDS = [(xgb.DMatrix(X[tr], label=y[tr]), xgb.DMatrix(X[va], label=y[va])) for tr, va in folds]
+
+def _run_trial(params, num_boost_round, early_stopping_rounds, metric):
+    booster_params = {
+        **params,
+        "objective": "binary:logistic",
+        "tree_method": "hist",
+        "eval_metric": metric,
+        "nthread": _NTHREAD,
+        "verbosity": 0,
+    }
+    scores, iterations = [], []
+    for dtrain, dvalid in _FOLDS:
+        booster = xgb.train(booster_params, dtrain, num_boost_round=num_boost_round,
+                            evals=[(dvalid, "valid")], early_stopping_rounds=early_stopping_rounds,
+                            verbose_eval=False)
+        scores.append(booster.best_score)
+        iterations.append(booster.best_iteration + 1)
+    return {"params": params, "score": float(np.mean(scores)), "n_estimators": int(np.mean(iterations)),
+            "num_boost_round": num_boost_round}
+
+# -----------------------------
+# Search drivers
+# -----------------------------
+def _higher_is_better(metric):
+    # Ranking metrics may carry a cutoff, e.g. ndcg@10 or map@5
+    return metric.split("@")[0] in ("auc", "aucpr", "map", "ndcg")
+
+def _evaluate(pool, trials, num_boost_round, early_stopping_rounds, metric):
+    futures = [pool.submit(_run_trial, p, num_boost_round, early_stopping_rounds, metric) for p in trials]
+    return [f.result() for f in futures]
+
+def tune(X, y, n_trials=40, method="random", n_folds=3, metric="auc", max_rounds=500,
+         early_stopping_rounds=30, min_rounds=50, eta=3, n_workers=None, seed=42):
+    """
+    Cross-validated search over SEARCH_SPACE in a process pool.
+
+    method="random": every trial gets `max_rounds` with early stopping.
+    method="halving": successive halving; all trials start with `min_rounds`, the
+    best 1/eta of each rung move on with eta times the rounds.
+    Returns (best_trial, all_trials, stats).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    n_workers = n_workers or os.cpu_count() or 1
+    nthread = max(1, (os.cpu_count() or 1) // n_workers)
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed).split(X, y))
+    rng = np.random.default_rng(seed)
+    candidates = [sample_params(rng) for _ in range(n_trials)]
+    better = _higher_is_better(metric)
+
+    start = time.perf_counter()
+    history = []
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(X, y, folds, nthread)) as pool:
+        if method == "halving":
+            rounds = min_rounds
+            while True:
+                results = _evaluate(pool, candidates, rounds, early_stopping_rounds, metric)
+                history.extend(results)
+                if len(candidates) <= 1 or rounds >= max_rounds:
+                    break
+                results.sort(key=lambda r: r["score"], reverse=better)
+                candidates = [r["params"] for r in results[:max(1, len(results) // eta)]]
+                rounds = min(rounds * eta, max_rounds)
+        else:
+            history = _evaluate(pool, candidates, max_rounds, early_stopping_rounds, metric)
+    elapsed = time.perf_counter() - start
+
+    # Best among trials that ran with the largest budget
+    final_rounds = max(r["num_boost_round"] for r in history)
+    finalists = [r for r in history if r["num_boost_round"] == final_rounds]
+    best = sorted(finalists, key=lambda r: r["score"], reverse=better)[0]
+    stats = {"trials": len(history), "seconds": elapsed, "trials_per_minute": len(history) / elapsed * 60,
+             "workers": n_workers, "folds": n_folds, "metric": metric, "method": method}
+    return best, history, stats
+
+# -----------------------------
+# Versioned params files
+# -----------------------------
+def _versions(params_dir):
+    found = []
+    for path in glob.glob(os.path.join(params_dir, "xgb_params_v*.json")):
+        m = re.search(r"_v(\d+)\.json$", path)
+        if m:
+            found.append((int(m.group(1)), path))
+    return sorted(found)
+
+def save_best_params(best, stats, params_dir=PARAMS_DIR):
+    """Write the tuned configuration as the next xgb_params_vNNNN.json; returns its path."""
+    os.makedirs(params_dir, exist_ok=True)
+    versions = _versions(params_dir)
+    version = versions[-1][0] + 1 if versions else 1
+    path = os.path.join(params_dir, f"xgb_params_v{version:04d}.json")
+    payload = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {**best["params"], "n_estimators": best["n_estimators"], "tree_method": "hist"},
+        "cv_score": best["score"],
+        "search": stats,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+def load_best_params(params_dir=PARAMS_DIR):
+    """Latest tuned params, or None if no search has been run."""
+    versions = _versions(params_dir)
+    if not versions:
+        return None
+    with open(versions[-1][1]) as f:
+        return json.load(f)["params"]
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.batch_scoring import top_k_per_case
+from src.feature_store import TutorFeatureStore
+from src.spatial import build_spatial_index
+
+
+class RateModel:
+    """Scores a pair by the tutor's rate column, so ranks are predictable."""
+    def predict_proba(self, X):
+        p = X[:, 4] / 1000.0
+        return np.column_stack([1 - p, p])
+
+
+class IdentityScaler:
+    def transform(self, X):
+        return X
+
+
+def make_store():
+    # Three tutors in Hong Kong, one far away in Singapore
+    lat = [22.30, 22.31, 22.32, 1.35]
+    lon = [114.17, 114.18, 114.19, 103.82]
+    features = np.column_stack([[100, 200, 300, 400], lat, lon, [0, 1, 0, 1]])
+    return TutorFeatureStore([1, 2, 3, 4], features, np.zeros((4, 2)), ["A", "B", "C", "D"],
+                             {'gender': ["Female", "Male"], 'preferred_gender': ["Any"]})
+
+
+def test_case_with_no_tutor_in_radius_falls_back_to_nearest():
+    store = make_store()
+    cases = pd.DataFrame({'case_id': [10, 20], 'case_budget': [200, 200],
+                          'case_lat': [22.31, 51.5], 'case_lon': [114.18, -0.12]})
+    out = top_k_per_case(RateModel(), store, IdentityScaler(), cases, k=2,
+                         spatial_index=build_spatial_index(store), max_km=5)
+
+    assert set(out['case_id']) == {10, 20}
+    # Within 5 km of Hong Kong: the three Hong Kong tutors, best rate first
+    assert out[out['case_id'] == 10]['tutor_id'].tolist() == [3, 2]
+    # Nobody within 5 km of London: its nearest tutors are ranked instead
+    assert out[out['case_id'] == 20]['rank'].tolist() == [1, 2]
+    assert len(out[out['case_id'] == 20]) == 2
@@ -0,0 +1,81 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.bi_aggregates import update_aggregates
+from src.bi_reporting import supply_gap_analysis
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for name in ("cases.csv", "tutors.csv", "results.csv"):
+        shutil.copy(f"data/raw/{name}", raw / name)
+    return raw
+
+
+def assert_same_tables(a, b):
+    pd.testing.assert_frame_equal(a.supply_gap(), b.supply_gap())
+    assert set(a.tutor_ids[a.seen]) == set(b.tutor_ids[b.seen])
+    assert a.rows == b.rows
+
+
+def test_full_scan_matches_supply_gap_analysis(raw_dir, tmp_path):
+    path = str(tmp_path / "agg.npz")
+    tables, mode = update_aggregates(str(raw_dir), path, backend="pandas", chunk_size=37)
+    assert mode == "full"
+    assert update_aggregates(str(raw_dir), path, backend="pandas")[1] == "unchanged"
+
+    results = pd.read_csv(raw_dir / "results.csv")
+    merged = results.merge(pd.read_csv(raw_dir / "cases.csv"), on="case_id")
+    expected = supply_gap_analysis(merged)
+    pd.testing.assert_frame_equal(tables.supply_gap(), expected, check_dtype=False)
+    assert tables.rows == len(merged)
+    assert set(tables.tutor_ids[tables.seen]) == set(merged["tutor_id"])
+
+
+@pytest.mark.parametrize("backend", ["duckdb", "polars"])
+def test_backends_agree_with_pandas(raw_dir, tmp_path, backend):
+    pytest.importorskip(backend)
+    reference, _ = update_aggregates(str(raw_dir), str(tmp_path / "pandas.npz"), backend="pandas")
+    tables, mode = update_aggregates(str(raw_dir), str(tmp_path / f"{backend}.npz"), backend=backend)
+    assert mode == "full"
+    assert_same_tables(tables, reference)
+
+
+def test_appended_results_fold_in_incrementally(raw_dir, tmp_path):
+    results_csv = raw_dir / "results.csv"
+    lines = results_csv.read_text().splitlines(keepends=True)
+    results_csv.write_text("".join(lines[:120]))
+    path = str(tmp_path / "agg.npz")
+    update_aggregates(str(raw_dir), path, backend="pandas")
+
+    with open(results_csv, "a") as f:
+        f.write("".join(lines[120:]))
+    tables, mode = update_aggregates(str(raw_dir), path, backend="pandas", chunk_size=16)
+    assert mode == "incremental"
+    rebuilt, mode = update_aggregates(str(raw_dir), str(tmp_path / "rebuilt.npz"), backend="pandas",
+                                      rebuild=True)
+    assert mode == "full"
+    assert_same_tables(tables, rebuilt)
+
+
+def test_rewritten_or_parquet_results_rescan(raw_dir, tmp_path):
+    path = str(tmp_path / "agg.npz")
+    update_aggregates(str(raw_dir), path, backend="pandas")
+    results = pd.read_csv(raw_dir / "results.csv")
+    results.iloc[::-1].to_csv(raw_dir / "results.csv", index=False)
+    assert update_aggregates(str(raw_dir), path, backend="pandas")[1] == "full"
+
+    pytest.importorskip("pyarrow")
+    (raw_dir / "results.csv").unlink()
+    results.to_parquet(raw_dir / "results.parquet", index=False)
+    assert update_aggregates(str(raw_dir), path, backend="pandas")[1] == "full"
+    assert update_aggregates(str(raw_dir), path, backend="pandas")[1] == "unchanged"
+    results.assign(success=np.zeros(len(results), dtype=int)).to_parquet(raw_dir / "results.parquet", index=False)
+    tables, mode = update_aggregates(str(raw_dir), path, backend="pandas")
+    assert mode == "full"
+    assert tables.successes.sum() == 0
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.bi_reporting import budget_sweep
+
+
+class BudgetModel:
+    """Probability rises with the budget in column 0."""
+    def predict_proba(self, X):
+        p = X[:, 0] / 1000.0
+        return np.column_stack([1 - p, p])
+
+
+def test_array_and_frame_sweeps_agree_across_chunks():
+    frame = pd.DataFrame({'case_budget': [100.0, 150.0, 200.0], 'tutor_rate': [120.0, 90.0, 300.0],
+                          'price_gap': [20.0, 60.0, 100.0]})
+    budgets = [50, 100, 250]
+    by_name = budget_sweep(BudgetModel(), frame, budgets, max_batch_rows=4)
+    by_index = budget_sweep(BudgetModel(), frame.to_numpy(), budgets, budget_col=0, price_gap_col=2,
+                            rate_col=1)
+    np.testing.assert_allclose(by_name, np.tile(np.array(budgets) / 1000.0, (3, 1)))
+    np.testing.assert_allclose(by_index, by_name)
+
+
+def test_array_with_column_names_asks_for_indices():
+    with pytest.raises(TypeError, match="column index"):
+        budget_sweep(BudgetModel(), np.zeros((2, 3)), [10, 20])
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.embedding_store import EmbeddingStore, load_tutor_embeddings
+
+
+def merged(tutor_ids):
+    return pd.DataFrame({'tutor_id': tutor_ids})
+
+
+def test_seed_then_new_tutors_get_mean(tmp_path):
+    seed = tmp_path / "seed.npy"
+    np.save(seed, np.arange(12, dtype=np.float64).reshape(3, 4))
+    store = load_tutor_embeddings(merged([1, 2, 1]), seed_path=str(seed), path=str(tmp_path / "tv"))
+    assert len(store) == 2
+    np.testing.assert_array_equal(store.get([1, 2]), [[0, 1, 2, 3], [4, 5, 6, 7]])
+
+    # Appended results for a tutor the store has not seen; the seed no longer lines up
+    store = load_tutor_embeddings(merged([1, 2, 1, 9, 9]), seed_path=str(seed), path=str(tmp_path / "tv"))
+    assert len(store) == 3
+    np.testing.assert_array_equal(store.get([9])[0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(store.get([1])[0], [0, 1, 2, 3])
+
+
+def test_stale_seed_without_store_raises(tmp_path):
+    seed = tmp_path / "seed.npy"
+    np.save(seed, np.zeros((3, 4)))
+    with pytest.raises(ValueError, match="generate_embeddings"):
+        load_tutor_embeddings(merged([1, 2, 3, 4]), seed_path=str(seed), path=str(tmp_path / "tv"))
+    assert not EmbeddingStore.exists(str(tmp_path / "tv"))
@@ -0,0 +1,126 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.embeddings import EmbeddingCache, HashEmbedder, embed_texts, is_retryable
+
+
+class CountingEmbedder(HashEmbedder):
+    """HashEmbedder that records every text it is asked to embed."""
+    def __init__(self, **kw):
+        super().__init__(dim=16, **kw)
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return await super().embed(texts)
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FailingEmbedder(CountingEmbedder):
+    """Raises `error` on the first `failures` calls, then embeds normally."""
+    def __init__(self, error, failures):
+        super().__init__()
+        self.error, self.failures = error, failures
+
+    async def embed(self, texts):
+        if self.failures:
+            self.failures -= 1
+            self.calls.append(list(texts))
+            raise self.error
+        return await super().embed(texts)
+
+
+def test_hash_embedder_is_deterministic_and_normalized():
+    a, b = HashEmbedder(dim=32), HashEmbedder(dim=32)
+    v = a.embed_one("A-Level Physics tutor")
+    np.testing.assert_array_equal(v, b.embed_one("a-level physics TUTOR"))
+    assert v.shape == (32,) and v.dtype == np.float32
+    assert np.linalg.norm(v) == pytest.approx(1.0)
+    np.testing.assert_array_equal(a.embed_one(""), np.zeros(32, dtype=np.float32))
+
+
+def test_duplicates_are_embedded_once_and_aligned():
+    embedder = CountingEmbedder()
+    texts = ["maths", "physics", "maths", "chemistry", "physics"]
+    out = embed_texts(texts, embedder=embedder)
+    assert sorted(t for call in embedder.calls for t in call) == ["chemistry", "maths", "physics"]
+    np.testing.assert_array_equal(out[0], out[2])
+    np.testing.assert_array_equal(out[1], embedder.embed_one("physics"))
+
+
+def test_cache_hits_skip_the_embedder(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    first = embed_texts(["maths", "physics"], embedder=CountingEmbedder(), cache=cache)
+    embedder = CountingEmbedder()
+    second = embed_texts(["physics", "maths", "biology"], embedder=embedder, cache=cache)
+    cache.close()
+    assert embedder.calls == [["biology"]]
+    np.testing.assert_array_equal(second[:2], first[::-1])
+
+
+@pytest.mark.parametrize("error", [APIError(429), APIError(503), TimeoutError(), ConnectionError()])
+def test_transient_errors_are_retried(error):
+    embedder = FailingEmbedder(error, failures=2)
+    out = embed_texts(["maths"], embedder=embedder, backoff=0)
+    assert len(embedder.calls) == 3
+    np.testing.assert_array_equal(out[0], embedder.embed_one("maths"))
+
+
+@pytest.mark.parametrize("error", [APIError(401), APIError(400), ValueError("bad input")])
+def test_permanent_errors_fail_fast(error):
+    embedder = FailingEmbedder(error, failures=1)
+    with pytest.raises(type(error)):
+        embed_texts(["maths"], embedder=embedder, backoff=10)
+    assert len(embedder.calls) == 1
+
+
+def test_retries_give_up_after_max_retries():
+    embedder = FailingEmbedder(APIError(500), failures=10)
+    with pytest.raises(APIError):
+        embed_texts(["maths"], embedder=embedder, max_retries=2, backoff=0)
+    assert len(embedder.calls) == 3
+
+
+def test_is_retryable_by_name_without_status():
+    RateLimitError = type("RateLimitError", (Exception,), {})
+    AuthenticationError = type("AuthenticationError", (Exception,), {})
+    assert is_retryable(RateLimitError())
+    assert not is_retryable(AuthenticationError())
+
+
+class OneBadBatchEmbedder(CountingEmbedder):
+    """Fails every batch containing `bad`; other batches embed normally."""
+    def __init__(self, bad):
+        super().__init__(batch_size=1)
+        self.bad = bad
+
+    async def embed(self, texts):
+        if self.bad in texts:
+            raise APIError(400)
+        return await super().embed(texts)
+
+
+def test_successful_batches_are_cached_when_another_fails(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    with pytest.raises(APIError):
+        embed_texts(["maths", "physics", "broken", "chemistry"], embedder=OneBadBatchEmbedder("broken"),
+                    cache=cache, backoff=0)
+    embedder = CountingEmbedder(batch_size=1)
+    embed_texts(["maths", "physics", "chemistry", "broken"], embedder=embedder, cache=cache)
+    cache.close()
+    assert embedder.calls == [["broken"]]
+
+
+def test_embed_texts_inside_a_running_loop_points_to_the_async_api():
+    async def call():
+        embed_texts(["maths"], embedder=CountingEmbedder())
+
+    with pytest.raises(RuntimeError, match="aembed_texts"):
+        asyncio.run(call())
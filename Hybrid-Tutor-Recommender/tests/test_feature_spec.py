@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_spec import FEATURE_DTYPE, NUMERIC_COLUMNS, FeatureSpec
+from src.feature_store import build_feature_store, case_feature_matrix, pair_feature_matrix
+
+
+def merged_frame(preferred, genders):
+    n = len(genders)
+    return pd.DataFrame({
+        'case_id': np.arange(n), 'tutor_id': np.arange(100, 100 + n), 'success': np.arange(n) % 2,
+        'case_description': ["IB Math"] * n, 'case_budget': np.linspace(50, 150, n),
+        'case_lat': np.full(n, 22.30), 'case_lon': np.full(n, 114.17), 'preferred_gender': preferred,
+        'tutor_name': [f"Tutor_{i}" for i in range(n)], 'tutor_bio': ["Math tutor"] * n,
+        'tutor_rate': np.linspace(60, 120, n), 'tutor_lat': np.linspace(22.25, 22.45, n),
+        'tutor_lon': np.linspace(114.10, 114.25, n), 'gender': genders,
+    })
+
+
+def test_columns_follow_numeric_columns_in_float32():
+    df = merged_frame(["Any", "Male", "Female"], ["Male", "Female", "Male"])
+    spec = FeatureSpec.fit(df, emb_dim=3)
+    X = spec.transform(df, np.ones((3, 3)))
+    assert X.dtype == FEATURE_DTYPE == np.float32
+    assert spec.feature_names == NUMERIC_COLUMNS + ["emb_0", "emb_1", "emb_2"]
+    np.testing.assert_array_equal(X[:, NUMERIC_COLUMNS.index('tutor_rate')], df['tutor_rate'].astype(np.float32))
+    np.testing.assert_allclose(X[:, NUMERIC_COLUMNS.index('price_gap')],
+                               (df['tutor_rate'] - df['case_budget']).abs(), rtol=1e-6)
+    np.testing.assert_array_equal(X[:, len(NUMERIC_COLUMNS):], 1.0)
+
+
+def test_vocabularies_stay_frozen_across_refits(tmp_path):
+    spec = FeatureSpec.fit(merged_frame(["Any", "Female", "Male"], ["Female", "Male", "Male"]), emb_dim=2)
+    spec.save(str(tmp_path / "spec.json"))
+    loaded = FeatureSpec.load(str(tmp_path / "spec.json"))
+
+    # A later frame without "Any" or "Female" would get different pandas codes; the spec keeps its own
+    later = merged_frame(["Male", "Male"], ["Male", "Male"])
+    col = NUMERIC_COLUMNS.index('preferred_gender')
+    for s in (spec, loaded):
+        assert s.transform(later, np.zeros((2, 2)))[:, col].tolist() == [2, 2]
+    assert FeatureSpec.fit(later, emb_dim=2).transform(later, np.zeros((2, 2)))[:, col].tolist() == [0, 0]
+    assert loaded.categories == spec.categories
+
+
+def test_unseen_and_missing_categories_encode_as_minus_one():
+    spec = FeatureSpec.fit(merged_frame(["Any", "Male"], ["Male", "Female"]), emb_dim=1)
+    df = merged_frame(["Other", None], ["Nonbinary", "Female"])
+    X = spec.transform(df, np.zeros((2, 1)))
+    assert X[:, NUMERIC_COLUMNS.index('preferred_gender')].tolist() == [-1, -1]
+    assert X[:, NUMERIC_COLUMNS.index('gender')].tolist() == [-1, 0]
+    # Categorical dtypes (as in the Parquet cache) take the same path
+    cat = df.astype({'preferred_gender': 'category', 'gender': 'category'})
+    np.testing.assert_array_equal(spec.transform(cat, np.zeros((2, 1))), X)
+
+
+def test_feature_store_matrices_match_transform():
+    df = merged_frame(["Any", "Male", "Female", "Any"], ["Male", "Female", "Male", "Female"])
+    emb = np.random.default_rng(0).normal(size=(4, 3)).astype(np.float32)
+    spec = FeatureSpec.fit(df, emb_dim=3)
+    store = build_feature_store(df, emb, spec.categories)
+
+    expected = spec.transform(df, emb)
+    np.testing.assert_allclose(pair_feature_matrix(store, df, np.arange(4)), expected, rtol=1e-6)
+    one_case = case_feature_matrix(store, 50.0, 22.30, 114.17, "Any")
+    np.testing.assert_allclose(one_case[0], expected[0], rtol=1e-6)
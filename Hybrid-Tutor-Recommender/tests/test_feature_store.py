@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_store import load_or_build_feature_store
+
+
+def write_tutors(path):
+    pd.DataFrame({
+        'tutor_id': [1, 2], 'tutor_name': ["A", "B"], 'tutor_rate': [100, 120],
+        'tutor_lat': [22.3, 22.31], 'tutor_lon': [114.2, 114.21], 'gender': ["Male", "Female"],
+    }).to_csv(path, index=False)
+
+
+def test_saved_store_is_rebuilt_when_vocabularies_change(tmp_path):
+    tutors_path, path = tmp_path / "tutors.csv", str(tmp_path / "store.npz")
+    write_tutors(tutors_path)
+    df = pd.DataFrame({'tutor_id': [1, 2], 'preferred_gender': ["Any", "Male"], 'gender': ["Male", "Female"]})
+    emb = np.eye(2)
+
+    store = load_or_build_feature_store(tutors_path, df, emb, path=path)
+    assert store.categories['gender'] == ["Female", "Male"]
+    assert store.encode_category('preferred_gender', "Female") == -1
+
+    # Reused as is when the vocabularies agree
+    same = load_or_build_feature_store(tutors_path, df, emb, path=path, categories=store.categories)
+    assert same.categories == store.categories
+
+    frozen = {'preferred_gender': ["Any", "Female", "Male"], 'gender': ["Female", "Male"]}
+    rebuilt = load_or_build_feature_store(tutors_path, df, emb, path=path, categories=frozen)
+    assert rebuilt.categories == frozen
+    assert rebuilt.encode_category('preferred_gender', "Male") == 2
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.profiling import RECORDER, StageRecorder, count_rows, profiled, stage
+
+
+@pytest.fixture
+def recorder():
+    RECORDER.clear()
+    enabled, RECORDER.enabled = RECORDER.enabled, True
+    yield RECORDER
+    RECORDER.enabled = enabled
+    RECORDER.clear()
+
+
+def run(recorder, name, error=False):
+    try:
+        with recorder.stage(name):
+            if error:
+                raise ValueError("boom")
+    except ValueError:
+        pass
+
+
+def test_ring_buffer_wraps_but_totals_keep_counting():
+    rec = StageRecorder(maxlen=3)
+    for i in range(5):
+        with rec.stage("score", rows=i):
+            pass
+    records, totals = rec.snapshot()
+    assert [r["rows"] for r in records] == [2, 3, 4]
+    assert totals["score"]["calls"] == 5 and totals["score"]["rows"] == 10
+
+
+def test_summary_quantiles_over_buffered_calls():
+    rec = StageRecorder()
+    for ms in range(1, 101):
+        rec._add({"stage": "rank", "rows": 1, "duration_s": ms / 1000, "rss_delta_bytes": None})
+    row = rec.summary().loc["rank"]
+    assert row["calls"] == 100 and row["rows"] == 100
+    assert row["p50_ms"] == pytest.approx(50.5)
+    assert row["p95_ms"] == pytest.approx(95.05)
+    assert row["max_ms"] == pytest.approx(100)
+
+
+def test_openmetrics_uses_total_suffix_and_ends_with_eof():
+    rec = StageRecorder()
+    run(rec, 'load "data"')
+    run(rec, 'load "data"', error=True)
+    text = rec.to_openmetrics(prefix="app")
+    lines = text.splitlines()
+    assert text.endswith("# EOF\n") and lines[-1] == "# EOF"
+    assert "# TYPE app_errors counter" in lines
+    assert 'app_errors_total{stage="load \\"data\\""} 1' in lines
+    assert 'app_rows_total{stage="load \\"data\\""} 0' in lines
+    assert 'app_duration_seconds_count{stage="load \\"data\\""} 2' in lines
+    assert not any(line.startswith("app_errors{") for line in lines)
+
+
+def test_profiled_counts_rows_from_arguments_or_result(recorder):
+    @profiled("transform")
+    def transform(df):
+        return df
+
+    @profiled()
+    def make(n):
+        return np.zeros((n, 3))
+
+    transform(pd.DataFrame({'a': range(7)}))
+    make(4)
+    records, totals = recorder.snapshot()
+    assert [(r["stage"], r["rows"]) for r in records] == [("transform", 7), ("make", 4)]
+    assert totals["make"]["errors"] == 0
+
+
+def test_errors_are_recorded_and_reraised(recorder):
+    @profiled()
+    def fail(x):
+        raise KeyError(x)
+
+    with pytest.raises(KeyError):
+        fail("k")
+    with stage("outer"):
+        with stage("inner", rows=3):
+            pass
+    records, totals = recorder.snapshot()
+    assert records[0]["error"] == "KeyError" and totals["fail"]["errors"] == 1
+    assert records[1]["stage"] == "inner" and records[1]["parent"] == "outer"
+
+
+def test_disabled_recorder_records_nothing(recorder):
+    recorder.enabled = False
+    with stage("skipped"):
+        pass
+    assert recorder.snapshot() == ([], {})
+
+
+def test_count_rows():
+    assert count_rows((np.zeros((2, 1)), np.zeros((3, 1)))) == 5
+    assert count_rows([1, 2, 3]) == 3
+    assert count_rows("text") is None and count_rows(None) is None
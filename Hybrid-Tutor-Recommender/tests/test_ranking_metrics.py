@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from sklearn.metrics import ndcg_score
+
+from src.ranking_metrics import group_offsets, group_sort, map_at_k, ndcg_at_k, ranking_report
+
+
+def random_groups(seed=0, n_groups=40, graded=False):
+    """Shuffled rows of groups of 1-12 rows; some groups have no relevant row."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 13, n_groups)
+    groups = np.repeat(np.arange(n_groups) * 7 + 3, sizes)
+    y = rng.integers(0, 3, len(groups)) if graded else (rng.random(len(groups)) < 0.3).astype(int)
+    y[groups == groups[0]] = 0
+    scores = rng.normal(size=len(groups))
+    perm = rng.permutation(len(groups))
+    return y[perm], scores[perm], groups[perm]
+
+
+def brute_force_ap(y, scores, k):
+    rel = y[np.argsort(-scores, kind="stable")] > 0
+    if not rel.any():
+        return np.nan
+    hits = np.cumsum(rel)
+    precision = [hits[i] / (i + 1) for i in range(min(k, len(rel))) if rel[i]]
+    return sum(precision) / min(k, rel.sum())
+
+
+def brute_force_ndcg(y, scores, k):
+    def dcg(rel):
+        rel = rel[:k]
+        return np.sum((2.0 ** rel - 1) / np.log2(np.arange(len(rel)) + 2))
+    ideal = dcg(np.sort(y)[::-1].astype(float))
+    return dcg(y[np.argsort(-scores, kind="stable")].astype(float)) / ideal if ideal > 0 else np.nan
+
+
+@pytest.mark.parametrize("k", [1, 5, 20])  # 20 exceeds every group size
+def test_ndcg_matches_sklearn_for_binary_relevance(k):
+    y, scores, groups = random_groups()
+    mean, per_group = ndcg_at_k(y, scores, groups, k=k)
+    expected = []
+    for g in np.unique(groups):
+        m = groups == g
+        if y[m].any():
+            # sklearn needs 2+ rows per group; a single relevant row is a perfect ranking
+            expected.append(ndcg_score([y[m]], [scores[m]], k=k) if m.sum() > 1 else 1.0)
+        else:
+            expected.append(np.nan)
+    np.testing.assert_allclose(per_group, expected, rtol=1e-12)
+    assert mean == pytest.approx(np.nanmean(expected))
+
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_ndcg_and_map_match_brute_force_for_graded_relevance(k):
+    y, scores, groups = random_groups(seed=1, graded=True)
+    _, ndcg = ndcg_at_k(y, scores, groups, k=k)
+    _, ap = map_at_k(y, scores, groups, k=k)
+    unique = np.unique(groups)
+    np.testing.assert_allclose(ndcg, [brute_force_ndcg(y[groups == g], scores[groups == g], k) for g in unique])
+    np.testing.assert_allclose(ap, [brute_force_ap(y[groups == g], scores[groups == g], k) for g in unique])
+
+
+def test_groups_without_positives_are_nan_and_excluded_from_the_mean():
+    y = np.array([0, 0, 1, 0, 0, 1])
+    scores = np.array([0.9, 0.1, 0.2, 0.8, 0.3, 0.4])
+    groups = np.array([1, 1, 2, 2, 3, 3])
+    mean, per_group = map_at_k(y, scores, groups, k=10)
+    assert np.isnan(per_group[0])
+    # Group 2: the positive is ranked second; group 3: first
+    np.testing.assert_allclose(per_group[1:], [0.5, 1.0])
+    assert mean == pytest.approx(0.75)
+    assert np.isnan(ndcg_at_k(np.zeros(3), np.ones(3), [1, 1, 1])[0])
+
+
+def test_report_matches_individual_metrics():
+    y, scores, groups = random_groups(seed=2)
+    report = ranking_report(y, scores, groups, ks=(3, 10))
+    assert report["ndcg@3"] == pytest.approx(ndcg_at_k(y, scores, groups, 3)[0])
+    assert report["map@10"] == pytest.approx(map_at_k(y, scores, groups, 10)[0])
+
+
+def test_group_sort_and_offsets():
+    g, x = group_sort([5, 2, 5, 2, 9], np.array([0, 1, 2, 3, 4]))
+    assert g.tolist() == [2, 2, 5, 5, 9] and x.tolist() == [1, 3, 0, 2, 4]
+    assert group_offsets(g).tolist() == [0, 2, 4, 5]
+    assert group_offsets([]).tolist() == [0]
@@ -0,0 +1,69 @@
+from src.result_cache import ResultCache, case_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_same_bucket_hits_and_other_buckets_miss():
+    cache = ResultCache()
+    cache.put(case_key(102, 22.3000, 114.1700, "Any", description="IB Math, online!", k=10), "ranked")
+
+    # Budget 100-104, same 0.5 km cell, description differing only in case and punctuation
+    assert cache.get(case_key(104, 22.3001, 114.1701, "Any", description="ib math online", k=10)) == "ranked"
+    assert cache.get(case_key(105, 22.3000, 114.1700, "Any", description="IB Math, online!", k=10)) is None
+    assert cache.get(case_key(102, 22.3100, 114.1700, "Any", description="IB Math, online!", k=10)) is None
+    assert cache.get(case_key(102, 22.3000, 114.1700, "Male", description="IB Math, online!", k=10)) is None
+    assert cache.get(case_key(102, 22.3000, 114.1700, "Any", description="IB Physics", k=10)) is None
+    assert cache.get(case_key(102, 22.3000, 114.1700, "Any", description="IB Math, online!", k=5)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 5
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl_s=10, clock=clock)
+    cache.put("a", 1)
+    clock.now = 10.0
+    assert cache.get("a") == 1
+    clock.now = 10.5
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResultCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_binding_a_new_version_clears_entries():
+    cache = ResultCache()
+    assert cache.bind(("model-1", "store-1"))
+    cache.put("a", 1)
+    assert not cache.bind(("model-1", "store-1"))
+    assert cache.get("a") == 1
+    assert cache.bind(("model-2", "store-1"))
+    assert cache.get("a") is None and len(cache) == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_get_or_compute_only_computes_on_a_miss():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_compute("a", compute) == "value"
+    assert cache.get_or_compute("a", compute) == "value"
+    assert len(calls) == 1
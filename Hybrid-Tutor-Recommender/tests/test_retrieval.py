@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.retrieval import ExactIndex, IVFIndex, build_index, recall_at_k
+
+
+def clustered_vectors(n=400, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(8, dim))
+    return (centres[rng.integers(0, 8, n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_ivf_probing_every_list_matches_exact_search():
+    vectors = clustered_vectors()
+    ids = np.arange(1000, 1000 + len(vectors))
+    exact = ExactIndex().fit(vectors, ids)
+    ivf = IVFIndex(n_lists=12, nprobe=12).fit(vectors, ids)
+    for query in np.random.default_rng(1).normal(size=(20, vectors.shape[1])):
+        exact_ids, exact_scores = exact.search(query, 10)
+        ivf_ids, ivf_scores = ivf.search(query, 10)
+        np.testing.assert_array_equal(ivf_ids, exact_ids)
+        np.testing.assert_allclose(ivf_scores, exact_scores, rtol=1e-5)
+
+
+def test_exact_search_returns_cosine_neighbours_in_order():
+    vectors = np.array([[1, 0], [0, 1], [1, 1], [-1, 0]], dtype=np.float32)
+    ids, scores = ExactIndex().fit(vectors, ["a", "b", "c", "d"]).search(np.array([2.0, 0.1]), 3)
+    assert ids.tolist() == ["a", "c", "b"]
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_fewer_probes_still_returns_k_results():
+    vectors = clustered_vectors()
+    ids, _ = build_index(vectors, backend="ivf", n_lists=12, nprobe=3).search(vectors[0], 5)
+    assert len(ids) == 5 and 0 in ids
+
+
+@pytest.mark.parametrize("approx, exact, expected", [
+    ([1, 2, 3, 4], [1, 2, 3, 4], 1.0),
+    ([4, 3, 9, 8], [1, 2, 3, 4], 0.5),   # order does not matter
+    ([7, 8], [1, 2, 3, 4], 0.0),
+    ([1], [1, 2, 3, 4], 0.25),           # fewer results than k
+    ([], [], 0.0),
+])
+def test_recall_at_k(approx, exact, expected):
+    assert recall_at_k(np.array(approx), np.array(exact)) == pytest.approx(expected)
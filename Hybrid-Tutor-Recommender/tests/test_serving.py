@@ -0,0 +1,114 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import save_scaler
+from src.batch_scoring import top_k_per_case
+from src.feature_spec import fit_scaler
+from src.feature_store import TutorFeatureStore, case_feature_matrix
+from src.ranking_model import train_model
+from src.serving import MicroBatcher, ModelBundle, ModelHandle
+from src.spatial import build_spatial_index
+
+
+class CountingModel:
+    """Scores by how close the tutor's rate is to the budget; counts predict calls."""
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        p = 1.0 / (1.0 + np.abs(X[:, 4] - X[:, 0]))
+        return np.column_stack([1 - p, p])
+
+
+class IdentityScaler:
+    def transform(self, X):
+        return X
+
+
+def make_store(n=20):
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(22.25, 22.45, n), rng.uniform(114.1, 114.3, n)
+    features = np.column_stack([np.linspace(50, 150, n), lat, lon, np.arange(n) % 2])
+    return TutorFeatureStore(np.arange(1, n + 1), features, rng.normal(size=(n, 3)),
+                             [f"Tutor_{i}" for i in range(1, n + 1)],
+                             {'gender': ["Female", "Male"], 'preferred_gender': ["Any", "Female", "Male"]})
+
+
+class StaticHandle:
+    def __init__(self, model, store):
+        self.bundle = ModelBundle(model, model, IdentityScaler(), store, build_spatial_index(store), "v1", None)
+
+
+def case(budget, k):
+    return {'case_budget': budget, 'case_lat': 22.3, 'case_lon': 114.2, 'preferred_gender': "Any", 'k': k,
+            'max_km': None}
+
+
+def test_concurrent_requests_share_one_predict_call():
+    model, store = CountingModel(), make_store()
+    cases = [case(60, 3), case(100, 5), case(140, 2), case(95, 4)]
+
+    async def serve():
+        batcher = MicroBatcher(StaticHandle(model, store), max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(*[batcher.submit(c) for c in cases])
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(serve())
+    assert model.calls == [len(cases) * len(store)]
+    for c, (ranked, version) in zip(cases, results):
+        assert version == "v1"
+        # Same rows a request scored on its own would get
+        alone = top_k_per_case(CountingModel(), store, IdentityScaler(),
+                               pd.DataFrame([{**c, 'case_id': 0}]), k=c['k'])
+        assert ranked['tutor_id'].tolist() == alone['tutor_id'].tolist()
+        assert len(ranked) == c['k']
+
+
+def test_scoring_errors_reach_every_caller():
+    class BrokenModel(CountingModel):
+        def predict_proba(self, X):
+            raise RuntimeError("model failed")
+
+    async def serve():
+        batcher = MicroBatcher(StaticHandle(BrokenModel(), make_store()), max_wait_ms=50)
+        batcher.start()
+        try:
+            return await asyncio.gather(*[batcher.submit(case(100, 3)) for _ in range(3)], return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(serve()))
+
+
+def test_reload_swaps_only_a_model_recorded_in_the_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # artifact paths are relative to the project root
+    store = make_store()
+    store.save()
+    X = np.vstack([case_feature_matrix(store, b, 22.3, 114.2, "Any") for b in (60, 100, 140)])
+    y = np.arange(len(X)) % 2
+
+    def train(seed):
+        scaler = fit_scaler(X)
+        train_model(scaler.transform(X), np.roll(y, seed))
+        return scaler
+
+    save_scaler(train(0))
+    handle = ModelHandle()
+    assert handle.reload_if_changed()
+    first = handle.bundle
+    assert not handle.reload_if_changed()
+
+    # Retrained model written but not yet recorded: keep serving the old bundle
+    scaler = train(1)
+    assert not handle.reload_if_changed()
+    assert handle.bundle is first
+
+    save_scaler(scaler)
+    assert handle.reload_if_changed()
+    assert handle.bundle.version != first.version and handle.reloads == 2
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.data_pipeline import haversine_np
+from src.spatial import GridIndex, TutorSpatialIndex
+
+
+def random_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(22.15, 22.55, n), rng.uniform(113.85, 114.40, n)
+
+
+def brute_force_pairs(lat, lon, t_lat, t_lon, km):
+    d = haversine_np(lat[:, None], lon[:, None], t_lat[None, :], t_lon[None, :])
+    q, p = np.nonzero(d <= km)
+    return set(zip(q.tolist(), p.tolist()))
+
+
+@pytest.mark.parametrize("km", [0.5, 3.0, 25.0, 200.0])
+def test_grid_pairs_match_brute_force(km):
+    t_lat, t_lon = random_points(500, seed=0)
+    lat, lon = random_points(200, seed=1)
+    q, p, d = GridIndex(t_lat, t_lon).query_pairs(lat, lon, km)
+    assert set(zip(q.tolist(), p.tolist())) == brute_force_pairs(lat, lon, t_lat, t_lon, km)
+    np.testing.assert_allclose(d, haversine_np(lat[q], lon[q], t_lat[p], t_lon[p]))
+
+
+def test_nearest_tutors_match_brute_force():
+    t_lat, t_lon = random_points(500, seed=2)
+    index = TutorSpatialIndex(t_lat, t_lon)
+    rows, dist = index.k_nearest_tutors(22.3, 114.2, 10)
+    expected = np.argsort(haversine_np(22.3, 114.2, t_lat, t_lon), kind="stable")[:10]
+    assert rows.tolist() == expected.tolist()
+    assert np.all(np.diff(dist) >= 0)
+
+
+@pytest.mark.parametrize("km", [0.5, 200.0])
+def test_no_queries_give_empty_pairs(km):
+    t_lat, t_lon = random_points(50, seed=3)
+    q, p, d = GridIndex(t_lat, t_lon).query_pairs(np.empty(0), np.empty(0), km)
+    assert len(q) == len(p) == len(d) == 0
+    assert q.dtype == p.dtype == np.int64
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.tree_inference import NUMBA_AVAILABLE, HybridPredictor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Score from a worker thread, as serving (asyncio.to_thread) and Streamlit do, then exit
+WORKER_THREAD_CODE = """
+import threading
+import numpy as np
+import xgboost as xgb
+from src.tree_inference import HybridPredictor
+
+rng = np.random.default_rng(0)
+X = rng.normal(size=(200, 5)).astype(np.float32)
+model = xgb.XGBClassifier(n_estimators=5, max_depth=3).fit(X, (X[:, 0] > 0).astype(int))
+predictor = HybridPredictor(model, backend="numba")
+t = threading.Thread(target=predictor.predict_proba, args=(X[:16],))
+t.start()
+t.join()
+"""
+
+
+@pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba is not installed")
+def test_numba_scoring_from_worker_thread_exits():
+    proc = subprocess.run([sys.executable, "-c", WORKER_THREAD_CODE], cwd=ROOT, timeout=60,
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr
+
+
+def make_model(max_depth, n_estimators=30, seed=0):
+    import xgboost as xgb
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, 8)).astype(np.float32)
+    y = ((X[:, 0] + X[:, 1] * X[:, 2] + 0.5 * rng.normal(size=len(X))) > 0).astype(int)
+    # Missing values at train time give the splits learned default directions
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = xgb.XGBClassifier(n_estimators=n_estimators, max_depth=max_depth, learning_rate=0.3)
+    return model.fit(X, y), rng
+
+
+BACKENDS = ["numpy", pytest.param("numba", marks=pytest.mark.skipif(not NUMBA_AVAILABLE,
+                                                                       reason="numba is not installed"))]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("max_depth", [4, 10])
+def test_compiled_matches_native(backend, max_depth):
+    model, rng = make_model(max_depth)
+    X = rng.normal(size=(300, 8)).astype(np.float32)
+    X[rng.random(X.shape) < 0.2] = np.nan
+    X[:5] = np.nan  # all-missing rows
+    # native_above beyond the batch so every row goes through the compiled trees
+    predictor = HybridPredictor(model, backend=backend, native_above=len(X))
+    assert predictor.compiled.max_depth == max_depth
+    np.testing.assert_allclose(predictor.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-6)
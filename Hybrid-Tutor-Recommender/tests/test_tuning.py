@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.ranking_model import TRAIN_PARAMS, get_train_params
+from src.tuning import _higher_is_better, load_best_params, save_best_params, tune
+
+
+@pytest.mark.parametrize("metric", ["auc", "aucpr", "map", "ndcg", "ndcg@10", "map@5"])
+def test_ranking_and_auc_metrics_are_maximised(metric):
+    assert _higher_is_better(metric)
+
+
+@pytest.mark.parametrize("metric", ["logloss", "error", "rmse"])
+def test_loss_metrics_are_minimised(metric):
+    assert not _higher_is_better(metric)
+
+
+def synthetic(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 5)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=n) > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("metric", ["auc", "logloss"])
+def test_halving_keeps_the_best_configuration(metric):
+    X, y = synthetic()
+    best, history, stats = tune(X, y, n_trials=6, method="halving", metric=metric, min_rounds=5, max_rounds=15,
+                                eta=3, early_stopping_rounds=5, n_workers=2)
+    sign = -1 if _higher_is_better(metric) else 1
+    first = sorted((r for r in history if r["num_boost_round"] == 5), key=lambda r: sign * r["score"])
+    final = [r for r in history if r["num_boost_round"] == 15]
+
+    assert len(first) == 6 and len(final) == 2 and stats["trials"] == 8
+    # The rung winners are the ones promoted, and the best finalist is returned
+    assert [r["params"] for r in final] == [r["params"] for r in first[:2]]
+    assert best["score"] == min(final, key=lambda r: sign * r["score"])["score"]
+    assert best["num_boost_round"] == 15
+
+
+def test_saved_params_round_trip_into_train_params(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # PARAMS_DIR is relative to the project root
+    assert get_train_params() == TRAIN_PARAMS
+
+    X, y = synthetic(200)
+    best, _, stats = tune(X, y, n_trials=2, max_rounds=10, early_stopping_rounds=3, n_workers=1)
+    save_best_params(best, stats)
+    second = save_best_params({**best, "n_estimators": best["n_estimators"] + 1}, stats)
+
+    assert second.endswith("xgb_params_v0002.json")
+    loaded = load_best_params()
+    assert loaded == {**best["params"], "n_estimators": best["n_estimators"] + 1, "tree_method": "hist"}
+    assert get_train_params() == {**TRAIN_PARAMS, **loaded}
@@ -0,0 +1,119 @@
+"""
+HTTP recommendation service.
+
+Run from the project root:
+    uvicorn web_app.api:app --port 8000
+
+POST /recommend  {"case_budget": 100, "case_lat": 22.31, "case_lon": 114.2,
+                  "preferred_gender": "Any", "k": 10, "max_km": null}
+GET  /metrics    Prometheus exposition
+GET  /healthz    current model version and result cache stats
+
+Rankings are cached per budget bucket and location cell (src/result_cache.py);
+RESULT_CACHE_SIZE and RESULT_CACHE_TTL_S bound the cache.
+"""
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pydantic import BaseModel, Field
+
+from src.result_cache import ResultCache, case_key
+from src.serving import MicroBatcher, ModelHandle
+
+RELOAD_INTERVAL_S = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+MAX_BATCH = int(os.getenv("MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.getenv("MAX_WAIT_MS", "5"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "300"))
+
+# -----------------------------
+# Metrics
+# -----------------------------
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+REQUEST_LATENCY = Histogram("recommend_request_seconds", "End-to-end /recommend latency",
+                            buckets=LATENCY_BUCKETS)
+BATCH_LATENCY = Histogram("recommend_batch_seconds", "Scoring time per micro-batch", buckets=LATENCY_BUCKETS)
+BATCH_SIZE = Histogram("recommend_batch_size", "Requests per micro-batch",
+                       buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+MODEL_RELOADS = Counter("model_reloads_total", "Model bundles swapped in after a file change")
+CACHE_LOOKUPS = Counter("recommend_cache_lookups_total", "Result cache lookups", ["result"])
+CACHE_SIZE = Gauge("recommend_cache_entries", "Entries in the result cache")
+
+def _observe_batch(size, seconds):
+    BATCH_SIZE.observe(size)
+    BATCH_LATENCY.observe(seconds)
+
+# -----------------------------
+# App lifecycle
+# -----------------------------
+handle = ModelHandle()
+batcher = MicroBatcher(handle, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, on_batch=_observe_batch)
+result_cache = ResultCache(maxsize=RESULT_CACHE_SIZE, ttl_s=RESULT_CACHE_TTL_S)
+
+async def _watch_model():
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL_S)
+        if await asyncio.to_thread(handle.reload_if_changed):
+            MODEL_RELOADS.inc()
+
+@asynccontextmanager
+async def lifespan(app):
+    if not os.path.exists(handle.store_path):
+        from src.feature_store import get_store
+        get_store(handle.store_path)
+    handle.reload_if_changed()
+    batcher.start()
+    watcher = asyncio.create_task(_watch_model())
+    yield
+    watcher.cancel()
+    await batcher.stop()
+
+app = FastAPI(title="Hybrid Tutor Recommender", lifespan=lifespan)
+
+# -----------------------------
+# Endpoints
+# -----------------------------
+class CaseRequest(BaseModel):
+    case_budget: float
+    case_lat: float
+    case_lon: float
+    preferred_gender: str = "Any"
+    k: int = Field(10, ge=1, le=100)
+    max_km: Optional[float] = Field(None, gt=0)
+
+@app.post("/recommend")
+async def recommend(case: CaseRequest):
+    start = time.perf_counter()
+    # A reloaded model or tutor store has a new stamp, which empties the cache
+    result_cache.bind(handle.bundle.stamp)
+    key = case_key(case.case_budget, case.case_lat, case.case_lon, case.preferred_gender,
+                   k=case.k, max_km=case.max_km)
+    cached = result_cache.get(key)
+    CACHE_LOOKUPS.labels("hit" if cached is not None else "miss").inc()
+    if cached is None:
+        cached = await batcher.submit(case.model_dump())
+        if cached[1] == handle.bundle.version:  # not scored by a bundle swapped out meanwhile
+            result_cache.put(key, cached)
+    CACHE_SIZE.set(len(result_cache))
+    top, version = cached
+    REQUEST_LATENCY.observe(time.perf_counter() - start)
+    return {
+        "model_version": version[:12],
+        "tutors": top.drop(columns=['case_id']).to_dict(orient="records"),
+    }
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok", "model_version": handle.bundle.version[:12], "reloads": handle.reloads,
+            "result_cache": result_cache.stats()}
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
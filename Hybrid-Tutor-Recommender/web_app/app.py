@@ -1,20 +1,31 @@
+import importlib.util
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 
-from src.data_pipeline import load_data, merge_datasets, preprocess
+from src.config import FEATURE_STORE_PATH, MODEL_PATH
+from src.data_cache import load_merged
+from src.embeddings import EmbeddingCache, embed_texts, reduce_embeddings
+from src.embedding_store import EmbeddingStore, load_or_build_embedding_store
+from src.feature_spec import FeatureSpec, fit_scaler
+from src.artifacts import (ArtifactVersionError, check_model_features, load_feature_spec, load_pca, load_scaler,
+                           save_feature_spec, save_scaler)
 from src.ranking_model import load_model, train_model, explain_predictions_human
+from src.feature_store import (NUMERIC_COLUMNS, case_feature_matrix, load_or_build_feature_store,
+                               retrieve_and_score, score_case)
+from src.bi_reporting import local_supply, pricing_curves
+from src.retrieval import build_index
+from src.profiling import RECORDER, profiled, stage
+from src.result_cache import ResultCache, case_key
+from src.serving import file_stamp
+from src.tree_inference import HybridPredictor
+from src.spatial import build_spatial_index
 
-# OpenAI embeddings (optional)
-try:
-    from src.embeddings import get_embedding, reduce_embeddings
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# Live embedding calls need the optional openai package; without it the store's vectors are used
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 
 # -----------------------------
 # Page config
@@ -27,100 +38,129 @@ st.title("Hybrid Tutor Recommendation System")
 # -----------------------------
 @st.cache_data
 def load_processed_data():
-    processed_path = "data/processed/merged_data.csv"
-    if os.path.exists(processed_path):
-        df = pd.read_csv(processed_path)
-    else:
-        cases, tutors, results = load_data()
-        df = merge_datasets(cases, tutors, results)
-        df = preprocess(df)
-        os.makedirs("data/processed", exist_ok=True)
-        df.to_csv(processed_path, index=False)
-    return df
+    # Typed Parquet cache keyed by the raw CSVs; only appended results are re-merged
+    return load_merged()
 
 df = load_processed_data()
 
 # -----------------------------
-# Load embeddings safely
+# Tutor embeddings (memory-mapped, keyed by tutor_id)
 # -----------------------------
-@st.cache_data
-def load_embeddings(df):
-    emb_path = "data/embeddings/embeddings_reduced.npy"
-    os.makedirs("data/embeddings", exist_ok=True)
-
-    if os.path.exists(emb_path):
-        embeddings = np.load(emb_path)
-        st.info("✅ Loaded embeddings")
-    else:
-        n_rows = len(df)
-        n_features = 32
-        embeddings = None
-        if OPENAI_AVAILABLE:
+def embed_new_tutors(rows):
+    """Reduced bio embeddings for tutors the store has not seen, or dummy vectors."""
+    if OPENAI_AVAILABLE:
+        try:
+            cache = EmbeddingCache()
+            raw_emb = embed_texts(list(rows['tutor_bio']), cache=cache)
+            cache.close()
             try:
-                texts = list(df['tutor_bio'])
-                raw_emb = [get_embedding(t) for t in texts]
-                embeddings = reduce_embeddings(np.array(raw_emb))
-                st.info("✅ OpenAI embeddings generated")
-            except:
-                st.warning("⚠ OpenAI failed, using dummy embeddings")
-        if embeddings is None:
-            embeddings = np.random.rand(n_rows, n_features)
-            st.info("✅ Using dummy embeddings")
-        np.save(emb_path, embeddings)
-    return embeddings
-
-embeddings = load_embeddings(df)
-
-# -----------------------------
-# Encode numeric/categorical
-# -----------------------------
-def encode_features(df):
-    df_enc = df.copy()
-    cat_cols = ['preferred_gender','gender']
-    for col in cat_cols:
-        if col in df_enc.columns:
-            df_enc[col] = df_enc[col].astype('category').cat.codes
-    # drop text columns to avoid XGBoost errors
-    text_cols = ['case_description','case_description_input','tutor_name','tutor_bio']
-    for col in text_cols:
-        if col in df_enc.columns:
-            df_enc = df_enc.drop(columns=[col])
-    return df_enc
-
-df_enc = encode_features(df)
-
-# -----------------------------
-# Combine numeric + tutor embeddings only
-# -----------------------------
-def combine_features(df_enc, embeddings):
-    X_numeric = df_enc.drop(columns=['success','case_id','tutor_id'], errors='ignore').values
-    if embeddings.shape[0] != df_enc.shape[0]:
-        emb_numeric = embeddings[-df_enc.shape[0]:]
-    else:
-        emb_numeric = embeddings
-    X_combined = np.hstack([X_numeric, emb_numeric])
-    X_scaled = StandardScaler().fit_transform(X_combined)
-    return X_scaled
+                pca = load_pca()
+            except (FileNotFoundError, ArtifactVersionError):
+                pca = None
+            st.info(f"✅ OpenAI embeddings generated for {len(rows)} tutors")
+            return reduce_embeddings(np.array(raw_emb), pca=pca)
+        except:
+            st.warning("⚠ OpenAI failed, using dummy embeddings")
+    st.info(f"✅ Using dummy embeddings for {len(rows)} tutors")
+    return np.random.rand(len(rows), 32)
+
+@st.cache_resource
+def get_embedding_store(_df):
+    # Vectors stay on disk; new tutors are appended, existing ones are only mapped
+    legacy_path = "data/embeddings/embeddings_reduced.npy"
+    if not EmbeddingStore.exists() and os.path.exists(legacy_path):
+        try:
+            load_or_build_embedding_store(_df, np.load(legacy_path, mmap_mode='r'))
+            st.info("✅ Loaded embeddings")
+        except ValueError:
+            pass  # rows no longer line up with the merged data; embed the tutors afresh
+    return load_or_build_embedding_store(_df, embed_new_tutors)
+
+embedding_store = get_embedding_store(df)
+
+# -----------------------------
+# Feature spec (frozen column order + vocabularies) and the unscaled training matrix
+# -----------------------------
+@st.cache_resource
+def get_feature_spec(_df, _embedding_store):
+    try:
+        return load_feature_spec()
+    except (FileNotFoundError, ArtifactVersionError):
+        # No saved spec yet: freeze the vocabularies of the current frame
+        spec = FeatureSpec.fit(_df, _embedding_store.dim)
+        save_feature_spec(spec)
+        return spec
+
+spec = get_feature_spec(df, embedding_store)
+
+@st.cache_resource
+def get_training_matrix(_df, _spec, _embedding_store):
+    # One float32 matrix written in place, built once rather than on every rerun
+    return _spec.transform(_df, _embedding_store), _df['success'].to_numpy()
 
-X = combine_features(df_enc, embeddings)
-y = df_enc['success'].values
+X_raw, y = get_training_matrix(df, spec, embedding_store)
 
 # -----------------------------
-# Load/train model
+# Load/train model with its fitted scaler (transform-only at serve time)
 # -----------------------------
 @st.cache_resource
-def get_model(X, y):
-    model_path = "models/xgb_model.json"
+def get_model(_X_raw, _y):
+    model_path = MODEL_PATH
     os.makedirs("models", exist_ok=True)
+    model = scaler = None
     if os.path.exists(model_path):
         model = load_model(model_path)
-        st.info("✅ Loaded trained model")
-    else:
-        model = train_model(X, y, save_path=model_path)
+        try:
+            scaler = load_scaler(model_path)
+            check_model_features(model, scaler, spec)
+            st.info("✅ Loaded trained model and scaler")
+        except FileNotFoundError:
+            # Older model saved without its scaler: refit on the same history once and record it
+            with stage("fit_scaler", len(_X_raw)):
+                scaler = fit_scaler(_X_raw)
+            save_scaler(scaler, model_path)
+            st.info("✅ Loaded trained model, scaler fitted and saved")
+        except ArtifactVersionError as e:
+            st.warning(f"⚠ {e} - retraining")
+            model = None
+    if model is None:
+        with stage("fit_scaler", len(_X_raw)):
+            scaler = fit_scaler(_X_raw)
+        with stage("train_model", len(_X_raw)):
+            model = train_model(scaler.transform(_X_raw), _y, save_path=model_path)
+        save_scaler(scaler, model_path)
         st.info("✅ Model trained and saved")
-    return model
+    return model, scaler
 
-model = get_model(X, y)
+model, scaler = get_model(X_raw, y)
+
+@st.cache_resource
+def get_predictor(_model):
+    # Flattened trees for per-request scoring; the XGBoost model is kept for SHAP
+    return HybridPredictor(_model)
+
+predictor = get_predictor(model)
+
+# -----------------------------
+# Tutor feature store (one row per tutor, built once)
+# -----------------------------
+@st.cache_resource
+def get_feature_store(_df, _embedding_store):
+    return load_or_build_feature_store("data/raw/tutors.csv", _df, _embedding_store, categories=spec.categories)
+
+store = get_feature_store(df, embedding_store)
+
+@st.cache_resource
+def get_tutor_index(_store):
+    return build_index(_store.embeddings, backend="faiss" if len(_store) > 100_000 else "ivf")
+
+tutor_index = get_tutor_index(store)
+
+@st.cache_resource
+def get_spatial_index(_store):
+    return build_spatial_index(_store, backend="balltree" if len(_store) > 100_000 else "grid")
+
+spatial_index = get_spatial_index(store)
 
 # -----------------------------
 # Sidebar: New Case
@@ -128,42 +168,127 @@ model = get_model(X, y)
 st.sidebar.header("New Case Input")
 case_desc = st.sidebar.text_area("Case Description", "A-Level Physics student, SEN-friendly")
 budget = st.sidebar.slider("Budget (HKD/hour)", 30, 200, 100)
+case_lat = st.sidebar.number_input("Case latitude", value=float(df['case_lat'].median()), format="%.4f")
+case_lon = st.sidebar.number_input("Case longitude", value=float(df['case_lon'].median()), format="%.4f")
+preferred_gender = st.sidebar.selectbox("Preferred tutor gender", store.categories.get('preferred_gender', ["Any"]))
+two_stage = st.sidebar.checkbox("Retrieve-then-rank (large tutor pools)", value=len(store) > 5000)
+candidate_k = st.sidebar.number_input("Candidates to rank", min_value=10, value=500, step=50) if two_stage else None
+max_km = st.sidebar.number_input("Max distance (km, 0 = any)", min_value=0.0, value=0.0, step=1.0)
+explain = st.sidebar.checkbox("Explain recommendations (SHAP)", value=False)
+
+@st.cache_data
+def embed_case(case_desc):
+    """Case description in the same reduced space as the tutor embeddings, or None."""
+    if not OPENAI_AVAILABLE:
+        return None
+    try:
+        cache = EmbeddingCache()
+        raw = embed_texts([case_desc], cache=cache)
+        cache.close()
+        return reduce_embeddings(raw, pca=load_pca())[0]
+    except Exception:
+        return None
 
 # -----------------------------
 # Rank tutors
 # -----------------------------
-def rank_tutors(df, model, embeddings, case_desc, budget):
-    df_temp = df.copy()
-    df_temp['case_budget'] = budget
-    df_numeric = encode_features(df_temp)
-    X_numeric = df_numeric.drop(columns=['success','case_id','tutor_id'], errors='ignore').values
-
-    # ✅ Combine numeric + tutor embeddings ONLY (match training features)
-    X_combined = np.hstack([X_numeric, embeddings[-df_numeric.shape[0]:]])
-    X_scaled = StandardScaler().fit_transform(X_combined)
+@profiled()
+def rank_tutors(store, scaler, case_desc, budget, case_lat, case_lon, preferred_gender,
+                candidate_k=None, index=None, max_km=0, spatial_index=None):
+    case_embedding = embed_case(case_desc) if candidate_k and not max_km else None
+    if max_km and spatial_index is not None:
+        # Only tutors within reach are scored; if nobody is, fall back to the nearest few
+        rows, _ = spatial_index.tutors_within(case_lat, case_lon, max_km)
+        if len(rows) == 0:
+            rows, _ = spatial_index.k_nearest_tutors(case_lat, case_lon, 10)
+        store = store.take(rows)
+        scores, _ = score_case(predictor, store, scaler, budget, case_lat, case_lon, preferred_gender)
+    elif case_embedding is not None:
+        # Stage 1: ANN over tutor embeddings; stage 2: XGBoost on the candidates only
+        store, scores, _ = retrieve_and_score(predictor, store, scaler, index, case_embedding, candidate_k,
+                                                     budget, case_lat, case_lon, preferred_gender)
+    else:
+        # One batched predict_proba over the tutor store; the case is broadcast against it
+        scores, _ = score_case(predictor, store, scaler, budget, case_lat, case_lon, preferred_gender)
 
-    df_temp['ai_score'] = model.predict_proba(X_scaled)[:,1]
+    top = np.argsort(-scores, kind='stable')[:10]
+    df_top = pd.DataFrame({
+        'tutor_id': store.tutor_ids[top],
+        'tutor_name': store.tutor_names[top],
+        'tutor_rate': store.tutor_rate[top],
+        'ai_score': scores[top],
+    })
+    return df_top
 
-    feature_cols = df_numeric.drop(columns=['success','case_id','tutor_id'], errors='ignore').columns.tolist()
-    df_temp['reason'] = explain_predictions_human(model, X_scaled, feature_cols)
+# -----------------------------
+# Result cache (reruns and near-identical cases skip ranking and SHAP)
+# -----------------------------
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(maxsize=512, ttl_s=600)
 
-    df_top = df_temp.sort_values(by='ai_score', ascending=False).head(10)
-    return df_top[['tutor_name','tutor_rate','ai_score','reason']]
+result_cache = get_result_cache()
+# Retraining or rebuilding the store changes the files (and reloads them), which empties the cache
+result_cache.bind((file_stamp(MODEL_PATH, FEATURE_STORE_PATH), id(model), id(store)))
 
 # -----------------------------
 # Show top tutors
 # -----------------------------
 st.subheader("Top Tutor Recommendations")
-top_tutors = rank_tutors(df, model, embeddings, case_desc, budget)
-st.dataframe(top_tutors)
+cache_key = case_key(budget, case_lat, case_lon, preferred_gender, description=case_desc,
+                     candidate_k=candidate_k, max_km=max_km)
+top_tutors = result_cache.get_or_compute(cache_key, lambda: rank_tutors(
+    store, scaler, case_desc, budget, case_lat, case_lon, preferred_gender,
+    candidate_k=candidate_k, index=tutor_index, max_km=max_km, spatial_index=spatial_index))
+top_rows = pd.Index(store.tutor_ids).get_indexer(top_tutors['tutor_id'])
+X_top = case_feature_matrix(store.take(top_rows), budget, case_lat, case_lon, preferred_gender)
+shown = top_tutors.drop(columns=['tutor_id'])
+if explain:
+    # SHAP (and its import) only when asked for, and only for the rows shown
+    shown = shown.assign(reason=explain_predictions_human(model, scaler.transform(X_top), NUMERIC_COLUMNS, top_k=3))
+st.dataframe(shown)
+with st.sidebar.expander("Result cache"):
+    cache_stats = result_cache.stats()
+    st.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+    st.json(cache_stats)
 
 # -----------------------------
 # Dynamic Pricing Simulator
 # -----------------------------
 st.subheader("Dynamic Pricing Simulator")
 budgets = list(range(max(10, budget-20), budget+41, 10))
-pricing_df = pd.DataFrame({
-    'budget': budgets,
-    'probability': [np.mean(top_tutors['ai_score']) for b in budgets]
-})
-st.line_chart(pricing_df.rename(columns={'budget':'index','probability':'value'}).set_index('index'))
+# Sweep every budget for the recommended tutors in one batched call
+per_tutor, pricing_df = pricing_curves(
+    model, X_top, budgets, ids=top_tutors['tutor_name'].tolist(), scaler=scaler,
+    budget_col=NUMERIC_COLUMNS.index('case_budget'),
+    price_gap_col=NUMERIC_COLUMNS.index('price_gap'),
+    rate_col=NUMERIC_COLUMNS.index('tutor_rate'),
+)
+st.line_chart(pricing_df.set_index('budget')[['probability','p25','p75']])
+with st.expander("Per-tutor price-success curves"):
+    st.line_chart(per_tutor.T)
+
+# -----------------------------
+# Local supply (spatially pruned: only tutors inside the radius are visited)
+# -----------------------------
+st.subheader("Local Tutor Supply")
+supply_km = st.slider("Supply radius (km)", 1, 20, 5)
+supply = local_supply(df.drop_duplicates('case_id'), spatial_index, radius_km=supply_km)
+st.metric("Cases with a supply gap", int(supply['supply_gap'].sum()))
+st.dataframe(supply.sort_values('tutors_nearby').head(20))
+
+# -----------------------------
+# Debug: stage timings (data loading, encoding, scaler, inference, SHAP)
+# -----------------------------
+if st.sidebar.checkbox("Debug: stage timings", value=False):
+    st.subheader("Stage Timings")
+    st.caption(f"Last {len(RECORDER.records)} instrumented calls in this process")
+    st.dataframe(RECORDER.summary())
+    with st.expander("Recent calls"):
+        st.dataframe(pd.DataFrame(RECORDER.snapshot()[0][::-1][:200]))
+    col_json, col_metrics, col_clear = st.columns(3)
+    col_json.download_button("Download JSON", RECORDER.to_json(indent=2), "stage_timings.json", "application/json")
+    col_metrics.download_button("Download OpenMetrics", RECORDER.to_openmetrics(), "stage_timings.txt",
+                                "application/openmetrics-text")
+    if col_clear.button("Clear"):
+        RECORDER.clear()